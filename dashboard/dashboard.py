@@ -1,30 +1,113 @@
 import dash
-from dash import dcc, html
-from dash.dependencies import Input, Output, State
+from dash import dcc, html, no_update, Patch
+from dash.dependencies import Input, Output, State, ALL
 import plotly.graph_objs as go
-import json
+import os
+import sys
 import time
+import threading
+import atexit
 from datetime import datetime
-from collections import deque
+import numpy as np
 import pandas as pd
 import paho.mqtt.client as mqtt
 import dash_bootstrap_components as dbc
 
+# Shared modules live in model/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "model"))
+from dataset_store import write_dataset
+from ring_buffer import RingBuffer
+from downsample import downsample, visible_x_range
+from state_store import StateStore
+from status_stats import StatusStats
+from telemetry_db import TelemetryDB, DB_PATH, wait_for_db
+from telemetry_store import TelemetryStore, STORE_ROOT, to_ms, local_time, pick_tier
+from model_registry import current_version, read_manifest
+from flat_forest import load_model_file
+from payload import parse_sensor
+from devices import (SENSOR_SUBSCRIPTIONS, CONTROL_SUBSCRIPTIONS, LEGACY_DEVICE,
+                     control_topic, parse_topic, subscribe_all)
+
 # ===============================
 # MQTT Configuration
 # ===============================
 BROKER = "broker.hivemq.com"
 PORT = 1883
-TOPIC_SUB = "sic7/sensor"
-TOPIC_PUB = "sic7/control"
+TOPICS = SENSOR_SUBSCRIPTIONS + CONTROL_SUBSCRIPTIONS   # sic7/{sensor,control}[/<id>]
 CLIENT_ID = f"dash_{int(time.time())}"
 MQTT_USER = "foursome"
 MQTT_PASS = "berempat"
+COLLECTED_DATASET = "collected"  # Parquet dataset receiving every download
+COLLECTED_STORED_KEY = "collected_stored_id"   # Shared mode: status key, see store_collected()
+
+# "mqtt":   this process subscribes to the broker itself (single process)
+# "shared": read telemetry from the SQLite log written by ingest.py, so any
+#           number of workers can serve the UI, e.g.
+#           DASHBOARD_BACKEND=shared gunicorn -w 4 --chdir dashboard dashboard:server
+#           (without --preload: each worker starts its own sync thread)
+DASHBOARD_BACKEND = os.environ.get("DASHBOARD_BACKEND", "mqtt")
+SYNC_INTERVAL = 0.5          # Seconds between polls of the shared log
+REPLAY_ON_START = 10_000     # Recent events a new worker replays to warm up
+INGEST_STALE_AFTER = 15      # Seconds without ingest heartbeat = disconnected
+
+# In-memory history is bounded. Each device keeps its own trend log (about
+# 64 kB per device at 1000 rows); collected rows beyond COLLECTED_CAPACITY
+# are spilled to SPILL_DIR.
+DEVICE_LOG_CAPACITY = 1_000
+COLLECTED_CAPACITY = 50_000
+SPILL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "spill")
+# Workers must not share spill files
+SPILL_SUFFIX = f"_{os.getpid()}" if DASHBOARD_BACKEND == "shared" else ""
+
+# Long-term history (model/telemetry_store.py). ingest.py writes it in shared
+# mode; in mqtt mode this process is the subscriber, so it writes it itself.
+# Only one writer may run at a time.
+STORE_HISTORY = DASHBOARD_BACKEND == "mqtt"
+HISTORY_RANGES = {           # Trend chart range selector; "live" = in-memory log
+    "live": ("Live", None),
+    "1h": ("Last hour", 3_600),
+    "6h": ("Last 6 hours", 6 * 3_600),
+    "24h": ("Last 24 hours", 24 * 3_600),
+    "7d": ("Last 7 days", 7 * 24 * 3_600),
+}
+
+# Prediction statistics: all-time counts plus these sliding windows
+STATS_WINDOWS = {"5m": 5 * 60, "1h": 60 * 60}
+STATS_WINDOW_NAMES = {"all": "All time", "5m": "Last 5 min", "1h": "Last hour"}
+STATS_REFRESH_S = 5          # Windowed views re-render this often (old statuses age out)
+# Label set shown: the deployed model's classes (registry CURRENT manifest,
+# else the file mqtt_inference.py falls back to), plus any other label
+# that actually arrived
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "model", "models")
+REGISTRY_ROOT = os.path.join(MODEL_DIR, "registry")
+FALLBACK_MODEL_PATH = os.path.join(MODEL_DIR, "model_random_forest.pkl")
+LABEL_COLORS = {"Panas": "#ff6b6b", "Hangat": "#ffd43b", "Dingin": "#4dabf7"}
+LABEL_ICONS = {"Panas": "🔥", "Hangat": "🟡", "Dingin": "❄️"}
+EXTRA_COLORS = ["#51cf66", "#cc5de8", "#ff922b", "#20c997", "#f06595", "#868e96"]
+
+# Trend chart sends at most ~one point per horizontal pixel to the browser
+CHART_MAX_POINTS = 800
+# History views read raw readings while the span has at most this many per
+# device, else the 1-minute or 1-hour rollups (drawn as mean + min/max band)
+HISTORY_MAX_POINTS = 4 * CHART_MAX_POINTS
+DOWNSAMPLE_METHOD = "lttb"   # "lttb" (shape-preserving) or "minmax" (keeps spikes)
 
 # ===============================
 # Global Data Storage
 # ===============================
-sensor_data = {
+# Written only by the MQTT thread. Dash callbacks read `state.snapshot()`
+# and `devices[id].current` for the small values and wrap ring-buffer
+# reads in `state.read(...)`.
+
+DATA_LOG_DTYPE = np.dtype([
+    ("time", "datetime64[ms]"),
+    ("temp", "f8"),
+    ("hum", "f8"),
+    ("pot", "f8"),            # NaN: not sent (binary payloads carry no pot)
+])
+EMPTY_LOG = np.zeros(0, dtype=DATA_LOG_DTYPE)
+
+DEFAULT_SENSOR_DATA = {
     "temp": 0.0,
     "hum": 0.0,
     "pot": 0,
@@ -32,115 +115,307 @@ sensor_data = {
     "prediction": "N/A"
 }
 
-data_log = {
-    "time": deque(),
-    "temp": deque(),
-    "hum": deque(),
-    "pot": deque()
-}
+class DeviceState:
+    """
+    Everything the dashboard keeps for one device
+    
+    `current` is a (version, sensor_data) pair replaced as a whole, so a
+    reader always gets a matching version and dict; the version moves on
+    every reading or status for this device only.
+    """
+    
+    __slots__ = ("current", "log")
+    
+    def __init__(self):
+        self.current = (0, DEFAULT_SENSOR_DATA)
+        self.log = RingBuffer(DEVICE_LOG_CAPACITY, DATA_LOG_DTYPE)
 
-ml_stats = {
-    "total_predictions": 0,
-    "panas_count": 0,
-    "hangat_count": 0,
-    "dingin_count": 0,
-    "last_prediction_time": None
-}
+# device id -> DeviceState, O(1) for both the writer and the callbacks
+devices = {}
 
-mqtt_connected = False
-collected_data = []
+COLLECTED_DTYPE = np.dtype([
+    ("timestamp", "datetime64[s]"),
+    ("device", "U16"),
+    ("temp", "f8"),
+    ("hum", "f8"),
+    ("pot", "f8"),            # NaN: not sent
+    ("prediction", "U16"),
+    ("event", "i8"),          # Shared-log event id (shared mode), never exported
+])
+def sweep_spill_files(spill_dir=SPILL_DIR):
+    """Delete spill files left behind by workers that are no longer running"""
+    if not os.path.isdir(spill_dir):
+        return
+    for name in os.listdir(spill_dir):
+        stem, ext = os.path.splitext(name)
+        pid = stem.rpartition("_")[2]
+        if ext != ".csv" or not pid.isdigit() or int(pid) == os.getpid():
+            continue
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            os.remove(os.path.join(spill_dir, name))
+        except OSError:
+            pass   # Alive, but owned by another user
+
+def remove_spill_file():
+    if collected_data.spill_path and os.path.exists(collected_data.spill_path):
+        os.remove(collected_data.spill_path)
+
+sweep_spill_files()
+collected_data = RingBuffer(COLLECTED_CAPACITY, COLLECTED_DTYPE,
+                            spill_path=os.path.join(SPILL_DIR, f"collected_data{SPILL_SUFFIX}.csv"))
+if SPILL_SUFFIX:
+    # Per-worker spill files only live as long as their worker
+    atexit.register(remove_spill_file)
 collection_active = False
+collected_stored = 0              # mqtt mode: collected_data rows already written to COLLECTED_DATASET
+collected_store_lock = threading.Lock()
+
+history = TelemetryStore(STORE_ROOT, readonly=True)
+history_writer = TelemetryStore(STORE_ROOT) if STORE_HISTORY else None
+
+_deployed_labels = (None, list(LABEL_COLORS))   # (cache key, labels)
+
+def deployed_labels():
+    """
+    Labels of the model the inference server runs, in the model's order
+    
+    Cached per registry version (or model file mtime), so polling costs
+    one small file read.
+    """
+    global _deployed_labels
+    try:
+        version = current_version(REGISTRY_ROOT)
+        if version is not None:
+            key = ("registry", version)
+            if key != _deployed_labels[0]:
+                _deployed_labels = (key, [str(c) for c in read_manifest(version, REGISTRY_ROOT)["labels"]])
+        elif os.path.exists(FALLBACK_MODEL_PATH):
+            key = ("file", os.path.getmtime(FALLBACK_MODEL_PATH))
+            if key != _deployed_labels[0]:
+                _deployed_labels = (key, [str(c) for c in load_model_file(FALLBACK_MODEL_PATH).classes_])
+    except Exception as e:
+        print(f"❌ Could not read model labels: {e}")
+    return _deployed_labels[1]
+
+# Counts status messages, not predictions (see StatusStats). Mutated in
+# place by the writer like the ring buffers: read it through
+# state.read(status_stats.summary)
+status_stats = StatusStats(STATS_WINDOWS, labels=deployed_labels())
+
+state = StateStore(
+    device_ids=(),   # In order of first appearance
+    # Change counters; callbacks compare them (plus the selected device's
+    # version) with what each browser last rendered and skip unchanged outputs
+    seq={
+        "prediction": 0,
+        "connection": 0,
+        "collected": 0,
+        "devices": 0
+    },
+    mqtt_connected=False
+)
+
+def bump(seq, *keys):
+    """Copy of a seq dict with the given counters incremented"""
+    seq = dict(seq)
+    for key in keys:
+        seq[key] += 1
+    return seq
 
 # ===============================
 # MQTT Callbacks
 # ===============================
+def set_connected(connected):
+    state.update(mqtt_connected=connected, seq=bump(state["seq"], "connection"))
+
 def on_connect(client, userdata, flags, rc, properties=None):
-    global mqtt_connected
     if rc == 0:
-        mqtt_connected = True
-        client.subscribe(TOPIC_SUB)
-        client.subscribe(TOPIC_PUB)
+        set_connected(True)
+        subscribe_all(client, TOPICS)
         print("✅ MQTT Connected")
-        print(f"📡 Subscribed to: {TOPIC_SUB}, {TOPIC_PUB}")
+        print(f"📡 Subscribed to: {', '.join(TOPICS)}")
     else:
-        mqtt_connected = False
+        set_connected(False)
         print(f"❌ Connection Failed (rc={rc})")
 
 def on_disconnect(client, userdata, flags, rc, properties=None):
-    global mqtt_connected
-    mqtt_connected = False
+    set_connected(False)
     if rc != 0:
         print(f"⚠️ Unexpected disconnect (rc={rc})")
 
 def on_message(client, userdata, msg):
-    global sensor_data, data_log, ml_stats, collection_active, collected_data
+    handle_message(msg.topic, msg.payload, datetime.now())
+
+def handle_message(topic, payload, received_at, replay=False, event_id=0):
+    """
+    Apply one MQTT message to the dashboard state (the single writer path)
+    
+    Args:
+        topic: MQTT topic
+        payload: Payload bytes (sensor: JSON or binary, see payload.py)
+        received_at: datetime the message reached the broker client
+        replay: Historical event replayed at startup (never collected)
+        event_id: Id of the event in the shared log (shared mode)
+    """
     try:
-        payload = msg.payload.decode()
+        kind, device_id = parse_topic(topic)
+        device = devices.get(device_id)
+        if kind is None or (device is None and kind != "sensor"):
+            # Control traffic for a device that never reported a reading
+            return
+        new_device = device is None
+        if new_device:
+            device = DeviceState()
         
-        # Handle sensor data
-        if msg.topic == TOPIC_SUB:
-            data = json.loads(payload)
-            sensor_data.update(data)
-            
-            # Update data log
-            current_time = datetime.now().strftime("%H:%M:%S")
-            data_log["time"].append(current_time)
-            data_log["temp"].append(data.get("temp", 0))
-            data_log["hum"].append(data.get("hum", 0))
-            data_log["pot"].append(data.get("pot", 0))
+        snap = state.snapshot()
+        version, sensor_data = device.current
+        sensor_data = dict(sensor_data)
+        prediction = None
+        changed = []
+        
+        # Handle sensor data (a batched payload carries several readings,
+        # each dated by its age relative to the newest one)
+        if kind == "sensor":
+            temps, hums, pots, ages = parse_sensor(payload)
+            ts_ms = int(received_at.timestamp() * 1000) - ages
+            # Epoch ms for the history store; naive local time for the
+            # in-memory log, like the history views (TelemetryStore.to_frame)
+            rows = list(zip(ts_ms.tolist(), local_time(ts_ms), temps.tolist(), hums.tolist(), pots.tolist()))
+            sensor_data.update(temp=rows[-1][2], hum=rows[-1][3], pot=rows[-1][4])
+            changed.append("sensor")
             
-            print(f"📥 Sensor: temp={data.get('temp')}°C, hum={data.get('hum')}%, pot={data.get('pot')}")
+            print(f"📥 Sensor [{device_id}]: temp={rows[-1][2]}°C, hum={rows[-1][3]}%, pot={rows[-1][4]}"
+                  + (f" (+{len(rows) - 1} batched)" if len(rows) > 1 else ""))
         
         # Handle prediction/status
-        elif msg.topic == TOPIC_PUB:
+        elif kind == "control":
+            payload = bytes(payload).decode(errors="replace")
             if payload.startswith('status:'):
                 prediction = payload.split(':')[1]
                 sensor_data['prediction'] = prediction
                 sensor_data['status'] = prediction
+                changed.append("prediction")
                 
-                if prediction in ["Panas", "Hangat", "Dingin"]:
-                    ml_stats["total_predictions"] += 1
-                    ml_stats["last_prediction_time"] = datetime.now().strftime("%H:%M:%S")
-                    
-                    if prediction == "Panas":
-                        ml_stats["panas_count"] += 1
-                    elif prediction == "Hangat":
-                        ml_stats["hangat_count"] += 1
-                    elif prediction == "Dingin":
-                        ml_stats["dingin_count"] += 1
-                
-                print(f"🤖 Prediction: {prediction}")
+                print(f"🤖 Prediction [{device_id}]: {prediction}")
+        
+        # Collect data if active (live messages only)
+        if collection_active and not replay:
+            changed.append("collected")
+        
+        if not changed:
+            return
+        
+        device_ids = snap["device_ids"]
+        if new_device:
+            device_ids += (device_id,)
+            changed.append("devices")
+            print(f"🆕 New device: {device_id} ({len(device_ids)} known)")
         
-        # Collect data if active
-        if collection_active:
-            collected_data.append({
-                "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                "temp": sensor_data.get("temp", 0),
-                "hum": sensor_data.get("hum", 0),
-                "pot": sensor_data.get("pot", 0),
-                "prediction": sensor_data.get("prediction", "N/A")
-            })
+        # Buffers and snapshot change together, so a reader never sees a
+        # new log row next to an old seq counter (or the reverse)
+        with state.writing():
+            if new_device:
+                devices[device_id] = device
+            if "sensor" in changed:
+                for _, time_local, temp, hum, pot in rows:
+                    device.log.append((time_local, temp, hum, pot))
+            device.current = (version + 1, sensor_data)
+            if prediction:
+                status_stats.add(prediction, received_at.timestamp())
+            if "collected" in changed:
+                # One row per reading (each at its own time); a status
+                # message adds one row with the latest reading
+                if "sensor" in changed:
+                    collected = [(time_local, temp, hum, pot) for _, time_local, temp, hum, pot in rows]
+                else:
+                    collected = [(np.datetime64(received_at), sensor_data.get("temp", 0),
+                                  sensor_data.get("hum", 0), sensor_data.get("pot", 0))]
+                for time_local, temp, hum, pot in collected:
+                    collected_data.append((
+                        np.datetime64(time_local, "s"),
+                        device_id,
+                        temp,
+                        hum,
+                        pot,
+                        sensor_data.get("prediction", "N/A"),
+                        event_id,
+                    ))
+            state.update(
+                device_ids=device_ids,
+                seq=bump(snap["seq"], *(key for key in changed if key != "sensor"))
+            )
+        
+        # Spill evicted collected rows to disk outside the write section
+        collected_data.flush_spill()
+        
+        if history_writer is not None and "sensor" in changed:
+            history_writer.append_many((ts, device_id, temp, hum, pot) for ts, _, temp, hum, pot in rows)
         
     except Exception as e:
         print(f"❌ Error: {e}")
 
+# ===============================
+# Shared Backend Sync
+# ===============================
+def shared_sync_loop():
+    """
+    Tail the ingest log and replay it through handle_message
+    
+    This thread is the state's single writer in shared mode.
+    """
+    global collection_active
+    wait_for_db(DB_PATH)
+    db = TelemetryDB(DB_PATH, readonly=True)
+    replay_until = db.latest_id()
+    last_id = max(0, replay_until - REPLAY_ON_START)
+    connected = None
+    print(f"🗄️ Following shared telemetry log: {DB_PATH}")
+    
+    while True:
+        try:
+            status = db.get_status()
+            alive = time.time() - status.get("status_ts", 0) < INGEST_STALE_AFTER
+            now_connected = bool(status.get("mqtt_connected")) and alive
+            if now_connected != connected:
+                connected = now_connected
+                set_connected(connected)
+            collection_active = bool(status.get("collection_active", False))
+            
+            rows = db.events_after(last_id)
+            for event_id, ts_ms, topic, payload in rows:
+                handle_message(topic, bytes(payload), datetime.fromtimestamp(ts_ms / 1000),
+                               replay=event_id <= replay_until, event_id=event_id)
+                last_id = event_id
+            if len(rows) == 0:
+                time.sleep(SYNC_INTERVAL)
+        except Exception as e:
+            print(f"❌ Sync error: {e}")
+            time.sleep(SYNC_INTERVAL)
+
 # ===============================
 # Initialize MQTT
 # ===============================
-mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=CLIENT_ID, clean_session=True, protocol=mqtt.MQTTv311)
+mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=f"{CLIENT_ID}_{os.getpid()}", clean_session=True, protocol=mqtt.MQTTv311)
 mqtt_client.username_pw_set(MQTT_USER, MQTT_PASS)
-mqtt_client.on_connect = on_connect
-mqtt_client.on_disconnect = on_disconnect
-mqtt_client.on_message = on_message
+if DASHBOARD_BACKEND == "shared":
+    # Publish-only client for the LED/buzzer buttons; telemetry comes from the log
+    threading.Thread(target=shared_sync_loop, name="shared-sync", daemon=True).start()
+else:
+    mqtt_client.on_connect = on_connect
+    mqtt_client.on_disconnect = on_disconnect
+    mqtt_client.on_message = on_message
 mqtt_client.connect(BROKER, PORT, keepalive=60)
 mqtt_client.loop_start()
-print("🚀 MQTT Client Started")
+print(f"🚀 MQTT Client Started ({DASHBOARD_BACKEND} backend)")
 
 # ===============================
 # Dash App
 # ===============================
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.CYBORG], suppress_callback_exceptions=True)
 app.title = "SIC7 IoT Dashboard"
+server = app.server  # WSGI entry point for gunicorn
 
 # Custom CSS for better layout
 app.index_string = '''
@@ -299,6 +574,10 @@ app.index_string = '''
 app.layout = html.Div([
     dcc.Interval(id='interval', interval=1000),
     dcc.Store(id='sidebar-state', data={'collapsed': False}),
+    dcc.Store(id='dashboard-seq'),   # seq counters this browser has rendered
+    dcc.Store(id='chart-cursor'),    # device log rows this browser's chart holds
+    dcc.Store(id='label-set'),       # labels the dashboard should show
+    dcc.Store(id='label-components'),  # labels the per-label components were built for
     
     html.Div([
         # Sidebar
@@ -321,9 +600,23 @@ app.layout = html.Div([
                     
                     html.Hr(style={'borderColor': '#2d3748', 'margin': '20px 0'}),
                     
+                    # Device selection
+                    html.H6("📟 Device", style={'color': '#00d4ff', 'marginBottom': '15px'}),
+                    dcc.Dropdown(id="device-select", clearable=False, placeholder="Waiting for devices...",
+                                 style={'color': '#000'}),
+                    
+                    html.Hr(style={'borderColor': '#2d3748', 'margin': '20px 0'}),
+                    
                     # ML Stats Summary
-                    html.H6("🤖 ML Stats", style={'color': '#00d4ff', 'marginBottom': '15px'}),
-                    html.Div(id="sidebar-ml-stats"),
+                    html.H6("🤖 Status Updates", style={'color': '#00d4ff', 'marginBottom': '15px'}),
+                    html.Div([
+                        html.Div([
+                            html.Span("Total: ", style={'color': '#888'}),
+                            html.Span(id="sidebar-ml-total", style={'color': '#00d4ff', 'fontWeight': '700', 'fontSize': '1.2rem'})
+                        ], style={'marginBottom': '8px'}),
+                        html.Div(id="sidebar-ml-labels"),
+                        html.Div(id="sidebar-ml-rate", style={'color': '#888', 'fontSize': '0.8rem', 'marginTop': '8px'})
+                    ], id="sidebar-ml-stats"),
                     
                     html.Hr(style={'borderColor': '#2d3748', 'margin': '20px 0'}),
                     
@@ -396,7 +689,13 @@ app.layout = html.Div([
             dbc.Row([
                 dbc.Col([
                     html.Div([
-                        html.H5("📈 Temperature & Humidity Trends", style={'color': '#00d4ff', 'marginBottom': '15px'}),
+                        html.Div([
+                            html.H5("📈 Temperature & Humidity Trends", style={'color': '#00d4ff', 'margin': '0'}),
+                            dcc.Dropdown(id="history-range", value="live", clearable=False, searchable=False,
+                                         options=[{"label": label, "value": key} for key, (label, _) in HISTORY_RANGES.items()],
+                                         style={'color': '#000', 'width': '170px'}),
+                        ], style={'display': 'flex', 'justifyContent': 'space-between', 'alignItems': 'center',
+                                  'marginBottom': '15px'}),
                         dcc.Graph(id="temp-hum-chart", config={'displayModeBar': False}, style={'height': '300px'})
                     ], className="chart-card")
                 ], width=12),
@@ -406,14 +705,31 @@ app.layout = html.Div([
             dbc.Row([
                 dbc.Col([
                     html.Div([
-                        html.H5("🤖 ML Prediction Distribution", style={'color': '#00d4ff', 'marginBottom': '15px'}),
+                        html.Div([
+                            html.H5("🤖 Published Status Distribution", style={'color': '#00d4ff', 'margin': '0'}),
+                            dcc.Dropdown(id="stats-window", value="all", clearable=False, searchable=False,
+                                         options=[{"label": name, "value": key} for key, name in STATS_WINDOW_NAMES.items()],
+                                         style={'color': '#000', 'width': '150px'}),
+                        ], style={'display': 'flex', 'justifyContent': 'space-between', 'alignItems': 'center',
+                                  'marginBottom': '15px'}),
                         dcc.Graph(id="ml-pie-chart", config={'displayModeBar': False}, style={'height': '300px'})
                     ], className="chart-card")
                 ], width=6),
                 dbc.Col([
                     html.Div([
                         html.H5("📊 Prediction Statistics", style={'color': '#00d4ff', 'marginBottom': '15px'}),
-                        html.Div(id="ml-stats-detail")
+                        html.Div([
+                            html.P(id="ml-stats-empty", style={'textAlign': 'center', 'color': '#888', 'marginTop': '80px'}),
+                            html.Div([
+                                html.Div(id="ml-stats-bars"),
+                                html.Hr(style={'borderColor': '#2d3748'}),
+                                html.Div([
+                                    html.Strong("Last Prediction: ", style={'color': '#888'}),
+                                    html.Span(id="ml-last-time", style={'color': '#00d4ff'})
+                                ]),
+                                html.Div(id="ml-rate", style={'color': '#00d4ff'})
+                            ], id="ml-stats-body")
+                        ], id="ml-stats-detail")
                     ], className="chart-card")
                 ], width=6),
             ])
@@ -424,6 +740,81 @@ app.layout = html.Div([
 # ===============================
 # Callbacks
 # ===============================
+def label_color(label):
+    """Chart color of a prediction label (known labels keep their colors)"""
+    if label in LABEL_COLORS:
+        return LABEL_COLORS[label]
+    return EXTRA_COLORS[sum(map(ord, label)) % len(EXTRA_COLORS)]
+
+def label_icon(label):
+    return LABEL_ICONS.get(label, "🏷️")
+
+def current_labels():
+    """Deployed labels, then any other label that was actually published"""
+    labels = list(deployed_labels())
+    seen = state.read(lambda: [label for label in status_stats.labels if status_stats.counts[label]])
+    return labels + [label for label in seen if label not in labels]
+
+def build_pie_figure(labels, values):
+    fig_pie = go.Figure()
+    fig_pie.add_trace(go.Pie(
+        labels=labels,
+        values=values,
+        marker=dict(colors=[label_color(label) for label in labels]),
+        hole=0.5,
+        textposition='inside',
+        textfont=dict(size=14, color='white'),
+        sort=False
+    ))
+    fig_pie.update_layout(
+        template='plotly_dark',
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        height=300,
+        margin=dict(l=20, r=20, t=20, b=20),
+        showlegend=True,
+        legend=dict(orientation="v", yanchor="middle", y=0.5, xanchor="left", x=1.1)
+    )
+    return fig_pie
+
+# Label set: checked every tick, but only a change rebuilds anything
+@app.callback(
+    Output("label-set", "data"),
+    Input("interval", "n_intervals"),
+    State("label-set", "data")
+)
+def sync_label_set(n, labels):
+    current = current_labels()
+    return no_update if current == labels else current
+
+# Per-label components, built once per label set; update_dashboard only
+# fills in their values (pattern-matching ids)
+@app.callback(
+    Output("sidebar-ml-labels", "children"),
+    Output("ml-stats-bars", "children"),
+    Output("label-components", "data"),
+    Input("label-set", "data")
+)
+def build_label_components(labels):
+    labels = labels or []
+    sidebar = [
+        html.Div([
+            html.Span(f"{label_icon(label)} ", style={'fontSize': '1rem'}),
+            html.Span(id={"type": "label-count", "label": label}, style={'color': label_color(label), 'fontSize': '0.9rem'})
+        ], style={'marginBottom': '5px'})
+        for label in labels
+    ]
+    bars = [
+        html.Div([
+            html.Div(f"{label_icon(label)} {label}", style={'fontSize': '1.1rem', 'marginBottom': '5px'}),
+            dbc.Progress(id={"type": "label-bar", "label": label}, value=0, color=label_color(label),
+                         className="mb-3", style={'height': '25px'})
+        ], style={'marginBottom': '20px'})
+        for label in labels
+    ]
+    # update_dashboard fills the new components once they are in the page
+    return sidebar, bars, labels
+
 
 # Sidebar toggle
 @app.callback(
@@ -439,26 +830,80 @@ def toggle_sidebar(n, state):
         return "sidebar collapsed" if state['collapsed'] else "sidebar", state
     return "sidebar", state
 
+# Device list; selects the first device once one has reported
+@app.callback(
+    Output("device-select", "options"),
+    Output("device-select", "value"),
+    Input("interval", "n_intervals"),
+    State("device-select", "options"),
+    State("device-select", "value")
+)
+def update_device_options(n, options, value):
+    device_ids = state["device_ids"]
+    if options is not None and len(options) == len(device_ids) and (value is not None or not device_ids):
+        return no_update, no_update
+    if value is None and device_ids:
+        value = device_ids[0]
+    return [{"label": device_id, "value": device_id} for device_id in device_ids], value
+
 # Main dashboard update
+#
+# Each output only depends on some of the counters in `seq` (or on the
+# selected device's version); the browser keeps the counters it last
+# rendered in 'dashboard-seq', and outputs whose counters did not move are
+# answered with no_update.
 @app.callback(
     [Output("sidebar-status", "children"),
      Output("sidebar-time", "children"),
-     Output("sidebar-ml-stats", "children"),
+     Output("sidebar-ml-total", "children"),
+     Output("sidebar-ml-rate", "children"),
+     Output({"type": "label-count", "label": ALL}, "children"),
      Output("temp-metric", "children"),
      Output("temp-label", "children"),
      Output("hum-metric", "children"),
      Output("hum-label", "children"),
      Output("pred-metric", "children"),
      Output("pred-label", "children"),
-     Output("temp-hum-chart", "figure"),
      Output("ml-pie-chart", "figure"),
-     Output("ml-stats-detail", "children"),
-     Output("collect-status", "children")],
-    Input("interval", "n_intervals")
+     Output({"type": "label-bar", "label": ALL}, "value"),
+     Output({"type": "label-bar", "label": ALL}, "label"),
+     Output("ml-stats-empty", "children"),
+     Output("ml-stats-body", "style"),
+     Output("ml-last-time", "children"),
+     Output("ml-rate", "children"),
+     Output("collect-status", "children"),
+     Output("dashboard-seq", "data")],
+    Input("interval", "n_intervals"),
+    Input("device-select", "value"),
+    Input("stats-window", "value"),
+    Input("label-components", "data"),
+    State("dashboard-seq", "data"),
+    State({"type": "label-count", "label": ALL}, "id"),
+    State({"type": "label-bar", "label": ALL}, "id")
 )
-def update_dashboard(n):
+def update_dashboard(n, device_id, stats_window, label_set, seen, count_ids, bar_ids):
+    # One consistent snapshot for the whole render
+    snap = state.snapshot()
+    device = devices.get(device_id)
+    version, sensor_data = device.current if device is not None else (0, DEFAULT_SENSOR_DATA)
+    current = dict(snap["seq"], device=device_id, device_version=version, stats_window=stats_window,
+                   labels=label_set)
+    # Windowed counts and rates change as statuses age out, not only on
+    # new ones (the sidebar rate always uses a window)
+    current["stats_tick"] = int(time.time() // STATS_REFRESH_S)
+    seen = seen or {}
+    changed = {key: seen.get(key) != value for key, value in current.items()}
+    
+    # Time
+    sidebar_time = f"🕐 {datetime.now().strftime('%H:%M:%S')}"
+    
+    if not any(changed.values()):
+        # Wildcard (ALL) outputs take one value per matched component
+        return (no_update, sidebar_time, no_update, no_update, [no_update] * len(count_ids)) + (no_update,) * 7 \
+            + ([no_update] * len(bar_ids), [no_update] * len(bar_ids)) + (no_update,) * 6
+    
     # Sidebar status
-    if mqtt_connected:
+    if snap["mqtt_connected"]:
         sidebar_status = html.Div([
             html.Span("🟢 Connected", className="status-badge", 
                      style={'background': 'rgba(81, 207, 102, 0.2)', 'color': '#51cf66'})
@@ -469,28 +914,12 @@ def update_dashboard(n):
                      style={'background': 'rgba(255, 107, 107, 0.2)', 'color': '#ff6b6b'})
         ])
     
-    # Time
-    sidebar_time = f"🕐 {datetime.now().strftime('%H:%M:%S')}"
-    
-    # Sidebar ML stats
-    sidebar_ml = html.Div([
-        html.Div([
-            html.Span("Total: ", style={'color': '#888'}),
-            html.Span(f"{ml_stats['total_predictions']}", style={'color': '#00d4ff', 'fontWeight': '700', 'fontSize': '1.2rem'})
-        ], style={'marginBottom': '8px'}),
-        html.Div([
-            html.Span("🔥 ", style={'fontSize': '1rem'}),
-            html.Span(f"Panas: {ml_stats['panas_count']}", style={'color': '#ff6b6b', 'fontSize': '0.9rem'})
-        ], style={'marginBottom': '5px'}),
-        html.Div([
-            html.Span("🟡 ", style={'fontSize': '1rem'}),
-            html.Span(f"Hangat: {ml_stats['hangat_count']}", style={'color': '#ffd43b', 'fontSize': '0.9rem'})
-        ], style={'marginBottom': '5px'}),
-        html.Div([
-            html.Span("❄️ ", style={'fontSize': '1rem'}),
-            html.Span(f"Dingin: {ml_stats['dingin_count']}", style={'color': '#4dabf7', 'fontSize': '0.9rem'})
-        ])
-    ])
+    # Sidebar ML stats (all time)
+    stats = state.read(status_stats.summary)
+    rate_key = next(iter(STATS_WINDOWS))   # Shortest window
+    sidebar_total = f"{stats['total']}"
+    sidebar_rate = f"⚡ {stats['windows'][rate_key]['rate_per_min']:.1f}/min ({STATS_WINDOW_NAMES[rate_key].lower()})"
+    label_counts = [f"{i['label']}: {stats['counts'].get(i['label'], 0)}" for i in count_ids]
     
     # Metrics
     temp = sensor_data.get("temp", 0)
@@ -502,32 +931,163 @@ def update_dashboard(n):
     hum_label = "💧 High" if hum > 70 else "🏜️ Low" if hum < 40 else "💦 Normal"
     
     prediction = sensor_data.get("prediction", "N/A")
-    pred_icon = {"Panas": "🔥", "Hangat": "🟡", "Dingin": "❄️", "N/A": "⏳"}.get(prediction, "⏳")
-    pred_label = f"{pred_icon} {ml_stats['total_predictions']} predictions"
+    pred_icon = "⏳" if prediction == "N/A" else label_icon(prediction)
+    pred_label = f"{pred_icon} {stats['total']} status updates"
+    
+    # Distribution for the selected window
+    if stats_window == "all":
+        counts, total, rate = stats["counts"], stats["total"], None
+    else:
+        window = stats["windows"][stats_window]
+        counts, total, rate = window["counts"], window["total"], window["rate_per_min"]
+    labels = label_set or []
+    
+    # ML Pie Chart: rebuilt for a new label set, otherwise only its values change
+    values = [counts.get(label, 0) for label in labels]
+    if changed["labels"]:
+        fig_pie = build_pie_figure(labels, values)
+    else:
+        fig_pie = Patch()
+        fig_pie["data"][0]["values"] = values
+    
+    # ML Stats Detail
+    shares = [counts.get(i["label"], 0) / total * 100 if total else 0 for i in bar_ids]
+    bar_values = shares
+    bar_labels = [f"{share:.1f}%" if share else "" for share in shares]
+    if stats["total"] == 0:
+        empty_text = "⏳ No status updates yet..."
+    elif total == 0:
+        empty_text = f"⏳ No status updates in the {STATS_WINDOW_NAMES[stats_window].lower()}"
+    else:
+        empty_text = ""
+    body_style = {'display': 'block' if total else 'none'}
+    last_time = datetime.fromtimestamp(stats["last_time"]).strftime("%H:%M:%S") if stats["last_time"] else "N/A"
+    rate_text = "" if rate is None else f"{rate:.1f} status updates/min ({total} in {STATS_WINDOW_NAMES[stats_window].lower()})"
+    
+    # Collection status
+    collect_text = f"📦 {collected_data.total_appended} samples"
+    
+    if not changed["connection"]:
+        sidebar_status = no_update
+    device_changed = changed["device"] or changed["device_version"]
+    if not device_changed:
+        temp_text = temp_label = hum_text = hum_label = prediction = no_update
+    if not (changed["prediction"] or changed["labels"]):
+        sidebar_total = no_update
+        label_counts = [no_update] * len(count_ids)
+    if not (changed["prediction"] or changed["stats_tick"] or changed["labels"]):
+        sidebar_rate = no_update
+    window_aged = changed["stats_tick"] and stats_window != "all"
+    if not (changed["prediction"] or changed["stats_window"] or window_aged or changed["labels"]):
+        fig_pie = empty_text = body_style = last_time = rate_text = no_update
+        bar_values = bar_labels = [no_update] * len(bar_ids)
+    if not (device_changed or changed["prediction"]):
+        pred_label = no_update
+    if not changed["collected"]:
+        collect_text = no_update
     
-    # Temp & Humidity Chart
+    return (sidebar_status, sidebar_time, sidebar_total, sidebar_rate, label_counts,
+            temp_text, temp_label, hum_text, hum_label,
+            prediction, pred_label,
+            fig_pie, bar_values, bar_labels, empty_text, body_style, last_time, rate_text,
+            collect_text, current)
+
+# Temp & Humidity Chart
+def copy_trend_rows(device_id, relayout_data=None):
+    """
+    Copy of a device's log rows to plot, and the position they cover
+    
+    Runs under state.read(), so it only slices and copies; the expensive
+    downsampling happens afterwards on the private copy.
+    """
+    device = devices.get(device_id)
+    if device is None:
+        return EMPTY_LOG, {"device": device_id, "total": 0}
+    log = device.log.view()
+    cursor = {"device": device_id, "total": device.log.total_appended}
+    x_range = visible_x_range(relayout_data)
+    if x_range is not None:
+        # Zoomed in: re-query full-resolution points for the visible range only
+        lo, hi = np.searchsorted(log["time"], x_range[0]), np.searchsorted(log["time"], x_range[1], side="right")
+        log = log[max(lo - 1, 0):hi + 1]
+    return log.copy(), cursor
+
+def history_trend_rows(device_id, range_key, relayout_data=None):
+    """
+    A device's stored history for a range, at the resolution that fits it
+    
+    Zoomed in, only the visible window is read, so zooming into a week
+    switches from hourly rollups to minutes and then to raw readings.
+    
+    Returns:
+        (tier: "raw", "1m" or "1h", DataFrame from TelemetryStore.read_frame)
+    """
+    x_range = visible_x_range(relayout_data)
+    if x_range is not None:
+        start, end = to_ms(x_range[0]), to_ms(x_range[1]) + 1
+    else:
+        end = int(time.time() * 1000)
+        start = end - HISTORY_RANGES[range_key][1] * 1000
+    tier = pick_tier(start, end, HISTORY_MAX_POINTS)
+    return tier, history.read_frame(start, end, devices=[device_id], tier=tier)
+
+def build_trend_figure(device_id, relayout_data=None, range_key="live"):
+    """
+    Full trend figure for one device, downsampled to CHART_MAX_POINTS per trace
+    
+    Returns:
+        (figure, cursor: device and log position the figure is current up to)
+    """
+    bands = None
+    if range_key == "live" or device_id is None:
+        log, cursor = state.read(lambda: copy_trend_rows(device_id, relayout_data))
+        x, temps, hums = log["time"], log["temp"], log["hum"]
+    else:
+        # History views are drawn once and not extended
+        tier, df = history_trend_rows(device_id, range_key, relayout_data)
+        cursor = None
+        x = df["timestamp"].to_numpy()
+        if tier == "raw":
+            temps, hums = df["temp"].to_numpy(), df["hum"].to_numpy()
+        else:
+            temps, hums = df["temp_mean"].to_numpy(), df["hum_mean"].to_numpy()
+            bands = [(df["temp_min"].to_numpy(), df["temp_max"].to_numpy(), 'rgba(255, 107, 107, 0.2)'),
+                     (df["hum_min"].to_numpy(), df["hum_max"].to_numpy(), 'rgba(77, 171, 247, 0.2)')]
+    temp_x, temp_y = downsample(x, temps, CHART_MAX_POINTS, DOWNSAMPLE_METHOD)
+    hum_x, hum_y = downsample(x, hums, CHART_MAX_POINTS, DOWNSAMPLE_METHOD)
     fig_temp_hum = go.Figure()
-    if len(data_log["time"]) > 0:
-        fig_temp_hum.add_trace(go.Scatter(
-            x=list(data_log["time"]),
-            y=list(data_log["temp"]),
-            mode='lines+markers',
-            name='Temperature (°C)',
-            line=dict(color='#ff6b6b', width=3, shape='spline'),
-            marker=dict(size=6),
-            fill='tonexty',
-            fillcolor='rgba(255, 107, 107, 0.1)'
-        ))
-        fig_temp_hum.add_trace(go.Scatter(
-            x=list(data_log["time"]),
-            y=list(data_log["hum"]),
-            mode='lines+markers',
-            name='Humidity (%)',
-            line=dict(color='#4dabf7', width=3, shape='spline'),
-            marker=dict(size=6),
-            fill='tonexty',
-            fillcolor='rgba(77, 171, 247, 0.1)'
-        ))
+    # Rollups: shade each bucket's min..max behind the mean line (drawn
+    # first so the lines sit on top; history views are never extended)
+    for low, high, color in bands or []:
+        low_x, low_y = downsample(x, low, CHART_MAX_POINTS, "minmax")
+        high_x, high_y = downsample(x, high, CHART_MAX_POINTS, "minmax")
+        fig_temp_hum.add_trace(go.Scatter(x=low_x, y=low_y, mode='lines', line=dict(width=0),
+                                          showlegend=False, hoverinfo='skip'))
+        fig_temp_hum.add_trace(go.Scatter(x=high_x, y=high_y, mode='lines', line=dict(width=0),
+                                          fill='tonexty', fillcolor=color, showlegend=False, hoverinfo='skip'))
+    # The bands replace the area fill (tonexty would fill to the last band)
+    line_fill = 'none' if bands else 'tonexty'
+    # Both traces always exist so extendData has something to append to
+    fig_temp_hum.add_trace(go.Scatter(
+        x=temp_x,
+        y=temp_y,
+        mode='lines+markers',
+        name='Temperature (°C)',
+        line=dict(color='#ff6b6b', width=3, shape='spline'),
+        marker=dict(size=6),
+        fill=line_fill,
+        fillcolor='rgba(255, 107, 107, 0.1)'
+    ))
+    fig_temp_hum.add_trace(go.Scatter(
+        x=hum_x,
+        y=hum_y,
+        mode='lines+markers',
+        name='Humidity (%)',
+        line=dict(color='#4dabf7', width=3, shape='spline'),
+        marker=dict(size=6),
+        fill=line_fill,
+        fillcolor='rgba(77, 171, 247, 0.1)'
+    ))
     fig_temp_hum.update_layout(
         template='plotly_dark',
         paper_bgcolor='rgba(0,0,0,0)',
@@ -535,101 +1095,94 @@ def update_dashboard(n):
         height=300,
         margin=dict(l=40, r=20, t=10, b=40),
         hovermode='x unified',
+        uirevision=f'trend-{range_key}',  # keep the user's zoom across updates
         showlegend=True,
         legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
         xaxis=dict(showgrid=True, gridcolor='#2d3748'),
         yaxis=dict(showgrid=True, gridcolor='#2d3748')
     )
     
-    # ML Pie Chart
-    fig_pie = go.Figure()
-    if ml_stats["total_predictions"] > 0:
-        fig_pie.add_trace(go.Pie(
-            labels=['Panas', 'Hangat', 'Dingin'],
-            values=[ml_stats['panas_count'], ml_stats['hangat_count'], ml_stats['dingin_count']],
-            marker=dict(colors=['#ff6b6b', '#ffd43b', '#4dabf7']),
-            hole=0.5,
-            textposition='inside',
-            textfont=dict(size=14, color='white')
-        ))
-    fig_pie.update_layout(
-        template='plotly_dark',
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        height=300,
-        margin=dict(l=20, r=20, t=20, b=20),
-        showlegend=True,
-        legend=dict(orientation="v", yanchor="middle", y=0.5, xanchor="left", x=1.1)
-    )
+    return fig_temp_hum, cursor
+
+# Full (downsampled) render on page load, device or range switch and every zoom/reset
+@app.callback(
+    Output("temp-hum-chart", "figure"),
+    Output("chart-cursor", "data"),
+    Input("temp-hum-chart", "relayoutData"),
+    Input("device-select", "value"),
+    Input("history-range", "value")
+)
+def render_trend_chart(relayout_data, device_id, range_key):
+    if dash.callback_context.triggered_id == "history-range":
+        # The zoom belonged to the previous range
+        relayout_data = None
+    return build_trend_figure(device_id, relayout_data, range_key)
+
+# Per tick: append only the rows that arrived since the last render
+@app.callback(
+    Output("temp-hum-chart", "extendData"),
+    Output("temp-hum-chart", "figure", allow_duplicate=True),
+    Output("chart-cursor", "data", allow_duplicate=True),
+    Input("interval", "n_intervals"),
+    State("chart-cursor", "data"),
+    State("temp-hum-chart", "relayoutData"),
+    State("device-select", "value"),
+    State("history-range", "value"),
+    prevent_initial_call=True
+)
+def extend_trend_chart(n, cursor, relayout_data, device_id, range_key):
+    device = devices.get(device_id)
+    if (range_key != "live" or cursor is None or device is None or cursor["device"] != device_id
+            or device.log.total_appended == cursor["total"] or visible_x_range(relayout_data) is not None):
+        # Nothing new, a device switch still rendering, or zoomed in
+        # (the zoomed view is left as drawn)
+        return no_update, no_update, no_update
     
-    # ML Stats Detail
-    total = ml_stats["total_predictions"]
-    if total > 0:
-        panas_pct = (ml_stats['panas_count'] / total) * 100
-        hangat_pct = (ml_stats['hangat_count'] / total) * 100
-        dingin_pct = (ml_stats['dingin_count'] / total) * 100
-        
-        ml_detail = html.Div([
-            html.Div([
-                html.Div("🔥 Panas", style={'fontSize': '1.1rem', 'marginBottom': '5px'}),
-                dbc.Progress(value=panas_pct, color="danger", className="mb-3", 
-                           style={'height': '25px'}, label=f"{panas_pct:.1f}%")
-            ], style={'marginBottom': '20px'}),
-            html.Div([
-                html.Div("🟡 Hangat", style={'fontSize': '1.1rem', 'marginBottom': '5px'}),
-                dbc.Progress(value=hangat_pct, color="warning", className="mb-3",
-                           style={'height': '25px'}, label=f"{hangat_pct:.1f}%")
-            ], style={'marginBottom': '20px'}),
-            html.Div([
-                html.Div("❄️ Dingin", style={'fontSize': '1.1rem', 'marginBottom': '5px'}),
-                dbc.Progress(value=dingin_pct, color="info", className="mb-3",
-                           style={'height': '25px'}, label=f"{dingin_pct:.1f}%")
-            ], style={'marginBottom': '20px'}),
-            html.Hr(style={'borderColor': '#2d3748'}),
-            html.Div([
-                html.Strong("Last Prediction: ", style={'color': '#888'}),
-                html.Span(ml_stats['last_prediction_time'] or "N/A", style={'color': '#00d4ff'})
-            ])
-        ])
-    else:
-        ml_detail = html.Div([
-            html.P("⏳ No predictions yet...", style={'textAlign': 'center', 'color': '#888', 'marginTop': '80px'})
-        ])
+    def new_rows():
+        log = device.log
+        total = log.total_appended
+        if total - cursor["total"] > len(log):
+            return None, total
+        # .tolist() copies out of the ring buffer
+        rows = log.view(last=total - cursor["total"])
+        return (rows["time"].astype(str).tolist(), rows["temp"].tolist(), rows["hum"].tolist()), total
     
-    # Collection status
-    collect_text = f"📦 {len(collected_data)} samples"
+    rows, total = state.read(new_rows)
+    if rows is None:
+        # Rows were evicted before this browser saw them: redraw instead
+        figure, cursor = build_trend_figure(device_id, relayout_data)
+        return no_update, figure, cursor
     
-    return (sidebar_status, sidebar_time, sidebar_ml,
-            temp_text, temp_label, hum_text, hum_label,
-            prediction, pred_label,
-            fig_temp_hum, fig_pie, ml_detail, collect_text)
+    times, temps, hums = rows
+    update = {"x": [times, times], "y": [temps, hums]}
+    return (update, [0, 1], CHART_MAX_POINTS), no_update, {"device": device_id, "total": total}
 
 # LED/Buzzer Control Callbacks
-@app.callback(Output("btn-red", "children"), Input("btn-red", "n_clicks"), prevent_initial_call=True)
-def control_red(n):
+@app.callback(Output("btn-red", "children"), Input("btn-red", "n_clicks"), State("device-select", "value"), prevent_initial_call=True)
+def control_red(n, device_id):
     if n:
-        mqtt_client.publish(TOPIC_PUB, "red:on" if n % 2 == 1 else "red:off")
+        mqtt_client.publish(control_topic(device_id or LEGACY_DEVICE), "red:on" if n % 2 == 1 else "red:off")
         return "🔴 RED ON" if n % 2 == 1 else "🔴 RED OFF"
     return "🔴 RED LED"
 
-@app.callback(Output("btn-yellow", "children"), Input("btn-yellow", "n_clicks"), prevent_initial_call=True)
-def control_yellow(n):
+@app.callback(Output("btn-yellow", "children"), Input("btn-yellow", "n_clicks"), State("device-select", "value"), prevent_initial_call=True)
+def control_yellow(n, device_id):
     if n:
-        mqtt_client.publish(TOPIC_PUB, "yellow:on" if n % 2 == 1 else "yellow:off")
+        mqtt_client.publish(control_topic(device_id or LEGACY_DEVICE), "yellow:on" if n % 2 == 1 else "yellow:off")
         return "🟡 YELLOW ON" if n % 2 == 1 else "🟡 YELLOW OFF"
     return "🟡 YELLOW LED"
 
-@app.callback(Output("btn-green", "children"), Input("btn-green", "n_clicks"), prevent_initial_call=True)
-def control_green(n):
+@app.callback(Output("btn-green", "children"), Input("btn-green", "n_clicks"), State("device-select", "value"), prevent_initial_call=True)
+def control_green(n, device_id):
     if n:
-        mqtt_client.publish(TOPIC_PUB, "green:on" if n % 2 == 1 else "green:off")
+        mqtt_client.publish(control_topic(device_id or LEGACY_DEVICE), "green:on" if n % 2 == 1 else "green:off")
         return "🟢 GREEN ON" if n % 2 == 1 else "🟢 GREEN OFF"
     return "🟢 GREEN LED"
 
-@app.callback(Output("btn-buzzer", "children"), Input("btn-buzzer", "n_clicks"), prevent_initial_call=True)
-def control_buzzer(n):
+@app.callback(Output("btn-buzzer", "children"), Input("btn-buzzer", "n_clicks"), State("device-select", "value"), prevent_initial_call=True)
+def control_buzzer(n, device_id):
     if n:
-        mqtt_client.publish(TOPIC_PUB, "buzzer:on" if n % 2 == 1 else "buzzer:off")
+        mqtt_client.publish(control_topic(device_id or LEGACY_DEVICE), "buzzer:on" if n % 2 == 1 else "buzzer:off")
         return "🔔 BUZZER ON" if n % 2 == 1 else "🔔 BUZZER OFF"
     return "🔔 BUZZER"
 
@@ -638,15 +1191,77 @@ def control_buzzer(n):
 def toggle_collection(n):
     global collection_active
     if n:
-        collection_active = not collection_active
+        if DASHBOARD_BACKEND == "shared":
+            # Toggle the shared flag atomically; every worker picks it up on its
+            # next poll. Reader connection: ingest.py owns the schema
+            db = TelemetryDB(DB_PATH, readonly=True)
+            try:
+                collection_active = db.toggle_status("collection_active")
+            finally:
+                db.close()
+        else:
+            collection_active = not collection_active
         return "success" if collection_active else "primary"
     return "primary"
 
 # CSV Download
+def write_collected(rows):
+    """Append collected rows to COLLECTED_DATASET; False if the write failed"""
+    try:
+        if len(rows):
+            written = write_dataset(rows.drop(columns=["event"]), COLLECTED_DATASET)
+            print(f"📦 Stored {written} rows in dataset '{COLLECTED_DATASET}'")
+        return True
+    except Exception as e:
+        print(f"❌ Error writing dataset: {e}")
+        return False
+
+def store_collected(df, total):
+    """
+    Write the collected rows no earlier download stored to COLLECTED_DATASET
+    
+    In shared mode every worker collects its own copy of the same live
+    events, so what is stored is tracked across workers: the highest
+    stored event id lives in the shared status table and is claimed with
+    a compare-and-set before writing. In mqtt mode it is a count of
+    collected_data rows.
+    
+    Args:
+        df: Every collected row (collected_data.to_frame(include_spilled=True))
+        total: collected_data.total_appended when df was taken
+    """
+    global collected_stored
+    with collected_store_lock:
+        if DASHBOARD_BACKEND != "shared":
+            if write_collected(df.iloc[max(0, collected_stored - (total - len(df))):]):
+                collected_stored = total
+            return
+        
+        newest = int(df["event"].max())
+        db = TelemetryDB(DB_PATH, readonly=True)
+        try:
+            while True:
+                stored = db.get_status().get(COLLECTED_STORED_KEY)
+                if newest <= (stored or 0):
+                    return
+                if db.compare_and_set_status(COLLECTED_STORED_KEY, stored, newest):
+                    break
+            if not write_collected(df[df["event"] > (stored or 0)]):
+                # Give the rows back for the next download (unless another
+                # worker has stored newer ones meanwhile)
+                db.compare_and_set_status(COLLECTED_STORED_KEY, newest, stored)
+        finally:
+            db.close()
+
 @app.callback(Output("download-csv", "data"), Input("btn-download", "n_clicks"), prevent_initial_call=True)
 def download_csv(n):
-    if n and len(collected_data) > 0:
-        df = pd.DataFrame(collected_data)
+    if n and collected_data.total_appended > 0:
+        df, total = state.read(lambda: (collected_data.to_frame(include_spilled=True), collected_data.total_appended))
+        # Only rows not stored by an earlier download go into the dataset
+        store_collected(df, total)
+        # CSV stays the export format for the browser download; a missing
+        # pot is left empty
+        df = df.drop(columns=["event"]).astype({"pot": "Int32"})
         return dcc.send_data_frame(df.to_csv, f"sensor_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv", index=False)
 
 if __name__ == '__main__':
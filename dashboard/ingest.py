@@ -0,0 +1,181 @@
+import os
+import sys
+import time
+import queue
+import threading
+import paho.mqtt.client as mqtt
+from telemetry_db import TelemetryDB, DB_PATH, EVENT_RETENTION
+
+# Shared modules live in model/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "model"))
+from devices import SENSOR_SUBSCRIPTIONS, CONTROL_SUBSCRIPTIONS, parse_topic, subscribe_all
+from telemetry_store import TelemetryStore, STORE_ROOT, RETENTION_DAYS
+from payload import parse_sensor
+
+# ===============================
+# Configuration
+# ===============================
+BROKER = "broker.hivemq.com"
+PORT = 1883
+TOPICS = SENSOR_SUBSCRIPTIONS + CONTROL_SUBSCRIPTIONS   # Every device, legacy topics included
+CLIENT_ID = f"ingest_{int(time.time())}"
+MQTT_USER = "foursome"
+MQTT_PASS = "berempat"
+
+COMMIT_INTERVAL = 0.1    # Seconds between batched commits
+HEARTBEAT_INTERVAL = 5   # Seconds between liveness updates read by workers
+PRUNE_INTERVAL = 60      # Seconds between retention passes
+
+# ===============================
+# Ingest
+# ===============================
+# The only MQTT subscriber in a multi-worker deployment. Every message is
+# appended to the shared SQLite log; Dash workers started with
+# DASHBOARD_BACKEND=shared tail that log instead of connecting to the
+# broker themselves (they only write a few shared status keys, see
+# TelemetryDB). Sensor readings are also appended to the long-term
+# telemetry store (model/telemetry_store.py) for history charts and
+# preprocessing:
+#
+#   python dashboard/ingest.py
+#   DASHBOARD_BACKEND=shared gunicorn -w 4 --chdir dashboard dashboard:server
+
+pending = queue.Queue()
+
+def on_connect(client, userdata, flags, rc, properties=None):
+    if rc == 0:
+        subscribe_all(client, TOPICS)
+        print("✅ MQTT Connected")
+        print(f"📡 Subscribed to: {', '.join(TOPICS)}")
+    else:
+        print(f"❌ Connection Failed (rc={rc})")
+    pending.put(("status", rc == 0))
+
+def on_disconnect(client, userdata, flags, rc, properties=None):
+    pending.put(("status", False))
+    if rc != 0:
+        print(f"⚠️ Unexpected disconnect (rc={rc})")
+
+def on_message(client, userdata, msg):
+    # Stamp on arrival; the database write happens on the writer thread
+    pending.put(("event", (int(time.time() * 1000), msg.topic, bytes(msg.payload))))
+
+def sensor_rows(events):
+    """
+    (ts_ms, device, temp, hum, pot) for every valid sensor reading in events
+    
+    Readings of a batched payload are dated by their age relative to the
+    newest one, which is taken to have arrived with the message.
+    """
+    for ts_ms, topic, payload in events:
+        kind, device_id = parse_topic(topic)
+        if kind != "sensor":
+            continue
+        try:
+            temps, hums, pots, ages = parse_sensor(payload)
+            rows = [(ts_ms - age, device_id, temp, hum, pot)
+                    for temp, hum, pot, age in zip(temps.tolist(), hums.tolist(), pots.tolist(), ages.tolist())]
+        except Exception:
+            # One malformed message must not stop the writer thread
+            print(f"❌ Skipping invalid sensor payload on {topic}: {payload[:80]!r}")
+            continue
+        yield from rows
+
+def writer_loop(db, store, stop):
+    """
+    Drain the queue and commit in batches (the only thread touching db and store)
+    
+    A failed write is logged and the loop carries on: the thread must
+    outlive a full disk or a locked database, or the queue would grow
+    without bound while MQTT keeps filling it.
+    """
+    last_prune = last_heartbeat = time.monotonic()
+    while not stop.is_set() or not pending.empty():
+        events = []
+        deadline = time.monotonic() + COMMIT_INTERVAL
+        while True:
+            try:
+                kind, value = pending.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if kind == "event":
+                events.append(value)
+            else:
+                try:
+                    db.set_status(mqtt_connected=value, status_ts=time.time())
+                except Exception as e:
+                    print(f"❌ Error writing connection status: {e}")
+
+        if events:
+            try:
+                db.append_events(events)
+            except Exception as e:
+                print(f"❌ Error writing {len(events)} event(s) to {DB_PATH}: {e}")
+            try:
+                store.append_many(sensor_rows(events))
+            except Exception as e:
+                print(f"❌ Error writing readings to telemetry store: {e}")
+
+        if time.monotonic() - last_heartbeat > HEARTBEAT_INTERVAL:
+            try:
+                db.set_status(status_ts=time.time())
+            except Exception as e:
+                print(f"❌ Error writing heartbeat: {e}")
+            last_heartbeat = time.monotonic()
+
+        if time.monotonic() - last_prune > PRUNE_INTERVAL:
+            try:
+                db.prune(EVENT_RETENTION)
+                store.prune(RETENTION_DAYS)
+            except Exception as e:
+                print(f"❌ Error pruning old data: {e}")
+            last_prune = time.monotonic()
+
+# ===============================
+# Main Function
+# ===============================
+def main():
+    print("=" * 60)
+    print("🚀 SIC7 Telemetry Ingest")
+    print("=" * 60)
+
+    db = TelemetryDB(DB_PATH)
+    db.set_status(mqtt_connected=False, status_ts=time.time())
+    store = TelemetryStore(STORE_ROOT)
+    print(f"🗄️ Writing to: {DB_PATH}")
+    print(f"🗄️ Telemetry history: {STORE_ROOT}")
+
+    stop = threading.Event()
+    writer = threading.Thread(target=writer_loop, args=(db, store, stop), name="db-writer")
+    writer.start()
+
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=CLIENT_ID, clean_session=True,
+                         protocol=mqtt.MQTTv311)
+    client.username_pw_set(MQTT_USER, MQTT_PASS)
+    client.on_connect = on_connect
+    client.on_disconnect = on_disconnect
+    client.on_message = on_message
+
+    try:
+        client.connect(BROKER, PORT, keepalive=60)
+    except Exception as e:
+        print(f"❌ Failed to connect to MQTT broker: {e}")
+        stop.set()
+        writer.join()
+        sys.exit(1)
+
+    try:
+        client.loop_forever()
+    except KeyboardInterrupt:
+        print("\n⚠️ Interrupted by user")
+    finally:
+        client.disconnect()
+        stop.set()
+        writer.join()
+        db.set_status(mqtt_connected=False, status_ts=time.time())
+        db.close()
+        store.close()
+        print("👋 Ingest stopped")
+
+if __name__ == "__main__":
+    main()
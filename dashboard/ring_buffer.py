@@ -0,0 +1,122 @@
+import os
+import numpy as np
+import pandas as pd
+
+
+class RingBuffer:
+    """
+    Fixed-capacity, NumPy-backed buffer of records
+
+    Storage is preallocated twice over ("mirrored"): every row is written
+    at index i and i + capacity, so the live rows are always one contiguous
+    slice and view() never has to copy or concatenate.
+
+    When the buffer is full, the oldest spill_block rows are dropped, so
+    memory stays constant. With a spill_path they are copied aside first
+    and appended to that file by flush_spill(), which the owner calls
+    outside its write section (file I/O must not hold up readers).
+
+    Args:
+        capacity: Maximum number of rows kept in memory
+        dtype: NumPy (structured) dtype of one row
+        spill_path: CSV file receiving evicted rows (None = discard them)
+        spill_block: Rows evicted at once when full (default: capacity // 10)
+    """
+
+    def __init__(self, capacity, dtype, spill_path=None, spill_block=None):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = int(capacity)
+        self.dtype = np.dtype(dtype)
+        self.spill_path = spill_path
+        self.spill_block = max(1, min(self.capacity, spill_block or self.capacity // 10))
+        self._buf = np.zeros(2 * self.capacity, dtype=self.dtype)
+        self._start = 0
+        self._size = 0
+        self.total_appended = 0
+        self.spilled = 0
+        # (rows in spill_path, evicted blocks not yet written), replaced as
+        # a whole so to_frame() never sees a block in both places or neither
+        self._spill = (0, ())
+
+        if spill_path:
+            # Spill file belongs to this buffer's lifetime
+            os.makedirs(os.path.dirname(spill_path) or ".", exist_ok=True)
+            if os.path.exists(spill_path):
+                os.remove(spill_path)
+
+    def __len__(self):
+        return self._size
+
+    def append(self, row):
+        """Append one row (tuple matching dtype fields, or scalar)"""
+        if self._size == self.capacity:
+            self._evict(self.spill_block)
+        idx = (self._start + self._size) % self.capacity
+        self._buf[idx] = row
+        self._buf[idx + self.capacity] = row
+        self._size += 1
+        self.total_appended += 1
+
+    def view(self, last=None):
+        """
+        Read-only view of the buffered rows, oldest first
+
+        Args:
+            last: Only the newest `last` rows (default: all)
+        """
+        end = self._start + self._size
+        begin = self._start if last is None else max(self._start, end - last)
+        v = self._buf[begin:end]
+        v.flags.writeable = False
+        return v
+
+    def column(self, name, last=None):
+        """Read-only view of one field"""
+        return self.view(last)[name]
+
+    def latest(self):
+        """Newest row, or None if empty"""
+        if self._size == 0:
+            return None
+        return self._buf[self._start + self._size - 1]
+
+    def _evict(self, n):
+        n = min(n, self._size)
+        if self.spill_path:
+            written, pending = self._spill
+            self._spill = (written, pending + (self._buf[self._start:self._start + n].copy(),))
+        self.spilled += n
+        self._start = (self._start + n) % self.capacity
+        self._size -= n
+
+    def flush_spill(self):
+        """Append evicted rows to spill_path; returns rows written"""
+        total = 0
+        while self._spill[1]:
+            written, pending = self._spill
+            block = pending[0]
+            pd.DataFrame(block).to_csv(self.spill_path, mode="a", header=written == 0, index=False)
+            self._spill = (written + len(block), pending[1:])
+            total += len(block)
+        return total
+
+    def to_frame(self, include_spilled=False):
+        """
+        Copy rows into a DataFrame
+
+        Args:
+            include_spilled: Prepend rows already spilled to disk
+        """
+        df = pd.DataFrame(self.view())
+        if include_spilled and self.spill_path and self.spilled:
+            written, pending = self._spill
+            parts = [pd.DataFrame(block) for block in pending]
+            if written and os.path.exists(self.spill_path):
+                spilled = pd.read_csv(self.spill_path, nrows=written)
+                for name in self.dtype.names or ():
+                    if self.dtype[name].kind == "M":
+                        spilled[name] = pd.to_datetime(spilled[name])
+                parts.insert(0, spilled)
+            df = pd.concat(parts + [df], ignore_index=True)
+        return df
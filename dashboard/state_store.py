@@ -0,0 +1,91 @@
+import time
+import threading
+from types import MappingProxyType
+from contextlib import contextmanager
+
+
+class StateStore:
+    """
+    Shared state with one writer (the MQTT thread) and many readers (Dash)
+
+    Two mechanisms, neither of which makes the writer wait for readers:
+
+    - Copy-on-write snapshot: small values (latest reading, stats, change
+      counters) live in an immutable mapping. update() builds a new mapping
+      and swaps the reference in one assignment, so snapshot() always
+      returns a consistent set of values without locking.
+
+    - Seqlock: larger structures mutated in place (ring buffers) are
+      changed inside writing(), which makes the version odd while the
+      write is in progress. read(fn) runs fn and retries if a write started
+      or finished meanwhile, so fn sees either the state before or after a
+      write, never half of it. fn must copy what it needs before returning.
+      Errors a concurrent write can cause in fn (IndexError, ValueError,
+      KeyError, RuntimeError) are retried too, if a write did overlap.
+
+    Nested values in the snapshot must be replaced, never mutated in place.
+    """
+
+    def __init__(self, **initial):
+        self._snapshot = MappingProxyType(dict(initial))
+        self._version = 0
+        self._writer = None
+
+    def snapshot(self):
+        """Consistent, read-only view of all snapshot values"""
+        return self._snapshot
+
+    def __getitem__(self, key):
+        return self._snapshot[key]
+
+    def _check_writer(self):
+        # Cheap guard against a second writer thread sneaking in
+        current = threading.get_ident()
+        if self._writer is None:
+            self._writer = current
+        elif self._writer != current:
+            raise RuntimeError("StateStore has a single writer thread")
+
+    def update(self, **changes):
+        """Publish a new snapshot with some values replaced (writer only)"""
+        self._check_writer()
+        new = dict(self._snapshot)
+        new.update(changes)
+        self._snapshot = MappingProxyType(new)
+
+    @contextmanager
+    def writing(self):
+        """Mark an in-place mutation of seqlock-protected data (writer only)"""
+        self._check_writer()
+        self._version += 1
+        try:
+            yield
+        finally:
+            self._version += 1
+
+    def read(self, fn, max_retries=1000):
+        """
+        Run fn and return its result, retrying until no write overlapped it
+
+        Args:
+            fn: Callable reading seqlock-protected data; must return copies
+            max_retries: Give up (RuntimeError) after this many attempts
+        """
+        for _ in range(max_retries):
+            before = self._version
+            if before % 2:
+                # Writer is mid-update; let it finish
+                time.sleep(0)
+                continue
+            try:
+                result = fn()
+            except (IndexError, ValueError, KeyError, RuntimeError):
+                # Structure changed under us in a way that broke fn (e.g.
+                # "deque mutated during iteration" from a container the
+                # writer was changing)
+                if self._version == before:
+                    raise
+                continue
+            if self._version == before:
+                return result
+        raise RuntimeError("StateStore.read could not get a consistent snapshot")
@@ -0,0 +1,135 @@
+import time
+from collections import deque
+
+
+class SlidingCounts:
+    """
+    Per-label counts over the last `window` seconds, in time buckets
+
+    The window is split into n_buckets buckets. add() increments the
+    current bucket and a running total per label, and retires buckets that
+    fell out of the window by subtracting them from the totals, so both
+    add() and counts() cost O(1) per call (amortized) regardless of how
+    many events the window holds. Resolution is one bucket: an event
+    leaves the window between window - window/n_buckets and window
+    seconds after it happened.
+
+    Args:
+        window: Window length in seconds
+        n_buckets: Buckets per window
+    """
+
+    def __init__(self, window, n_buckets=60):
+        self.window = float(window)
+        self.n_buckets = int(n_buckets)
+        self.width = self.window / self.n_buckets
+        self._buckets = deque()   # [bucket index, {label: count}], oldest first
+        self._totals = {}
+
+    def _index(self, t):
+        return int(t // self.width)
+
+    def _expire(self, index):
+        while self._buckets and self._buckets[0][0] <= index - self.n_buckets:
+            _, counts = self._buckets.popleft()
+            for label, count in counts.items():
+                self._totals[label] -= count
+
+    def add(self, label, t):
+        index = self._index(t)
+        self._expire(index)
+        if not self._buckets or self._buckets[-1][0] < index:
+            self._buckets.append([index, {}])
+        # Late events (t before the newest bucket) count in the newest bucket
+        counts = self._buckets[-1][1]
+        counts[label] = counts.get(label, 0) + 1
+        self._totals[label] = self._totals.get(label, 0) + 1
+
+    def counts(self, t):
+        """
+        Label -> count in the window ending at t
+
+        Does not modify anything (safe for readers): buckets that expired
+        since the last add() are subtracted from a copy of the totals.
+        """
+        result = dict(self._totals)
+        limit = self._index(t) - self.n_buckets
+        for index, counts in self._buckets:
+            if index > limit:
+                break
+            for label, count in counts.items():
+                result[label] -= count
+        return {label: count for label, count in result.items() if count > 0}
+
+
+class StatusStats:
+    """
+    Streaming statistics of the status messages published to devices
+
+    These are published statuses, not predictions: with publish-on-change
+    the inference server only sends a label when it changes, plus
+    keep-alives, so one status can stand for many predicted readings.
+
+    Tracks all-time counts plus sliding-window counts and rates for each
+    configured window. Labels are collected as they appear (optionally
+    seeded with the expected ones, which fixes their order).
+
+    Args:
+        windows: Window name -> length in seconds
+        n_buckets: Buckets per window (resolution = length / n_buckets)
+        labels: Labels known up front, in display order
+    """
+
+    def __init__(self, windows, n_buckets=60, labels=()):
+        self.windows = {name: SlidingCounts(seconds, n_buckets) for name, seconds in windows.items()}
+        self.labels = list(labels)
+        self.counts = {label: 0 for label in self.labels}
+        self.total = 0
+        self.first_time = None
+        self.last_time = None
+        self.last_label = None
+
+    def add(self, label, t=None):
+        """Count one status published at time t (epoch seconds, default now)"""
+        t = time.time() if t is None else t
+        if label not in self.counts:
+            # counts first: a reader going through labels never misses a key
+            self.counts[label] = 0
+            self.labels.append(label)
+        self.counts[label] += 1
+        self.total += 1
+        for window in self.windows.values():
+            window.add(label, t)
+        if self.first_time is None:
+            self.first_time = t
+        self.last_time = t
+        self.last_label = label
+
+    def summary(self, t=None):
+        """
+        Plain-dict copy of the statistics at time t (default now)
+
+        Returns:
+            {"labels", "total", "counts", "last_time", "last_label",
+             "windows": {name: {"total", "counts", "rate_per_min"}}}
+            Rates are over the part of the window since the first status.
+        """
+        t = time.time() if t is None else t
+        windows = {}
+        for name, window in self.windows.items():
+            counts = window.counts(t)
+            total = sum(counts.values())
+            elapsed = window.window if self.first_time is None else min(window.window, max(t - self.first_time, 1.0))
+            windows[name] = {
+                "total": total,
+                "counts": counts,
+                "rate_per_min": total * 60.0 / elapsed,
+            }
+        return {
+            "labels": list(self.labels),
+            "total": self.total,
+            "counts": dict(self.counts),
+            "last_time": self.last_time,
+            "last_label": self.last_label,
+            "windows": windows,
+        }
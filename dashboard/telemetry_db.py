@@ -0,0 +1,159 @@
+import os
+import json
+import time
+import sqlite3
+
+# ===============================
+# Configuration
+# ===============================
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "telemetry.db")
+EVENT_RETENTION = 200_000   # Raw MQTT events kept for late-joining workers
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts_ms INTEGER NOT NULL,
+    topic TEXT NOT NULL,
+    payload BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS status (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class TelemetryDB:
+    """
+    Shared telemetry log in SQLite (WAL mode)
+
+    The ingest process is the only writer: it creates the schema and
+    appends every MQTT message. Dash workers open a reader connection and
+    tail the log with events_after(). The one exception is a few small
+    status keys shared between workers (the collection flag and how far
+    collected rows have been stored), which workers change through that
+    same reader connection with toggle_status() and compare_and_set_status(),
+    each a single short write transaction. WAL lets the readers run
+    concurrently with the writer and with each other.
+
+    Args:
+        path: Database file
+        readonly: Reader connection (Dash workers); skips schema setup
+    """
+
+    def __init__(self, path=DB_PATH, readonly=False):
+        self.path = path
+        if readonly:
+            # Not SQLite's mode=ro: WAL readers still need to update the -shm index
+            self.conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self.conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            # Durable enough for telemetry; a crash loses at most the last commit
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    # ---------- writer side ----------
+
+    def append_events(self, events):
+        """Append (ts_ms, topic, payload) tuples in one transaction"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO events (ts_ms, topic, payload) VALUES (?, ?, ?)", events
+            )
+
+    def set_status(self, **values):
+        """Store small JSON-serializable status values (e.g. connection state)"""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO status (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                [(key, json.dumps(value)) for key, value in values.items()],
+            )
+
+    def toggle_status(self, key):
+        """
+        Flip a boolean status value in one write transaction
+
+        Concurrent toggles (several Dash workers) serialize on the write
+        lock, so none is lost.
+
+        Returns:
+            The new value
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute("SELECT value FROM status WHERE key = ?", (key,)).fetchone()
+            value = not (row is not None and json.loads(row[0]))
+            self.conn.execute(
+                "INSERT INTO status (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, json.dumps(value)),
+            )
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return value
+
+    def compare_and_set_status(self, key, expected, value):
+        """
+        Set a status value only if it still equals expected (None = unset)
+
+        Returns:
+            True if the value was set
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.conn.execute("SELECT value FROM status WHERE key = ?", (key,)).fetchone()
+            current = None if row is None else json.loads(row[0])
+            if current != expected:
+                self.conn.rollback()
+                return False
+            self.conn.execute(
+                "INSERT INTO status (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, json.dumps(value)),
+            )
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return True
+
+    def prune(self, keep=EVENT_RETENTION):
+        """Drop all but the newest `keep` events"""
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM events WHERE id <= (SELECT MAX(id) FROM events) - ?", (keep,)
+            )
+
+    # ---------- reader side ----------
+
+    def latest_id(self):
+        row = self.conn.execute("SELECT MAX(id) FROM events").fetchone()
+        return row[0] or 0
+
+    def events_after(self, last_id, limit=1000):
+        """Events with id > last_id, oldest first, as (id, ts_ms, topic, payload)"""
+        return self.conn.execute(
+            "SELECT id, ts_ms, topic, payload FROM events WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, limit),
+        ).fetchall()
+
+    def get_status(self):
+        return {key: json.loads(value) for key, value in self.conn.execute("SELECT key, value FROM status")}
+
+
+def wait_for_db(path=DB_PATH, timeout=30):
+    """Block until the ingest process has created the database"""
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if time.monotonic() > deadline:
+            raise FileNotFoundError(f"Telemetry database not found: {path} (is ingest.py running?)")
+        time.sleep(0.5)
@@ -13,6 +13,15 @@
 #define SCREEN_WIDTH 128
 #define SCREEN_HEIGHT 64
 
+// Format payload sensor (lihat model/payload.py):
+// PAYLOAD_BINARY 1 = biner ringkas (4 byte header + 16 byte per bacaan),
+// 0 = JSON lama {"temp":..,"hum":..}
+#define PAYLOAD_BINARY 1
+// Jumlah bacaan per publish (mode biner). 1 = kirim tiap bacaan langsung;
+// >1 = kumpulkan dulu, hemat overhead MQTT/TCP tapi data tertunda
+// BATCH_SIZE x 3 detik
+#define BATCH_SIZE 1
+
 Adafruit_SSD1306 display(SCREEN_WIDTH, SCREEN_HEIGHT, &Wire, -1);
 DHT dht(DHTPIN, DHTTYPE);
 
@@ -25,10 +34,32 @@ const int mqtt_port = 1883;
 WiFiClient espClient;
 PubSubClient client(espClient);
 
+// Device id = 3 byte terakhir MAC (6 digit hex, bagian unik per chip; 3 byte
+// pertama = OUI Espressif, sama untuk semua ESP32), dipakai di topic MQTT:
+// sic7/sensor/<id> untuk kirim data, sic7/control/<id> untuk terima perintah
+char deviceId[9];
+char topicSensor[32];
+char topicControl[32];
+char clientId[32];
+
 String suhuStatus = "N/A";
 unsigned long lastMsg = 0;
 bool buzzerActive = false;
 
+// Satu bacaan dalam payload biner, little-endian, tanpa padding (16 byte)
+struct __attribute__((packed)) Reading {
+  uint32_t device;   // 3 byte terakhir MAC (sama dengan deviceId)
+  uint32_t seq;      // nomor urut bacaan
+  uint32_t ts_ms;    // millis() saat dibaca
+  int16_t temp;      // suhu x 100
+  uint16_t hum;      // kelembapan x 100
+};
+
+uint8_t payloadBuf[4 + sizeof(Reading) * BATCH_SIZE];
+uint8_t batchCount = 0;
+uint32_t deviceNum = 0;
+uint32_t seqNum = 0;
+
 // Buzzer tone full power
 void playToneFull() {
   long freq = 2000;                    // frekuensi tinggi = lebih lantang
@@ -41,6 +72,49 @@ void playToneFull() {
   delayMicroseconds(halfPeriod);
 }
 
+void setup_device_id() {
+  uint64_t mac = ESP.getEfuseMac();
+  // getEfuseMac() menyimpan byte MAC pertama di byte terendah; ambil byte
+  // 3-5 (NIC) dengan urutan seperti MAC yang dicetak
+  deviceNum = ((uint32_t)((mac >> 24) & 0xFF) << 16) |
+              ((uint32_t)((mac >> 32) & 0xFF) << 8) |
+              (uint32_t)((mac >> 40) & 0xFF);
+  snprintf(deviceId, sizeof(deviceId), "%06lx", (unsigned long)deviceNum);
+  snprintf(topicSensor, sizeof(topicSensor), "sic7/sensor/%s", deviceId);
+  snprintf(topicControl, sizeof(topicControl), "sic7/control/%s", deviceId);
+  // Client id harus unik per device, kalau sama broker memutus device lain
+  snprintf(clientId, sizeof(clientId), "SIC7_ESP32_%s", deviceId);
+  Serial.print("Device ID: ");
+  Serial.println(deviceId);
+}
+
+// Tambah satu bacaan ke batch; publish kalau batch sudah penuh
+void publishBinary(float t, float h) {
+  Reading r;
+  r.device = deviceNum;
+  r.seq = seqNum++;
+  r.ts_ms = millis();
+  r.temp = (int16_t)lroundf(t * 100);
+  r.hum = (uint16_t)lroundf(h * 100);
+  memcpy(payloadBuf + 4 + batchCount * sizeof(Reading), &r, sizeof(Reading));
+  batchCount++;
+  if (batchCount < BATCH_SIZE) return;
+
+  // Header: magic "S7", versi 1, jumlah bacaan
+  payloadBuf[0] = 'S';
+  payloadBuf[1] = '7';
+  payloadBuf[2] = 1;
+  payloadBuf[3] = batchCount;
+  unsigned int len = 4 + batchCount * sizeof(Reading);
+  client.publish(topicSensor, payloadBuf, len);
+  Serial.print("Published ");
+  Serial.print(batchCount);
+  Serial.print(" bacaan (");
+  Serial.print(len);
+  Serial.println(" byte)");
+  batchCount = 0;
+}
+
 void setup_wifi() {
   Serial.print("Connecting to WiFi...");
   WiFi.begin(ssid, password);
@@ -111,9 +185,9 @@ void callback(char* topic, byte* payload, unsigned int length) {
 void reconnect() {
   while (!client.connected()) {
     Serial.print("Attempting MQTT connection...");
-    if (client.connect("SIC7_ESP32_Client")) {
+    if (client.connect(clientId)) {
       Serial.println("connected");
-      client.subscribe("sic7/control");
+      client.subscribe(topicControl);
     } else {
       Serial.print("failed, rc=");
       Serial.println(client.state());
@@ -125,6 +199,7 @@ void reconnect() {
 void setup() {
   Serial.begin(115200);
   dht.begin();
+  setup_device_id();
 
   // Pin setup
   pinMode(LED_RED, OUTPUT);
@@ -157,6 +232,9 @@ void setup() {
   setup_wifi();
   client.setServer(mqtt_server, mqtt_port);
   client.setCallback(callback);
+  // Buffer default PubSubClient cuma 256 byte; perbesar supaya batch besar muat
+  // (header MQTT + topic + payload)
+  client.setBufferSize(128 + sizeof(payloadBuf));
 }
 
 void loop() {
@@ -180,6 +258,7 @@ void loop() {
     display.setTextSize(1);
     display.setCursor(0, 0);
     display.println("TEAM FOURSOME - SIC7");
+    display.print("ID: "); display.println(deviceId);
 
     display.print("Temp: "); display.print(t, 1); display.println(" C");
     display.print("Hum:  "); display.print(h, 1); display.println(" %");
@@ -188,13 +267,17 @@ void loop() {
     display.display();
 
     // Publish raw sensor data (tanpa pot)
+#if PAYLOAD_BINARY
+    publishBinary(t, h);
+#else
     String payload = 
       "{\"temp\":" + String(t, 2) +
       ",\"hum\":" + String(h, 2) +
       "}";
 
-    client.publish("sic7/sensor", payload.c_str());
+    client.publish(topicSensor, payload.c_str());
     Serial.println("Published: " + payload);
+#endif
   }
 
   // Buzzer kontrol ML (full volume)
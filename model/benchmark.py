@@ -0,0 +1,183 @@
+import os
+import sys
+import json
+import time
+import tracemalloc
+from datetime import datetime
+import numpy as np
+from flat_forest import load_model_file, flat_path_for
+
+# ===============================
+# Configuration
+# ===============================
+MODEL_DIR = "model/models"
+REPORT_PATH = "model/models/benchmark_report.json"
+
+SINGLE_RUNS = 300         # Timed single-row predict calls
+BATCH_SIZE = 64           # Rows per batch (the inference server's BATCH_MAX_SIZE)
+BATCH_RUNS = 100          # Timed batch predict calls
+WARMUP_RUNS = 10
+
+# Selection objective: score = accuracy - LATENCY_WEIGHT * log2(latency / fastest)
+# i.e. every doubling of latency relative to the fastest candidate costs
+# LATENCY_WEIGHT accuracy. At 0.001, a model 20x slower (~4.3 doublings)
+# must be ~0.43 points more accurate to win. Candidates below
+# MIN_ACCURACY are never chosen.
+LATENCY_METRIC = "batch_p99_ms"
+LATENCY_WEIGHT = 0.001
+MIN_ACCURACY = 0.95
+
+# ===============================
+# Benchmark
+# ===============================
+def percentiles_ms(samples_ns):
+    samples = np.asarray(samples_ns, dtype=float) / 1e6
+    return round(float(np.percentile(samples, 50)), 4), round(float(np.percentile(samples, 99)), 4)
+
+def time_calls(fn, X_batches):
+    """Time fn on each batch (after warm-up), returns nanoseconds per call"""
+    for X in X_batches[:WARMUP_RUNS]:
+        fn(X)
+    samples = []
+    for X in X_batches:
+        start = time.perf_counter_ns()
+        fn(X)
+        samples.append(time.perf_counter_ns() - start)
+    return samples
+
+def disk_bytes(model_path):
+    """Size of the .pkl plus its flat export, if any"""
+    total = os.path.getsize(model_path)
+    flat = flat_path_for(model_path)
+    if os.path.isdir(flat):
+        total += sum(os.path.getsize(os.path.join(flat, f)) for f in os.listdir(flat))
+    return total
+
+def benchmark_model(model_path, X):
+    """
+    Measure a saved model the way the servers load it (load_model_file)
+
+    Args:
+        model_path: .pkl path (its flat export is used if present)
+        X: Feature rows to draw benchmark inputs from
+
+    Returns:
+        Dict with load time, p50/p99 latencies, memory and disk size
+    """
+    # First load pulls in the model's modules; keep that out of the numbers
+    model = load_model_file(model_path)
+    start = time.perf_counter_ns()
+    model = load_model_file(model_path)
+    load_ns = time.perf_counter_ns() - start
+
+    # Heap retained by the loaded model; memory-mapped arrays live in the
+    # page cache (shared between processes) and do not show up here
+    del model
+    tracemalloc.start()
+    model = load_model_file(model_path)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rng = np.random.default_rng(0)
+    rows = X[rng.integers(0, len(X), SINGLE_RUNS)]
+    singles = [rows[i:i + 1] for i in range(SINGLE_RUNS)]
+    batches = [X[rng.integers(0, len(X), BATCH_SIZE)] for _ in range(BATCH_RUNS)]
+
+    single_p50, single_p99 = percentiles_ms(time_calls(model.predict, singles))
+    batch_p50, batch_p99 = percentiles_ms(time_calls(model.predict, batches))
+    return {
+        "loaded_as": type(model).__name__,
+        "load_ms": round(load_ns / 1e6, 3),
+        "single_p50_ms": single_p50,
+        "single_p99_ms": single_p99,
+        "batch_p50_ms": batch_p50,
+        "batch_p99_ms": batch_p99,
+        "memory_bytes": int(memory),
+        "disk_bytes": disk_bytes(model_path),
+    }
+
+# ===============================
+# Selection
+# ===============================
+def select_model(results, latency_metric=LATENCY_METRIC, latency_weight=LATENCY_WEIGHT,
+                 min_accuracy=MIN_ACCURACY):
+    """
+    Pick the deployment model by accuracy traded against latency
+
+    Args:
+        results: name -> dict with "accuracy" and latency_metric
+        latency_metric: Benchmark field used as the latency cost
+        latency_weight: Accuracy given up per doubling of latency
+        min_accuracy: Accuracy floor
+
+    Returns:
+        (chosen name, name -> score); chosen is None if none pass the floor
+    """
+    eligible = {name: r for name, r in results.items() if r["accuracy"] >= min_accuracy}
+    if not eligible:
+        return None, {}
+    fastest = min(max(r[latency_metric], 1e-6) for r in eligible.values())
+    scores = {
+        name: r["accuracy"] - latency_weight * np.log2(max(r[latency_metric], 1e-6) / fastest)
+        for name, r in eligible.items()
+    }
+    # Ties go to the faster model
+    chosen = max(scores, key=lambda name: (scores[name], -eligible[name][latency_metric]))
+    return chosen, {name: round(float(score), 6) for name, score in scores.items()}
+
+def write_report(results, chosen, scores, path=REPORT_PATH):
+    """Save benchmark results, objective and choice as JSON"""
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "objective": {
+            "latency_metric": LATENCY_METRIC,
+            "latency_weight": LATENCY_WEIGHT,
+            "min_accuracy": MIN_ACCURACY,
+            "batch_size": BATCH_SIZE,
+        },
+        "chosen": chosen,
+        "scores": scores,
+        "models": results,
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    return path
+
+def print_report(results, chosen, scores):
+    print(f"\n{'model':<15} {'acc':>7} {'1-row p50/p99 ms':>18} {f'{BATCH_SIZE}-row p50/p99 ms':>19} "
+          f"{'load ms':>8} {'heap KiB':>9} {'disk KiB':>9} {'score':>9}")
+    for name, r in results.items():
+        marker = "*" if name == chosen else " "
+        score = f"{scores[name]:.5f}" if name in scores else "-"
+        print(f"{marker}{name:<14} {r['accuracy']:>7.4f} "
+              f"{r['single_p50_ms']:>8.3f}/{r['single_p99_ms']:<9.3f} "
+              f"{r['batch_p50_ms']:>8.3f}/{r['batch_p99_ms']:<10.3f} "
+              f"{r['load_ms']:>8.1f} {r['memory_bytes'] / 1024:>9.0f} {r['disk_bytes'] / 1024:>9.0f} {score:>9}")
+
+# ===============================
+# Main Function
+# ===============================
+def main():
+    # Benchmark the saved models against the labeled dataset
+    import pandas as pd
+    dataset = sys.argv[1] if len(sys.argv) > 1 else "model/dataset/preprocessed_data.csv"
+    df = pd.read_csv(dataset).dropna(subset=["temp", "hum", "label"])
+    X = df[["temp", "hum"]].to_numpy()
+    y = df["label"].astype(str).to_numpy()
+
+    results = {}
+    for name in sorted(f[len("model_"):-len(".pkl")] for f in os.listdir(MODEL_DIR)
+                       if f.startswith("model_") and f.endswith(".pkl")):
+        path = os.path.join(MODEL_DIR, f"model_{name}.pkl")
+        results[name] = benchmark_model(path, X)
+        model = load_model_file(path)
+        results[name]["accuracy"] = round(float(np.mean(model.predict(X).astype(str) == y)), 6)
+
+    chosen, scores = select_model(results)
+    print_report(results, chosen, scores)
+    print(f"\n📄 Report: {write_report(results, chosen, scores)}")
+    print(f"✅ Chosen: {chosen}" if chosen else f"❌ No model reaches {MIN_ACCURACY:.2%} accuracy")
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
-import pandas as pd
+from dataset_store import load_or_import
 
-# Load data
-df = pd.read_csv('model/dataset/preprocessed_data.csv')
+# Load data (only the label column is read from the Parquet store)
+df = load_or_import('preprocessed_data', 'model/dataset/preprocessed_data.csv', columns=['label'])
 
 # Display stats
 print(f"📊 Total: {len(df):,} rows\n")
@@ -0,0 +1,255 @@
+import os
+import sys
+import uuid
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+# ===============================
+# Configuration
+# ===============================
+STORE_ROOT = "model/dataset/store"   # One sub-folder per dataset
+DEFAULT_DEVICE = "default"           # Device id for rows without one
+
+# Typed columns; a dataset stores whichever of these its rows have
+COLUMN_TYPES = {
+    "timestamp": pa.timestamp("ms"),
+    "device": pa.string(),
+    "temp": pa.float64(),
+    "hum": pa.float64(),
+    "pot": pa.int32(),
+    "prediction": pa.string(),
+    "label": pa.string(),
+}
+
+# Hive-style folders: <dataset>/date=2025-12-04/device=default/part-*.parquet
+PARTITIONING = ds.partitioning(
+    pa.schema([("date", pa.string()), ("device", pa.string())]),
+    flavor="hive",
+)
+
+# ===============================
+# Functions
+# ===============================
+
+def dataset_path(name, root=STORE_ROOT):
+    """Folder of a named dataset"""
+    return os.path.join(root, name)
+
+
+def dataset_exists(name, root=STORE_ROOT):
+    """True if the dataset has at least one Parquet file"""
+    path = dataset_path(name, root)
+    if not os.path.isdir(path):
+        return False
+    for _, _, files in os.walk(path):
+        if any(f.endswith(".parquet") for f in files):
+            return True
+    return False
+
+
+def to_table(df):
+    """
+    Convert a DataFrame to an Arrow table with the store's column types
+
+    Timestamps are parsed, a device column is added if missing and the
+    'date' partition column is derived from the timestamp.
+    """
+    df = df.copy()
+    if "timestamp" not in df.columns:
+        raise ValueError("Dataset rows need a 'timestamp' column")
+    df["timestamp"] = pd.to_datetime(df["timestamp"], errors="coerce")
+    df = df[df["timestamp"].notna()]
+    if "device" not in df.columns:
+        df["device"] = DEFAULT_DEVICE
+    df["device"] = df["device"].fillna(DEFAULT_DEVICE).astype(str)
+    df["date"] = df["timestamp"].dt.strftime("%Y-%m-%d")
+
+    fields = [pa.field(col, COLUMN_TYPES.get(col, pa.string())) for col in df.columns if col != "date"]
+    fields.append(pa.field("date", pa.string()))
+    schema = pa.schema(fields)
+    return pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+
+
+def write_dataset(df, name, root=STORE_ROOT, overwrite=False):
+    """
+    Write rows to a named dataset, partitioned by date and device
+
+    Args:
+        df: DataFrame with at least a 'timestamp' column
+        name: Dataset name (folder under root)
+        root: Store root folder
+        overwrite: Replace the whole dataset instead of appending
+
+    Returns:
+        Number of rows written
+    """
+    path = dataset_path(name, root)
+    if overwrite and os.path.exists(path):
+        shutil.rmtree(path)
+
+    table = to_table(df)
+    if table.num_rows == 0:
+        return 0
+
+    ds.write_dataset(
+        table,
+        path,
+        format="parquet",
+        partitioning=PARTITIONING,
+        # Unique file names so appends never clobber earlier parts
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    return table.num_rows
+
+
+def build_filter(start=None, end=None, devices=None):
+    """
+    Predicate for read_dataset
+
+    The date and device conditions prune whole partition folders; the
+    timestamp condition is checked against Parquet row-group statistics.
+    """
+    expr = None
+
+    def combine(cond):
+        return cond if expr is None else expr & cond
+
+    if start is not None:
+        start = pd.Timestamp(start)
+        expr = combine(ds.field("date") >= start.strftime("%Y-%m-%d"))
+        expr = combine(ds.field("timestamp") >= pa.scalar(start.to_pydatetime(), pa.timestamp("ms")))
+    if end is not None:
+        end = pd.Timestamp(end)
+        expr = combine(ds.field("date") <= end.strftime("%Y-%m-%d"))
+        expr = combine(ds.field("timestamp") < pa.scalar(end.to_pydatetime(), pa.timestamp("ms")))
+    if devices is not None:
+        expr = combine(ds.field("device").isin([str(d) for d in devices]))
+    return expr
+
+
+def read_dataset(name, columns=None, start=None, end=None, devices=None, expression=None, root=STORE_ROOT):
+    """
+    Read a named dataset into a DataFrame
+
+    Args:
+        name: Dataset name
+        columns: Columns to load (None = all); other columns are never read
+        start: Only rows with timestamp >= start
+        end: Only rows with timestamp < end
+        devices: Only rows from these device ids
+        expression: Extra pyarrow.dataset expression, ANDed with the above
+        root: Store root folder
+
+    Returns:
+        DataFrame (empty if the dataset does not exist)
+    """
+    if not dataset_exists(name, root):
+        return pd.DataFrame(columns=columns or [])
+
+    dataset = ds.dataset(dataset_path(name, root), format="parquet", partitioning=PARTITIONING)
+    expr = build_filter(start, end, devices)
+    if expression is not None:
+        expr = expression if expr is None else expr & expression
+
+    table = dataset.to_table(columns=columns, filter=expr)
+    df = table.to_pandas()
+    if columns is None:
+        # 'date' only exists to partition the files
+        df = df.drop(columns=["date"])
+    if "timestamp" in df.columns:
+        df = df.sort_values("timestamp", kind="stable").reset_index(drop=True)
+    return df
+
+
+def newest_file_mtime(name, root=STORE_ROOT):
+    """Modification time of the newest Parquet file in a dataset (0 if none)"""
+    newest = 0
+    for folder, _, files in os.walk(dataset_path(name, root)):
+        for f in files:
+            if f.endswith(".parquet"):
+                newest = max(newest, os.path.getmtime(os.path.join(folder, f)))
+    return newest
+
+
+def import_csv(csv_path, name, root=STORE_ROOT, overwrite=False, chunksize=None):
+    """
+    Load a CSV file into a named dataset
+
+    With chunksize set the CSV is read and written piece by piece, so
+    files larger than memory can be imported.
+    """
+    if chunksize is None:
+        return write_dataset(pd.read_csv(csv_path), name, root, overwrite=overwrite)
+
+    rows = 0
+    for i, chunk in enumerate(pd.read_csv(csv_path, chunksize=chunksize)):
+        rows += write_dataset(chunk, name, root, overwrite=overwrite and i == 0)
+    return rows
+
+
+def export_csv(name, csv_path, root=STORE_ROOT, **read_kwargs):
+    """Write a named dataset (optionally filtered) to a CSV file"""
+    df = read_dataset(name, root=root, **read_kwargs)
+    df.to_csv(csv_path, index=False)
+    return len(df)
+
+
+def load_or_import(name, csv_path, root=STORE_ROOT, **read_kwargs):
+    """
+    Read a dataset, importing it from csv_path the first time
+
+    Lets existing CSV hand-offs keep working while later reads come from
+    Parquet. The CSV is imported again if it is newer than the dataset.
+    """
+    csv_exists = os.path.exists(csv_path)
+    if not dataset_exists(name, root):
+        if not csv_exists:
+            raise FileNotFoundError(f"Dataset not found: {csv_path}")
+        stale = True
+    else:
+        stale = csv_exists and os.path.getmtime(csv_path) > newest_file_mtime(name, root)
+
+    if stale:
+        rows = import_csv(csv_path, name, root, overwrite=True)
+        print(f"📦 Imported {rows} rows from {csv_path} into dataset '{name}'")
+    return read_dataset(name, root=root, **read_kwargs)
+
+
+# ===============================
+# Main Function
+# ===============================
+
+def main():
+    usage = (
+        "Usage:\n"
+        "  python model/dataset_store.py import <file.csv> <dataset> [--overwrite]\n"
+        "  python model/dataset_store.py export <dataset> <file.csv>\n"
+        "  python model/dataset_store.py info <dataset>"
+    )
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    if len(args) < 2:
+        print(usage)
+        sys.exit(1)
+
+    command = args[0]
+    if command == "import" and len(args) == 3:
+        rows = import_csv(args[1], args[2], overwrite="--overwrite" in sys.argv)
+        print(f"✅ Imported {rows} rows into '{args[2]}'")
+    elif command == "export" and len(args) == 3:
+        rows = export_csv(args[1], args[2])
+        print(f"✅ Exported {rows} rows to {args[2]}")
+    elif command == "info":
+        df = read_dataset(args[1])
+        print(f"📊 {args[1]}: {len(df)} rows, columns: {', '.join(df.columns)}")
+        if len(df) and "timestamp" in df.columns:
+            print(f"   {df['timestamp'].min()} → {df['timestamp'].max()}")
+    else:
+        print(usage)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
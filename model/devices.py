@@ -0,0 +1,49 @@
+# ===============================
+# Device Topics
+# ===============================
+# Every ESP32 publishes to sic7/sensor/<id> and listens on sic7/control/<id>,
+# where <id> is the NIC-specific last 3 bytes of its MAC as 6 hex digits
+# (the first 3 are the vendor OUI, shared by every ESP32). The original
+# single-device topics (sic7/sensor, sic7/control) are still accepted and
+# map to LEGACY_DEVICE.
+TOPIC_SENSOR = "sic7/sensor"
+TOPIC_CONTROL = "sic7/control"
+LEGACY_DEVICE = "default"    # Same id dataset_store uses for rows without one
+
+SENSOR_SUBSCRIPTIONS = [TOPIC_SENSOR, f"{TOPIC_SENSOR}/+"]
+CONTROL_SUBSCRIPTIONS = [TOPIC_CONTROL, f"{TOPIC_CONTROL}/+"]
+
+
+def sensor_topic(device_id=LEGACY_DEVICE):
+    """Topic a device publishes its readings to"""
+    return TOPIC_SENSOR if device_id == LEGACY_DEVICE else f"{TOPIC_SENSOR}/{device_id}"
+
+
+def control_topic(device_id=LEGACY_DEVICE):
+    """Topic a device receives status and LED commands on"""
+    return TOPIC_CONTROL if device_id == LEGACY_DEVICE else f"{TOPIC_CONTROL}/{device_id}"
+
+
+def parse_topic(topic):
+    """
+    Split an MQTT topic into its kind and device id
+
+    Returns:
+        ("sensor" | "control", device_id), or (None, None) for other topics
+    """
+    if topic in (TOPIC_SENSOR, TOPIC_CONTROL):
+        base, device_id = topic, LEGACY_DEVICE
+    else:
+        base, _, device_id = topic.rpartition("/")
+    if not device_id:
+        return None, None
+    if base == TOPIC_SENSOR:
+        return "sensor", device_id
+    if base == TOPIC_CONTROL:
+        return "control", device_id
+    return None, None
+
+
+def subscribe_all(client, topics):
+    """Subscribe a paho client to several topics in one SUBSCRIBE packet"""
+    client.subscribe([(topic, 0) for topic in topics])
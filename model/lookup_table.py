@@ -0,0 +1,222 @@
+import os
+import sys
+import time
+import joblib
+import numpy as np
+import pandas as pd
+
+# ===============================
+# Configuration
+# ===============================
+MODEL_PATH = "model/models/model_random_forest.pkl"
+DATASET_PATH = "model/dataset/preprocessed_data.csv"
+
+# Grid covering the DHT11 measuring range at the sensor's 0.1 resolution
+TEMP_RANGE = (0.0, 50.0)
+HUM_RANGE = (0.0, 100.0)
+STEP = 0.1
+
+MIN_AGREEMENT = 0.999      # Required agreement with the original model
+N_RANDOM_CHECKS = 100_000  # Extra uniformly sampled points for the check
+PREDICT_CHUNK = 100_000    # Rows per model.predict call while compiling
+
+# ===============================
+# Lookup Table Predictor
+# ===============================
+
+def lut_path_for(model_path):
+    """Path of the compiled lookup table stored next to a .pkl model"""
+    return os.path.splitext(model_path)[0] + ".lut.npz"
+
+
+class LookupTablePredictor:
+    """
+    Answer predictions for a 2-feature (temp, hum) model by array indexing
+
+    Inputs are snapped to the nearest grid point. Inputs outside the grid
+    are passed to the fallback model, if one is attached.
+
+    Args:
+        grid: 2D array of class indices, shape (n_temp, n_hum)
+        classes: Array of class labels indexed by grid values
+        temp_min: Temperature of grid row 0
+        hum_min: Humidity of grid column 0
+        step: Grid spacing for both axes
+        fallback: Original model used for out-of-grid inputs (optional)
+    """
+
+    n_features_in_ = 2
+
+    def __init__(self, grid, classes, temp_min, hum_min, step, fallback=None):
+        self.grid = grid
+        self.classes_ = np.asarray(classes)
+        self.temp_min = float(temp_min)
+        self.hum_min = float(hum_min)
+        self.step = float(step)
+        self.fallback = fallback
+
+    def _indices(self, X):
+        X = np.asarray(X, dtype=float).reshape(-1, 2)
+        ti = np.rint((X[:, 0] - self.temp_min) / self.step)
+        hi = np.rint((X[:, 1] - self.hum_min) / self.step)
+        in_grid = (
+            (ti >= 0) & (ti < self.grid.shape[0]) &
+            (hi >= 0) & (hi < self.grid.shape[1])
+        )
+        return X, ti, hi, in_grid
+
+    def predict(self, X):
+        """Predict labels for an (n, 2) array of [temp, hum] rows"""
+        X, ti, hi, in_grid = self._indices(X)
+        result = np.empty(len(X), dtype=self.classes_.dtype)
+
+        codes = self.grid[ti[in_grid].astype(np.intp), hi[in_grid].astype(np.intp)]
+        result[in_grid] = self.classes_[codes]
+
+        if not in_grid.all():
+            if self.fallback is None:
+                raise ValueError(
+                    f"{int((~in_grid).sum())} input(s) outside the lookup grid and no fallback model"
+                )
+            result[~in_grid] = self.fallback.predict(X[~in_grid])
+
+        return result
+
+    def save(self, path):
+        """Save the grid as a compressed .npz file"""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez_compressed(
+            path,
+            grid=self.grid,
+            classes=self.classes_.astype(str),
+            temp_min=self.temp_min,
+            hum_min=self.hum_min,
+            step=self.step,
+        )
+
+    @classmethod
+    def load(cls, path, fallback=None):
+        """Load a grid saved with save()"""
+        with np.load(path) as data:
+            return cls(
+                grid=data["grid"],
+                classes=data["classes"],
+                temp_min=data["temp_min"],
+                hum_min=data["hum_min"],
+                step=data["step"],
+                fallback=fallback,
+            )
+
+
+def compile_lookup_table(model, temp_range=TEMP_RANGE, hum_range=HUM_RANGE, step=STEP):
+    """
+    Evaluate a model on every grid point and store the results
+
+    Args:
+        model: Fitted classifier taking [temp, hum] rows
+        temp_range: (min, max) temperature covered by the grid
+        hum_range: (min, max) humidity covered by the grid
+        step: Grid spacing
+
+    Returns:
+        LookupTablePredictor with the model attached as fallback
+    """
+    temps = np.round(np.arange(temp_range[0], temp_range[1] + step / 2, step), 6)
+    hums = np.round(np.arange(hum_range[0], hum_range[1] + step / 2, step), 6)
+
+    classes = np.asarray(model.classes_)
+    code_dtype = np.uint8 if len(classes) <= 256 else np.uint16
+
+    tt, hh = np.meshgrid(temps, hums, indexing="ij")
+    X = np.column_stack([tt.ravel(), hh.ravel()])
+
+    codes = np.empty(len(X), dtype=code_dtype)
+    for start in range(0, len(X), PREDICT_CHUNK):
+        preds = model.predict(X[start:start + PREDICT_CHUNK])
+        codes[start:start + PREDICT_CHUNK] = np.searchsorted(classes, preds)
+
+    grid = codes.reshape(len(temps), len(hums))
+    return LookupTablePredictor(grid, classes, temps[0], hums[0], step, fallback=model)
+
+
+def verify_lookup_table(lut, model, X):
+    """
+    Compare lookup table predictions with the original model
+
+    Args:
+        lut: LookupTablePredictor to check
+        model: Original model
+        X: (n, 2) array of [temp, hum] rows to compare on
+
+    Returns:
+        Fraction of rows where both agree
+    """
+    if len(X) == 0:
+        return 1.0
+    return float(np.mean(lut.predict(X) == model.predict(X)))
+
+
+def load_lookup_predictor(model, model_path):
+    """
+    Wrap a loaded model with its compiled lookup table if one is available
+
+    The table is ignored when it is older than the model file, so a
+    retrained model is never answered from a stale grid.
+    """
+    path = lut_path_for(model_path)
+    if not os.path.exists(path):
+        return model
+    if os.path.getmtime(path) < os.path.getmtime(model_path):
+        print(f"⚠️ Lookup table {path} is older than the model, ignoring it")
+        return model
+    return LookupTablePredictor.load(path, fallback=model)
+
+
+# ===============================
+# Main Function
+# ===============================
+
+def main():
+    model_path = sys.argv[1] if len(sys.argv) > 1 else MODEL_PATH
+    if not os.path.exists(model_path):
+        print(f"❌ Model not found: {model_path}")
+        sys.exit(1)
+
+    print(f"Loading model from: {model_path}")
+    model = joblib.load(model_path)
+
+    print(f"🧮 Compiling grid: temp {TEMP_RANGE}, hum {HUM_RANGE}, step {STEP}")
+    start = time.perf_counter()
+    lut = compile_lookup_table(model)
+    print(f"✅ Compiled {lut.grid.size:,} cells in {time.perf_counter() - start:.1f}s "
+          f"({lut.grid.nbytes / 1024:.0f} KiB)")
+
+    # Accuracy check: recorded readings plus uniform samples over the grid
+    checks = []
+    if os.path.exists(DATASET_PATH):
+        df = pd.read_csv(DATASET_PATH).dropna(subset=["temp", "hum"])
+        checks.append(("dataset", df[["temp", "hum"]].values))
+    rng = np.random.default_rng(42)
+    uniform = np.column_stack([
+        rng.uniform(*TEMP_RANGE, N_RANDOM_CHECKS),
+        rng.uniform(*HUM_RANGE, N_RANDOM_CHECKS),
+    ])
+    checks.append(("uniform", np.round(uniform, 1)))
+
+    ok = True
+    for name, X in checks:
+        agreement = verify_lookup_table(lut, model, X)
+        print(f"   {name}: {agreement * 100:.3f}% agreement on {len(X):,} rows")
+        ok = ok and agreement >= MIN_AGREEMENT
+
+    if not ok:
+        print(f"❌ Agreement below {MIN_AGREEMENT * 100:.1f}%, lookup table not saved")
+        sys.exit(1)
+
+    out_path = lut_path_for(model_path)
+    lut.save(out_path)
+    print(f"💾 Saved to: {out_path}")
+
+
+if __name__ == "__main__":
+    main()
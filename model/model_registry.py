@@ -0,0 +1,286 @@
+import os
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from datetime import datetime
+import joblib
+import numpy as np
+from lookup_table import load_lookup_predictor
+from flat_forest import export_flat, load_model_file
+
+# ===============================
+# Configuration
+# ===============================
+REGISTRY_DIR = "model/models/registry"
+MODEL_FILE = "model.pkl"
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"      # Holds the version the servers should run
+FEATURES = ["temp", "hum"]
+POLL_INTERVAL = 5             # Seconds between checks of CURRENT by ModelWatcher
+
+# ===============================
+# Model Registry
+# ===============================
+# Layout:
+#
+#   model/models/registry/
+#       CURRENT                 "v0003"
+#       v0001/model.pkl
+#       v0001/model.flat/       memory-mappable tree arrays (tree models only)
+#       v0001/manifest.json     features, labels, metrics, data hash, ...
+#       v0002/...
+#
+# A version folder is written under a temporary name and renamed into
+# place, and CURRENT is replaced with os.replace(), so readers never see a
+# half-written version or pointer. Versions are never modified afterwards.
+
+def version_dir(version, root=REGISTRY_DIR):
+    return os.path.join(root, version)
+
+def list_versions(root=REGISTRY_DIR):
+    """Registered versions, oldest first"""
+    if not os.path.isdir(root):
+        return []
+    return sorted(v for v in os.listdir(root)
+                  if v.startswith("v") and os.path.exists(os.path.join(root, v, MANIFEST_FILE)))
+
+def read_manifest(version, root=REGISTRY_DIR):
+    with open(os.path.join(version_dir(version, root), MANIFEST_FILE)) as f:
+        return json.load(f)
+
+def current_version(root=REGISTRY_DIR):
+    """Version CURRENT points to, or None if nothing was promoted yet"""
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def set_current(version, root=REGISTRY_DIR):
+    """Atomically point CURRENT at version (promote or roll back)"""
+    if version not in list_versions(root):
+        raise ValueError(f"Unknown model version: {version}")
+    fd, tmp = tempfile.mkstemp(dir=root, prefix=".current-")
+    with os.fdopen(fd, "w") as f:
+        f.write(version + "\n")
+    os.replace(tmp, os.path.join(root, CURRENT_FILE))
+
+def model_path(version, root=REGISTRY_DIR):
+    return os.path.join(version_dir(version, root), MODEL_FILE)
+
+def data_hash(X, y):
+    """SHA-256 of the training features and labels, to tell datasets apart"""
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(np.asarray(X, dtype=float)).tobytes())
+    for label in np.asarray(y).astype(str):
+        digest.update(label.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def register_model(model, metrics, training_data_hash, algorithm=None, features=FEATURES,
+                   params=None, root=REGISTRY_DIR, promote=True):
+    """
+    Store a trained model as a new registry version
+
+    Args:
+        model: Fitted estimator with classes_
+        metrics: Dict of evaluation results (e.g. {"accuracy": 0.97})
+        training_data_hash: data_hash() of the training set
+        algorithm: Short model name (e.g. "random_forest")
+        features: Input columns, in order
+        params: Hyperparameters worth recording (default: model.get_params())
+        root: Registry folder
+        promote: Point CURRENT at the new version
+
+    Returns:
+        New version string (e.g. "v0004")
+    """
+    os.makedirs(root, exist_ok=True)
+    existing = list_versions(root)
+    number = int(existing[-1][1:]) + 1 if existing else 1
+    version = f"v{number:04d}"
+
+    if params is None and hasattr(model, "get_params"):
+        params = {k: v for k, v in model.get_params().items() if isinstance(v, (int, float, str, bool, type(None)))}
+
+    staging = tempfile.mkdtemp(dir=root, prefix=f".{version}-")
+    try:
+        joblib.dump(model, os.path.join(staging, MODEL_FILE))
+        flat_path = export_flat(model, os.path.join(staging, MODEL_FILE))
+        manifest = {
+            "version": version,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "algorithm": algorithm or type(model).__name__,
+            "features": list(features),
+            "labels": [str(c) for c in getattr(model, "classes_", [])],
+            "metrics": metrics,
+            "params": params or {},
+            "training_data_hash": training_data_hash,
+            "model_sha256": file_hash(os.path.join(staging, MODEL_FILE)),
+            "flat_export": flat_path is not None,
+        }
+        with open(os.path.join(staging, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.rename(staging, version_dir(version, root))
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    if promote:
+        set_current(version, root)
+    return version
+
+def load_version(version=None, root=REGISTRY_DIR, use_lookup_table=True):
+    """
+    Load a registered model (memory-mapped flat arrays when exported)
+
+    Args:
+        version: Version to load (default: CURRENT)
+        use_lookup_table: Use <model.pkl>.lut.npz if one was compiled for it
+
+    Returns:
+        (model, manifest)
+    """
+    version = version or current_version(root)
+    if version is None:
+        raise FileNotFoundError(f"No model promoted in registry: {root}")
+    manifest = read_manifest(version, root)
+    path = model_path(version, root)
+    if file_hash(path) != manifest["model_sha256"]:
+        raise ValueError(f"Model file of {version} does not match its manifest")
+    model = load_model_file(path)
+    if use_lookup_table:
+        model = load_lookup_predictor(model, path)
+    return model, manifest
+
+# ===============================
+# Hot Swap
+# ===============================
+class ModelWatcher:
+    """
+    Serve predictions from the registry's CURRENT model and follow changes
+
+    A background thread polls CURRENT; when it moves, the new version is
+    loaded and checked on that thread, then swapped in with a single
+    reference assignment. Callers of predict() never wait for a load, and
+    each call uses one model from start to end.
+
+    Args:
+        model: Model to serve until the registry has something newer
+        version: Registry version of model (None = not from the registry)
+        root: Registry folder
+        interval: Seconds between polls
+        use_lookup_table: Passed to load_version()
+        on_swap: Optional callable(model, manifest) after each swap
+    """
+
+    def __init__(self, model, version=None, root=REGISTRY_DIR, interval=POLL_INTERVAL,
+                 use_lookup_table=True, on_swap=None):
+        self.model = model
+        self.version = version
+        self.root = root
+        self.interval = interval
+        self.use_lookup_table = use_lookup_table
+        self.on_swap = on_swap
+        self.rejected = None   # (version, manifest mtime) of the last rejected load
+        self._stop = threading.Event()
+        self._thread = None
+
+    def predict(self, X):
+        return self.model.predict(X)
+
+    @property
+    def classes_(self):
+        return self.model.classes_
+
+    def check(self):
+        """Swap in CURRENT if it changed; returns True on a swap"""
+        version = current_version(self.root)
+        if version is None or version == self.version:
+            return False
+        # Do not retry the same broken version every poll, but do pick up a
+        # corrected one re-published under the same name
+        try:
+            stamp = (version, os.stat(os.path.join(version_dir(version, self.root), MANIFEST_FILE)).st_mtime_ns)
+        except OSError:
+            stamp = (version, None)
+        if stamp == self.rejected:
+            return False
+        try:
+            model, manifest = load_version(version, self.root, self.use_lookup_table)
+            if manifest["features"] != FEATURES:
+                raise ValueError(f"expects features {manifest['features']}, server sends {FEATURES}")
+            # Smoke test before it sees real traffic
+            model.predict(np.zeros((1, len(FEATURES))))
+        except Exception as e:
+            print(f"❌ Model {version} rejected: {e} (still serving {self.version or 'initial'})")
+            self.rejected = stamp
+            return False
+
+        self.model = model
+        old, self.version = self.version, version
+        print(f"🔄 Model swapped: {old or 'initial'} → {version} ({manifest['algorithm']}, "
+              f"metrics={manifest['metrics']})")
+        if self.on_swap is not None:
+            self.on_swap(model, manifest)
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"❌ Model watcher error: {e}")
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+# ===============================
+# Main Function
+# ===============================
+def main():
+    usage = "Usage: python model_registry.py [list | show [version] | promote <version>]"
+    command = sys.argv[1] if len(sys.argv) > 1 else "list"
+
+    if command == "list":
+        current = current_version()
+        versions = list_versions()
+        if not versions:
+            print(f"No models registered in {REGISTRY_DIR}")
+        for version in versions:
+            manifest = read_manifest(version)
+            marker = "*" if version == current else " "
+            print(f"{marker} {version}  {manifest['created_at']}  {manifest['algorithm']:<15} {manifest['metrics']}")
+    elif command == "show":
+        version = sys.argv[2] if len(sys.argv) > 2 else current_version()
+        if version is None:
+            print("No model promoted yet")
+            sys.exit(1)
+        print(json.dumps(read_manifest(version), indent=2))
+    elif command == "promote" and len(sys.argv) > 2:
+        set_current(sys.argv[2])
+        print(f"✅ CURRENT → {sys.argv[2]} (running servers pick it up within {POLL_INTERVAL} s)")
+    else:
+        print(usage)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -2,22 +2,62 @@ import os
 import sys
 import json
 import time
-import joblib
+import queue
+import argparse
+import threading
+import multiprocessing
+from collections import namedtuple
 import numpy as np
 import paho.mqtt.client as mqtt
+from lookup_table import LookupTablePredictor, load_lookup_predictor
+from flat_forest import FlatForest, load_model_file
+from model_registry import ModelWatcher, current_version, load_version
+from devices import SENSOR_SUBSCRIPTIONS, control_topic, parse_topic, subscribe_all
+from payload import parse_sensor
 
 # ===============================
 # Configuration
 # ===============================
-MODEL_PATH = "model/models/model_random_forest.pkl"
+MODEL_PATH = "model/models/model_random_forest.pkl"   # Used until a model is registered (model_registry.py)
+USE_LOOKUP_TABLE = True           # Answer from the compiled grid (see lookup_table.py) if present
 MQTT_BROKER = "broker.hivemq.com"
 MQTT_PORT = 1883
-TOPIC_SENSOR = "sic7/sensor"      # Subscribe: receive sensor data from ESP32
-TOPIC_CONTROL = "sic7/control"    # Publish: send control commands to ESP32
+# Topics: sic7/sensor[/<id>] in, sic7/control[/<id>] out (see devices.py)
 CLIENT_ID = f"inference_server_{int(time.time())}"
 MQTT_USER = "foursome"
 MQTT_PASS = "berempat"
 
+# Micro-batching: readings are queued and scored with a single predict call
+# once BATCH_MAX_SIZE readings are waiting or the oldest one has waited
+# BATCH_MAX_LATENCY_MS, whichever comes first.
+BATCH_MAX_SIZE = 64
+BATCH_MAX_LATENCY_MS = 50
+VERBOSE = True                    # Print one line per reading (slow at high rates)
+
+# Publish-on-change: a device only gets status:<label> when its label
+# changes. A new label has to be predicted STATUS_DEBOUNCE times in a row
+# before it replaces the published one, and only readings at least
+# STATUS_HYSTERESIS (temp °C, hum %) away from the class boundary count:
+# the model must still give the new label with either value moved by that
+# margin. So a reading hovering on a boundary does not flip the LEDs back
+# and forth however long it stays there. The current label is re-sent
+# every STATUS_KEEPALIVE_S anyway, for devices that rebooted.
+PUBLISH_ON_CHANGE = True
+STATUS_DEBOUNCE = 2
+STATUS_HYSTERESIS = (0.3, 1.0)    # (0, 0) = debounce only
+STATUS_KEEPALIVE_S = 60           # 0 = never re-send an unchanged status
+
+# Worker-pool mode (--workers N): N processes share the sensor topics
+# through an MQTT 5 shared subscription ($share/<group>/...), so the broker
+# spreads readings across them. Readings of one device may reach different
+# workers unless the broker routes shared subscriptions by publisher
+# (e.g. EMQX's hash_clientid strategy). Publish-on-change needs every
+# reading of a device in one process, so workers turn it off unless
+# started with --sticky-routing.
+SHARE_GROUP = "sic7-inference"
+RESTART_BACKOFF_S = (1, 30)       # Supervisor restart delay: initial, max
+RESTART_RESET_S = 60              # A worker up this long restarts from the initial delay
+
 # Mapping not needed anymore - ESP32 handles LED control
 # We only send status, ESP32 decides what LED to turn on
 
@@ -25,15 +65,156 @@ MQTT_PASS = "berempat"
 # Load ML Model
 # ===============================
 def load_model():
-    """Load trained ML model"""
-    if not os.path.exists(MODEL_PATH):
-        raise FileNotFoundError(f"Model not found: {MODEL_PATH}")
-    print(f"Loading model from: {MODEL_PATH}")
-    model = joblib.load(MODEL_PATH)
+    """
+    Load trained ML model
+    
+    Returns:
+        ModelWatcher serving the registry's CURRENT model (or MODEL_PATH if
+        nothing is registered yet); call start() to follow new versions
+    """
+    version = current_version()
+    if version is not None:
+        model, manifest = load_version(version, use_lookup_table=USE_LOOKUP_TABLE)
+        print(f"Loading model {version} from registry ({manifest['algorithm']}, metrics={manifest['metrics']})")
+    else:
+        if not os.path.exists(MODEL_PATH):
+            raise FileNotFoundError(f"Model not found: {MODEL_PATH}")
+        print(f"Loading model from: {MODEL_PATH}")
+        # Memory-mapped tree arrays if exported (flat_forest.py), else the pickle
+        model = load_model_file(MODEL_PATH)
+        if USE_LOOKUP_TABLE:
+            model = load_lookup_predictor(model, MODEL_PATH)
+    if isinstance(model, LookupTablePredictor):
+        print("🧮 Using compiled lookup table (model is fallback for out-of-grid inputs)")
+    if isinstance(getattr(model, "fallback", model), FlatForest):
+        print("⚡ Using memory-mapped tree arrays")
     print("✅ Model loaded successfully\n")
-    return model
+    return ModelWatcher(model, version, use_lookup_table=USE_LOOKUP_TABLE)
 
-model = None
+model = None      # ModelWatcher; swaps in newly promoted registry versions
+batcher = None
+
+# ===============================
+# Device Index
+# ===============================
+class DeviceState:
+    """Latest known state of one device, kept in `devices`"""
+    
+    __slots__ = ("device_id", "reply_topic", "readings", "last_seen", "last_prediction",
+                 "published", "published_at", "candidate", "candidate_count", "suppressed")
+    
+    def __init__(self, device_id):
+        self.device_id = device_id
+        self.reply_topic = control_topic(device_id)  # Built once, not per message
+        self.readings = 0
+        self.last_seen = None
+        self.last_prediction = None
+        self.published = None         # Label the device was last sent
+        self.published_at = 0.0
+        self.candidate = None         # Different label waiting out the debounce
+        self.candidate_count = 0
+        self.suppressed = 0
+
+# device id -> DeviceState; a dict keeps lookup O(1) however many devices report
+devices = {}
+
+def get_device(device_id):
+    """State for device_id, registered on first sight"""
+    device = devices.get(device_id)
+    if device is None:
+        device = devices[device_id] = DeviceState(device_id)
+        print(f"🆕 New device: {device_id} (replies on {device.reply_topic}, {len(devices)} known)")
+    return device
+
+# ===============================
+# Micro-batching
+# ===============================
+PendingReading = namedtuple("PendingReading", ["temp", "hum", "device", "received_at"])
+
+class MicroBatcher:
+    """
+    Collect readings from the MQTT thread and score them in batches
+
+    Args:
+        predict_fn: Callable taking an (n, 2) array and returning n labels
+        on_result: Callable(reading, prediction, clear) invoked per reading;
+            the PendingReading carries the device given to submit(), clear
+            is the hysteresis check (see predict_with_margin)
+        max_size: Flush as soon as this many readings are queued
+        max_latency_ms: Flush once the oldest queued reading is this old
+        margin: Hysteresis margin for predict_with_margin (None = default)
+    """
+
+    def __init__(self, predict_fn, on_result, max_size=BATCH_MAX_SIZE, max_latency_ms=BATCH_MAX_LATENCY_MS,
+                 margin=None):
+        self.predict_fn = predict_fn
+        self.margin = margin
+        self.on_result = on_result
+        self.max_size = max(1, int(max_size))
+        self.max_latency = max_latency_ms / 1000.0
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def submit(self, temp, hum, device):
+        """Queue one reading; its prediction is handed to on_result with device"""
+        self._queue.put(PendingReading(temp, hum, device, time.monotonic()))
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the worker thread after flushing everything still queued"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _next_batch(self):
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = first.received_at + self.max_latency
+        while len(batch) < self.max_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    # Deadline passed: only take what is already waiting
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch):
+        X = np.array([[r.temp, r.hum] for r in batch], dtype=float)
+        try:
+            predictions, clear = predict_with_margin(self.predict_fn, X, self.margin)
+        except Exception as e:
+            print(f"❌ Error predicting batch of {len(batch)}: {e}")
+            return
+
+        if VERBOSE:
+            wait_ms = (time.monotonic() - batch[0].received_at) * 1000
+            print(f"🤖 Predicted batch of {len(batch)} reading(s) (oldest waited {wait_ms:.1f} ms)")
+
+        for reading, prediction, reading_clear in zip(batch, predictions.tolist(), clear.tolist()):
+            try:
+                self.on_result(reading, prediction, reading_clear)
+            except Exception as e:
+                print(f"❌ Error publishing result: {e}")
 
 # ===============================
 # MQTT Callbacks
@@ -42,58 +223,146 @@ def on_connect(client, userdata, flags, rc, properties=None):
     """Callback when connected to MQTT broker"""
     if rc == 0:
         print("✅ Connected to MQTT broker")
-        client.subscribe(TOPIC_SENSOR)
-        print(f"📡 Subscribed to topic: {TOPIC_SENSOR}")
+        topics = userdata["topics"]
+        subscribe_all(client, topics)
+        print(f"📡 Subscribed to topics: {', '.join(topics)}")
         print("🎯 Waiting for sensor data...\n")
     else:
         print(f"❌ Connection failed with code {rc}")
 
 def on_message(client, userdata, msg):
     """Callback when message received from MQTT"""
-    global model
-    
     try:
-        # Parse JSON payload
-        payload = msg.payload.decode()
-        data = json.loads(payload)
+        kind, device_id = parse_topic(msg.topic)
+        if kind != "sensor":
+            return
         
-        temp = float(data.get('temp', 0))
-        hum = float(data.get('hum', 0))
-        pot = data.get('pot', 0)
+        # JSON or binary payload (one reading or a batch, see payload.py)
+        temps, hums, pots, _ = parse_sensor(msg.payload)
         
-        print(f"📥 Received: temp={temp}°C, hum={hum}%, pot={pot}")
+        device = get_device(device_id)
+        device.readings += len(temps)
+        device.last_seen = time.time()
         
-        # Predict using ML model
-        X = np.array([[temp, hum]])
-        prediction = model.predict(X)[0]
+        if VERBOSE:
+            print(f"📥 Received [{device_id}]: temp={temps[-1]}°C, hum={hums[-1]}%, pot={pots[-1]}"
+                  + (f" (+{len(temps) - 1} batched)" if len(temps) > 1 else ""))
         
-        print(f"🤖 Prediction: {prediction}")
-        
-        # Publish status only - ESP32 will handle LED control automatically
-        status_msg = f"status:{prediction}"
-        client.publish(TOPIC_CONTROL, status_msg)
-        print(f"📤 Published: {status_msg} → ESP32 will auto-control LEDs")
-        
-        print("-" * 60)
+        # Queue for batched prediction; the reply goes to the device's control topic
+        for temp, hum in zip(temps.tolist(), hums.tolist()):
+            batcher.submit(temp, hum, device)
         
     except json.JSONDecodeError:
-        print(f"❌ Invalid JSON: {msg.payload.decode()}")
+        print(f"❌ Invalid JSON: {msg.payload.decode(errors='replace')}")
     except Exception as e:
         print(f"❌ Error processing message: {e}")
 
+def predict_with_margin(predict_fn, X, margin=None):
+    """
+    Predict a batch and check each reading is clear of the class boundary
+    
+    The readings moved by ±margin go into the same predict call as the
+    batch, so the hysteresis check costs no extra call.
+    
+    Args:
+        predict_fn: Callable taking an (n, 2) array and returning n labels
+        X: (n, 2) array of temp, hum
+        margin: (temp, hum) hysteresis margin; None = STATUS_HYSTERESIS
+            while PUBLISH_ON_CHANGE is on, else no check
+    
+    Returns:
+        (predictions, clear): clear[i] is True if the model still predicts
+        predictions[i] with temp or hum moved by ±margin
+    """
+    if margin is None:
+        margin = STATUS_HYSTERESIS if PUBLISH_ON_CHANGE else (0, 0)
+    temp_margin, hum_margin = margin
+    if not (temp_margin or hum_margin):
+        return np.asarray(predict_fn(X)), np.ones(len(X), dtype=bool)
+    shifts = np.array([[0, 0], [-temp_margin, 0], [temp_margin, 0], [0, -hum_margin], [0, hum_margin]],
+                      dtype=float)
+    labels = np.asarray(predict_fn((X[None, :, :] + shifts[:, None, :]).reshape(-1, 2))).reshape(len(shifts), len(X))
+    return labels[0], np.all(labels[1:] == labels[0], axis=0)
+
+def should_publish(device, prediction, now, clear=True):
+    """
+    Decide whether a prediction is sent to the device (publish-on-change)
+    
+    Args:
+        device: DeviceState; its debounce fields are updated
+        prediction: Newly predicted label
+        now: time.monotonic()
+        clear: Whether the reading is clear of the class boundary (see
+            predict_with_margin); only matters for a label that differs
+            from the published one
+    
+    Returns:
+        True if status:<prediction> should be published now
+    """
+    if not PUBLISH_ON_CHANGE or device.published is None:
+        return True
+    
+    if prediction == device.published or not clear:
+        # Back to the published label, or inside the hysteresis band around
+        # it: a pending switch is abandoned
+        device.candidate = None
+        device.candidate_count = 0
+        return (prediction == device.published and bool(STATUS_KEEPALIVE_S)
+                and now - device.published_at >= STATUS_KEEPALIVE_S)
+    
+    if prediction != device.candidate:
+        device.candidate = prediction
+        device.candidate_count = 0
+    device.candidate_count += 1
+    return device.candidate_count >= STATUS_DEBOUNCE
+
+def publish_status(client, device, prediction, clear=True):
+    """
+    Publish status only - ESP32 will handle LED control automatically
+    
+    Args:
+        client: MQTT client
+        device: DeviceState the reading came from
+        prediction: Predicted label
+        clear: The reading is clear of the class boundary (hysteresis check,
+            see predict_with_margin)
+    """
+    device.last_prediction = prediction
+    now = time.monotonic()
+    if not should_publish(device, prediction, now, clear):
+        device.suppressed += 1
+        return
+    device.published = prediction
+    device.published_at = now
+    device.candidate = None
+    device.candidate_count = 0
+    
+    status_msg = f"status:{prediction}"
+    client.publish(device.reply_topic, status_msg)
+    if VERBOSE:
+        print(f"📤 Published: {status_msg} → {device.reply_topic}")
+
 def on_disconnect(client, userdata, flags, rc, properties=None):
     """Callback when disconnected from MQTT broker"""
     if rc != 0:
         print(f"⚠️ Unexpected disconnect (code {rc}). Reconnecting...")
 
 # ===============================
-# Main Function
+# Server
 # ===============================
-def main():
-    global model
+def serve(client_id=CLIENT_ID, share_group=None, name="MQTT Inference Server"):
+    """
+    Load the model and answer sensor readings until interrupted
+    
+    Args:
+        client_id: MQTT client id (unique per process)
+        share_group: Consume through $share/<group>/ with MQTT 5 (worker mode)
+        name: Label printed in the banner
+    """
+    global model, batcher
     
     print("=" * 60)
-    print("🚀 SIC7 MQTT Inference Server")
+    print(f"🚀 SIC7 {name}")
     print("=" * 60)
     
     # Load ML model
@@ -103,10 +372,19 @@ def main():
         print(f"❌ Failed to load model: {e}")
         sys.exit(1)
     
+    if share_group:
+        topics = [f"$share/{share_group}/{topic}" for topic in SENSOR_SUBSCRIPTIONS]
+        protocol = mqtt.MQTTv5
+    else:
+        topics = SENSOR_SUBSCRIPTIONS
+        protocol = mqtt.MQTTv311
+    
     # Setup MQTT client (using CallbackAPIVersion for compatibility)
     client = mqtt.Client(
-        client_id=CLIENT_ID,
-        callback_api_version=mqtt.CallbackAPIVersion.VERSION2
+        client_id=client_id,
+        callback_api_version=mqtt.CallbackAPIVersion.VERSION2,
+        protocol=protocol,
+        userdata={"topics": topics}
     )
     # Uncomment if your broker requires authentication
     # client.username_pw_set(MQTT_USER, MQTT_PASS)
@@ -114,6 +392,20 @@ def main():
     client.on_message = on_message
     client.on_disconnect = on_disconnect
     
+    # Start batching stage before any message can arrive
+    batcher = MicroBatcher(
+        model.predict,
+        lambda reading, prediction, clear: publish_status(client, reading.device, prediction, clear),
+    )
+    batcher.start()
+    # Hot swap in the background; a batch is always scored by one model
+    model.start()
+    print(f"🔄 Watching model registry (current: {model.version or MODEL_PATH})")
+    print(f"📦 Micro-batching: max {batcher.max_size} readings / {BATCH_MAX_LATENCY_MS} ms")
+    if PUBLISH_ON_CHANGE:
+        print(f"🔕 Publish-on-change: debounce {STATUS_DEBOUNCE} readings, hysteresis {STATUS_HYSTERESIS[0]} °C / "
+              f"{STATUS_HYSTERESIS[1]} %, keep-alive {STATUS_KEEPALIVE_S} s")
+    
     # Connect to MQTT broker
     print(f"Connecting to MQTT broker: {MQTT_BROKER}:{MQTT_PORT}")
     try:
@@ -123,7 +415,7 @@ def main():
         sys.exit(1)
     
     # Start MQTT loop
-    print("✅ MQTT Inference Server is running...")
+    print(f"✅ {name} is running...")
     print("Press Ctrl+C to stop\n")
     
     try:
@@ -131,9 +423,117 @@ def main():
     except KeyboardInterrupt:
         print("\n\n⚠️ Interrupted by user")
     finally:
+        batcher.stop()
+        model.stop()
         client.loop_stop()
         client.disconnect()
         print("👋 MQTT client disconnected. Goodbye!")
 
+# ===============================
+# Worker Pool
+# ===============================
+def run_worker(index, share_group, publish_on_change=PUBLISH_ON_CHANGE):
+    """Process entry point for one pool worker"""
+    global PUBLISH_ON_CHANGE
+    PUBLISH_ON_CHANGE = publish_on_change
+    try:
+        serve(f"{CLIENT_ID}_w{index}", share_group, name=f"Inference Worker {index}")
+    except KeyboardInterrupt:
+        # Ctrl+C before the MQTT loop was running (e.g. while loading the model)
+        pass
+
+def start_worker(ctx, index, share_group, publish_on_change):
+    process = ctx.Process(target=run_worker, args=(index, share_group, publish_on_change),
+                          name=f"inference-w{index}")
+    process.start()
+    return process
+
+def supervise(n_workers, share_group=SHARE_GROUP, sticky_routing=False):
+    """
+    Run n_workers inference processes and restart any that exit
+    
+    Each worker loads the model itself and has its own MQTT connection, so
+    parsing and prediction scale with cores instead of sharing one GIL.
+    A worker that keeps dying is restarted with exponential backoff.
+    
+    Args:
+        n_workers: Number of worker processes
+        share_group: Shared subscription group name
+        sticky_routing: The broker sends all readings of a device to the
+            same worker, so publish-on-change state stays in one process
+    """
+    print("=" * 60)
+    print(f"🧭 SIC7 Inference Supervisor: {n_workers} workers, group '{share_group}'")
+    print("=" * 60)
+    
+    # Debounce and keep-alive state is per process; with readings of one
+    # device spread across workers each would publish its own changes
+    publish_on_change = PUBLISH_ON_CHANGE and (sticky_routing or n_workers == 1)
+    if PUBLISH_ON_CHANGE and not publish_on_change:
+        print("⚠️ Publish-on-change disabled: a device's readings are spread across workers "
+              "(use --sticky-routing if the broker routes shared subscriptions by publisher)")
+    
+    # spawn: workers start clean (no inherited sockets/threads), same on every OS
+    ctx = multiprocessing.get_context("spawn")
+    workers = {}
+    for index in range(n_workers):
+        workers[index] = {
+            "process": start_worker(ctx, index, share_group, publish_on_change),
+            "started": time.monotonic(),
+            "backoff": RESTART_BACKOFF_S[0],
+            "restart_at": None,
+        }
+    
+    try:
+        while True:
+            time.sleep(0.5)
+            now = time.monotonic()
+            for index, worker in workers.items():
+                process = worker["process"]
+                if worker["restart_at"] is not None:
+                    if now >= worker["restart_at"]:
+                        worker["process"] = start_worker(ctx, index, share_group, publish_on_change)
+                        worker["started"] = now
+                        worker["restart_at"] = None
+                        print(f"🔁 Worker {index} restarted (pid {worker['process'].pid})")
+                    continue
+                if process.is_alive():
+                    continue
+                
+                # Worker died: back off longer the sooner it died again
+                if now - worker["started"] > RESTART_RESET_S:
+                    worker["backoff"] = RESTART_BACKOFF_S[0]
+                print(f"⚠️ Worker {index} exited (code {process.exitcode}); restarting in {worker['backoff']} s")
+                worker["restart_at"] = now + worker["backoff"]
+                worker["backoff"] = min(worker["backoff"] * 2, RESTART_BACKOFF_S[1])
+    except KeyboardInterrupt:
+        print("\n⚠️ Interrupted by user, stopping workers...")
+    finally:
+        # Workers got the same Ctrl+C; give them time to flush their batches
+        for worker in workers.values():
+            worker["process"].join(timeout=10)
+        for worker in workers.values():
+            if worker["process"].is_alive():
+                worker["process"].terminate()
+                worker["process"].join()
+        print("👋 All workers stopped")
+
+# ===============================
+# Main Function
+# ===============================
+def main():
+    parser = argparse.ArgumentParser(description="SIC7 MQTT inference server")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Run N worker processes on a shared subscription (default: single process)")
+    parser.add_argument("--group", default=SHARE_GROUP, help="Shared subscription group name")
+    parser.add_argument("--sticky-routing", action="store_true",
+                        help="Broker routes each device to one worker; keep publish-on-change with --workers")
+    args = parser.parse_args()
+    
+    if args.workers > 0:
+        supervise(args.workers, args.group, args.sticky_routing)
+    else:
+        serve()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,282 @@
+import sys
+import json
+import time
+import asyncio
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import paho.mqtt.client as mqtt
+from devices import SENSOR_SUBSCRIPTIONS, parse_topic, subscribe_all
+from payload import parse_sensor, MAX_BATCH
+from mqtt_inference import (
+    MQTT_BROKER, MQTT_PORT, BATCH_MAX_SIZE, BATCH_MAX_LATENCY_MS, VERBOSE,
+    load_model, get_device, publish_status, predict_with_margin,
+)
+
+# ===============================
+# Configuration
+# ===============================
+CLIENT_ID = f"inference_async_{int(time.time())}"
+INBOX_SIZE = 1024        # Readings waiting for inference (at least payload.MAX_BATCH)
+OUTBOX_SIZE = 1024       # Predictions waiting to be published
+STATS_INTERVAL = 10      # Seconds between queue-depth reports (0 = off)
+RECONNECT_DELAY_S = (1, 30)
+
+# ===============================
+# asyncio Inference Server
+# ===============================
+# Same job as mqtt_inference.py, split into stages connected by bounded
+# queues so a slow stage only fills its own queue:
+#
+#   socket --receive--> inbox --inference (executor)--> outbox --publish--> socket
+#
+# paho has no asyncio API, but it can leave socket I/O to an external loop
+# (on_socket_* callbacks + loop_read/loop_write/loop_misc). Reading is done
+# by the event loop here, which is what gives real backpressure: while the
+# inbox has no room for a whole packet (up to MAX_BATCH readings) the socket
+# is simply not read, and TCP pushes back on the
+# broker instead of readings piling up in memory. Stay below the keepalive
+# (60 s) with any pause, or the broker will drop the connection.
+
+Reading = namedtuple("Reading", ["temp", "hum", "device", "received_at"])
+
+
+class AsyncMqttServer:
+    """
+    Run a paho client on the asyncio event loop
+
+    Args:
+        model: Fitted model (or lookup table) with predict(X)
+        client_id: MQTT client id
+    """
+
+    def __init__(self, model, client_id=CLIENT_ID):
+        self.model = model
+        self.loop = asyncio.get_running_loop()
+        # Must hold one full payload, or reading would never resume
+        self.inbox = asyncio.Queue(maxsize=max(INBOX_SIZE, MAX_BATCH))
+        self.outbox = asyncio.Queue(maxsize=OUTBOX_SIZE)
+        # One thread: predict releases the GIL in NumPy, and a single
+        # worker keeps batches in order
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="predict")
+        self.disconnected = asyncio.Event()
+        self.paused = False
+        self.received = 0
+        self.published = 0
+        self._sock = None
+        self._misc_task = None
+
+        self.client = mqtt.Client(
+            client_id=client_id,
+            callback_api_version=mqtt.CallbackAPIVersion.VERSION2
+        )
+        self.client.on_connect = self.on_connect
+        self.client.on_disconnect = self.on_disconnect
+        self.client.on_message = self.on_message
+        self.client.on_socket_open = self.on_socket_open
+        self.client.on_socket_close = self.on_socket_close
+        self.client.on_socket_register_write = self.on_socket_register_write
+        self.client.on_socket_unregister_write = self.on_socket_unregister_write
+
+    # ---------- socket plumbing ----------
+
+    def on_socket_open(self, client, userdata, sock):
+        self._sock = sock
+        self.loop.add_reader(sock, self.on_readable)
+        self._misc_task = self.loop.create_task(self.misc_loop())
+
+    def on_socket_close(self, client, userdata, sock):
+        self.loop.remove_reader(sock)
+        self._sock = None
+        if self._misc_task is not None:
+            self._misc_task.cancel()
+
+    def on_socket_register_write(self, client, userdata, sock):
+        self.loop.add_writer(sock, client.loop_write)
+
+    def on_socket_unregister_write(self, client, userdata, sock):
+        self.loop.remove_writer(sock)
+
+    def inbox_has_room(self):
+        # One packet can be a binary batch of up to MAX_BATCH readings
+        return self.inbox.maxsize - self.inbox.qsize() >= MAX_BATCH
+
+    def on_readable(self):
+        # One packet per call, read only when its readings all fit, so the
+        # inbox can never overflow
+        if not self.inbox_has_room():
+            self.pause_reading()
+            return
+        self.client.loop_read()
+
+    def pause_reading(self):
+        if not self.paused and self._sock is not None:
+            self.loop.remove_reader(self._sock)
+            self.paused = True
+
+    def resume_reading(self):
+        if self.paused and self._sock is not None:
+            self.loop.add_reader(self._sock, self.on_readable)
+        self.paused = False
+
+    async def misc_loop(self):
+        # Keepalive pings and retries, as loop_forever() would do
+        while self.client.loop_misc() == mqtt.MQTT_ERR_SUCCESS:
+            await asyncio.sleep(1)
+
+    # ---------- MQTT callbacks ----------
+
+    def on_connect(self, client, userdata, flags, rc, properties=None):
+        if rc == 0:
+            print("✅ Connected to MQTT broker")
+            subscribe_all(client, SENSOR_SUBSCRIPTIONS)
+            print(f"📡 Subscribed to topics: {', '.join(SENSOR_SUBSCRIPTIONS)}")
+        else:
+            print(f"❌ Connection failed with code {rc}")
+
+    def on_disconnect(self, client, userdata, flags, rc, properties=None):
+        if rc != 0:
+            print(f"⚠️ Unexpected disconnect (code {rc}). Reconnecting...")
+            self.disconnected.set()
+
+    def on_message(self, client, userdata, msg):
+        """Receive stage: parse and queue (runs on the event loop)"""
+        try:
+            kind, device_id = parse_topic(msg.topic)
+            if kind != "sensor":
+                return
+            temps, hums, _, _ = parse_sensor(msg.payload)
+            device = get_device(device_id)
+            device.readings += len(temps)
+            device.last_seen = time.time()
+            received_at = time.monotonic()
+            for temp, hum in zip(temps.tolist(), hums.tolist()):
+                self.inbox.put_nowait(Reading(temp, hum, device, received_at))
+            self.received += len(temps)
+        except json.JSONDecodeError:
+            print(f"❌ Invalid JSON: {msg.payload.decode(errors='replace')}")
+        except Exception as e:
+            print(f"❌ Error processing message: {e}")
+
+    # ---------- stages ----------
+
+    async def next_batch(self):
+        """Wait for one reading, then gather more for up to BATCH_MAX_LATENCY_MS"""
+        batch = [await self.inbox.get()]
+        deadline = batch[0].received_at + BATCH_MAX_LATENCY_MS / 1000.0
+        while len(batch) < BATCH_MAX_SIZE:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(await asyncio.wait_for(self.inbox.get(), remaining))
+                else:
+                    batch.append(self.inbox.get_nowait())
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                break
+        if self.inbox_has_room():
+            self.resume_reading()
+        return batch
+
+    async def inference_task(self):
+        while True:
+            batch = await self.next_batch()
+            X = np.array([[r.temp, r.hum] for r in batch], dtype=float)
+            try:
+                # Off the event loop, so receiving and publishing keep going
+                # (the hysteresis check is scored in the same call)
+                predictions, clear = await self.loop.run_in_executor(
+                    self.executor, predict_with_margin, self.model.predict, X)
+            except Exception as e:
+                print(f"❌ Error predicting batch of {len(batch)}: {e}")
+                continue
+            if VERBOSE:
+                wait_ms = (time.monotonic() - batch[0].received_at) * 1000
+                print(f"🤖 Predicted batch of {len(batch)} reading(s) (oldest waited {wait_ms:.1f} ms)")
+            for item in zip(batch, predictions.tolist(), clear.tolist()):
+                # Blocks (backpressure) only if publishing falls behind
+                await self.outbox.put(item)
+
+    async def publish_task(self):
+        while True:
+            reading, prediction, clear = await self.outbox.get()
+            try:
+                publish_status(self.client, reading.device, prediction, clear)
+                self.published += 1
+            except Exception as e:
+                print(f"❌ Error publishing result: {e}")
+
+    def queue_depths(self):
+        """Current backlog of each stage"""
+        return {"inbox": self.inbox.qsize(), "outbox": self.outbox.qsize(), "paused": self.paused}
+
+    async def stats_task(self):
+        while True:
+            await asyncio.sleep(STATS_INTERVAL)
+            depths = self.queue_depths()
+            print(f"📊 inbox={depths['inbox']}/{INBOX_SIZE} outbox={depths['outbox']}/{OUTBOX_SIZE} "
+                  f"received={self.received} published={self.published}"
+                  + (" (reading paused)" if depths["paused"] else ""))
+
+    async def connection_task(self):
+        """Reconnect with backoff after unexpected disconnects"""
+        delay = RECONNECT_DELAY_S[0]
+        while True:
+            await self.disconnected.wait()
+            await asyncio.sleep(delay)
+            try:
+                self.client.reconnect()
+                self.disconnected.clear()
+                delay = RECONNECT_DELAY_S[0]
+            except Exception as e:
+                print(f"❌ Reconnect failed: {e}")
+                delay = min(delay * 2, RECONNECT_DELAY_S[1])
+
+    async def run(self):
+        print(f"Connecting to MQTT broker: {MQTT_BROKER}:{MQTT_PORT}")
+        self.client.connect(MQTT_BROKER, MQTT_PORT, keepalive=60)
+        tasks = [self.inference_task(), self.publish_task(), self.connection_task()]
+        if STATS_INTERVAL:
+            tasks.append(self.stats_task())
+        print(f"📦 Queues: inbox {INBOX_SIZE}, outbox {OUTBOX_SIZE}; batches of up to {BATCH_MAX_SIZE} / {BATCH_MAX_LATENCY_MS} ms")
+        print("✅ Async MQTT Inference Server is running...")
+        print("Press Ctrl+C to stop\n")
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            self.client.disconnect()
+            self.executor.shutdown(wait=True)
+
+# ===============================
+# Main Function
+# ===============================
+async def amain():
+    try:
+        model = load_model()
+    except Exception as e:
+        print(f"❌ Failed to load model: {e}")
+        sys.exit(1)
+
+    # Registry hot swap runs on its own thread; the inference stage picks
+    # the new model up on its next batch
+    model.start()
+    server = AsyncMqttServer(model)
+    try:
+        await server.run()
+    except OSError as e:
+        print(f"❌ Failed to connect to MQTT broker: {e}")
+        sys.exit(1)
+    finally:
+        model.stop()
+
+def main():
+    print("=" * 60)
+    print("🚀 SIC7 MQTT Inference Server (asyncio)")
+    print("=" * 60)
+    try:
+        asyncio.run(amain())
+    except KeyboardInterrupt:
+        print("\n\n⚠️ Interrupted by user")
+    print("👋 MQTT client disconnected. Goodbye!")
+
+if __name__ == "__main__":
+    main()
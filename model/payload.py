@@ -0,0 +1,112 @@
+import json
+import struct
+import numpy as np
+
+# ===============================
+# Sensor Payload Format
+# ===============================
+# Firmware can publish readings as JSON ({"temp": 24.5, "hum": 61.0}, the
+# original format, still accepted) or as a compact binary message:
+#
+#   header   4 bytes   "S7", version (1), count (1-255)
+#   records  16 bytes each, little-endian:
+#       device   u32   last 3 bytes of the MAC (the topic id, as hex)
+#       seq      u32   reading counter, +1 per reading
+#       ts_ms    u32   device uptime (millis()) when the reading was taken
+#       temp     i16   temperature in 0.01 °C
+#       hum      u16   relative humidity in 0.01 %
+#
+# A message with count > 1 is a batch: the readings of several intervals
+# sent at once. Receivers date each reading by its age relative to the
+# newest one in the message (ts_ms wraps after ~49 days; ages are taken
+# modulo 2^32). Records are decoded in place with np.frombuffer, without
+# copying or per-field parsing.
+
+MAGIC = b"S7"
+VERSION = 1
+HEADER = struct.Struct("<2sBB")
+MAX_BATCH = 255
+
+RECORD_DTYPE = np.dtype([
+    ("device", "<u4"),
+    ("seq", "<u4"),
+    ("ts_ms", "<u4"),
+    ("temp", "<i2"),
+    ("hum", "<u2"),
+])
+
+
+def is_binary(payload):
+    return bytes(payload[:2]) == MAGIC
+
+
+def encode(temps, hums, device=0, seq=0, ts_ms=None):
+    """
+    Build a binary payload (used by simulators and tests; firmware does the same in C)
+
+    Args:
+        temps, hums: Readings, oldest first
+        device: Device id as int or hex string
+        seq: Sequence number of the first reading
+        ts_ms: Device timestamps per reading (default: 3 s apart)
+
+    Returns:
+        bytes
+    """
+    n = len(temps)
+    if not 0 < n <= MAX_BATCH:
+        raise ValueError(f"A payload carries 1-{MAX_BATCH} readings, got {n}")
+    records = np.zeros(n, dtype=RECORD_DTYPE)
+    records["device"] = int(device, 16) if isinstance(device, str) else device
+    records["seq"] = seq + np.arange(n)
+    records["ts_ms"] = np.arange(n) * 3000 if ts_ms is None else ts_ms
+    records["temp"] = np.round(np.asarray(temps, dtype=float) * 100)
+    records["hum"] = np.round(np.asarray(hums, dtype=float) * 100)
+    return HEADER.pack(MAGIC, VERSION, n) + records.tobytes()
+
+
+def decode(payload):
+    """
+    Records of a binary payload, as a read-only view of its bytes
+
+    Raises:
+        ValueError: Not a binary payload, unknown version, no records or wrong length
+    """
+    if len(payload) < HEADER.size:
+        raise ValueError("Binary payload shorter than its header")
+    magic, version, count = HEADER.unpack_from(payload)
+    if magic != MAGIC:
+        raise ValueError("Not a binary sensor payload")
+    if version != VERSION:
+        raise ValueError(f"Unsupported payload version {version}")
+    if not 0 < count <= MAX_BATCH:
+        raise ValueError(f"A payload carries 1-{MAX_BATCH} readings, got {count}")
+    if len(payload) != HEADER.size + count * RECORD_DTYPE.itemsize:
+        raise ValueError(f"Payload length {len(payload)} does not match {count} record(s)")
+    return np.frombuffer(payload, dtype=RECORD_DTYPE, count=count, offset=HEADER.size)
+
+
+def parse_sensor(payload):
+    """
+    Readings of a sensor message in either format
+
+    Args:
+        payload: Message bytes
+
+    Returns:
+        (temp, hum, pot, age_ms) arrays, oldest reading first; age_ms is
+        how long before the newest reading each one was taken (0 for JSON).
+        Binary records carry no pot, so pot is NaN for them
+
+    Raises:
+        ValueError: Malformed payload (json.JSONDecodeError for bad JSON)
+    """
+    if is_binary(payload):
+        records = decode(payload)
+        ts = records["ts_ms"].astype(np.int64)
+        age = (ts[-1] - ts) % (1 << 32)
+        return (records["temp"] / 100.0, records["hum"] / 100.0,
+                np.full(len(records), np.nan), age)
+    data = json.loads(payload)
+    return (np.array([float(data.get("temp", 0))]), np.array([float(data.get("hum", 0))]),
+            np.array([int(data.get("pot", 0))]), np.zeros(1, dtype=np.int64))
@@ -1,35 +1,134 @@
 import os
 import sys
-import joblib
+import hashlib
+import threading
 import numpy as np
+from lookup_table import load_lookup_predictor, lut_path_for
+from flat_forest import load_model_file, flat_path_for
+from model_registry import current_version, model_path
 
-MODEL_PATH = "model/models/model_random_forest.pkl"
+MODEL_PATH = "model/models/model_random_forest.pkl"  # Used until a model is registered
+USE_LOOKUP_TABLE = True  # Answer from the compiled grid (see lookup_table.py) if present
 
-def load_model():
-    if not os.path.exists(MODEL_PATH):
-        raise FileNotFoundError(f"Model not found: {MODEL_PATH}")
-    return joblib.load(MODEL_PATH)
+# Process-wide cache: path -> (stat key, content hash, model)
+_model_cache = {}
+_cache_lock = threading.Lock()
 
-def predict(temp, hum):
+def resolve_model_path(path=None):
+    """Explicit path, else the registry's CURRENT model, else MODEL_PATH"""
+    if path is not None:
+        return path
+    version = current_version()
+    return model_path(version) if version is not None else MODEL_PATH
+
+def load_model(path=None):
+    """Load a model from disk, bypassing the cache"""
+    path = resolve_model_path(path)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Model not found: {path}")
+    model = load_model_file(path)
+    if USE_LOOKUP_TABLE:
+        model = load_lookup_predictor(model, path)
+    return model
+
+def _watched_files(path):
+    # The lookup table and flat export change what load_model() returns,
+    # so watch them too
+    files = [path, os.path.join(flat_path_for(path), "meta.json")]
+    if USE_LOOKUP_TABLE:
+        files.append(lut_path_for(path))
+    return [f for f in files if os.path.exists(f)]
+
+def _stat_key(files):
+    key = []
+    for f in files:
+        st = os.stat(f)
+        key.append((f, st.st_mtime_ns, st.st_size))
+    return tuple(key)
+
+def _content_hash(files):
+    digest = hashlib.sha256()
+    for f in files:
+        with open(f, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+def get_model(path=None):
+    """
+    Return the cached model for path, reloading it only if the file changed
+    
+    The mtime/size check runs on every call; the content hash is only
+    computed when that check fails, so touching the file without changing
+    it does not trigger a reload. Without a path the registry's CURRENT
+    model is used, so promoting a version takes effect on the next call.
+    """
+    path = resolve_model_path(path)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Model not found: {path}")
+    
+    files = _watched_files(path)
+    key = _stat_key(files)
+    with _cache_lock:
+        entry = _model_cache.get(path)
+        if entry is not None and entry[0] == key:
+            return entry[2]
+        
+        content_hash = _content_hash(files)
+        if entry is not None and entry[1] == content_hash:
+            _model_cache[path] = (key, content_hash, entry[2])
+            return entry[2]
+        
+        model = load_model(path)
+        _model_cache[path] = (key, content_hash, model)
+        return model
+
+def clear_cache():
+    """Drop all cached models"""
+    with _cache_lock:
+        _model_cache.clear()
+
+def predict(temp, hum, path=None):
     """
     Prediksi label berdasarkan suhu dan kelembaban
     
     Args:
         temp: Suhu dalam Celsius
         hum: Kelembaban dalam persen
+        path: Path model (default: model CURRENT di registry, atau MODEL_PATH)
     
     Returns:
         str: Label prediksi ('Panas', 'Normal', atau 'Dingin')
     """
-    model = load_model()
-    X = np.array([[temp, hum]])
-    prediction = model.predict(X)[0]
-    return prediction
+    return predict_many([temp], [hum], path=path)[0]
+
+def predict_many(temps, hums, path=None):
+    """
+    Prediksi label untuk banyak pasangan suhu dan kelembaban sekaligus
+    
+    Args:
+        temps: Array-like suhu dalam Celsius
+        hums: Array-like kelembaban dalam persen (panjang sama dengan temps)
+        path: Path model (default: model CURRENT di registry, atau MODEL_PATH)
+    
+    Returns:
+        np.ndarray: Label prediksi untuk setiap baris
+    """
+    temps = np.asarray(temps, dtype=float).ravel()
+    hums = np.asarray(hums, dtype=float).ravel()
+    if temps.shape != hums.shape:
+        raise ValueError(f"temps and hums must have the same length ({len(temps)} != {len(hums)})")
+    if len(temps) == 0:
+        return np.array([], dtype=object)
+    
+    model = get_model(path)
+    X = np.column_stack([temps, hums])
+    return model.predict(X)
 
 def main():
     # Load model
-    print("Loading model from:", MODEL_PATH)
-    model = load_model()
+    print("Loading model from:", resolve_model_path())
+    get_model()
     print("✓ Model loaded successfully\n")
     
     # Interactive mode atau command line args
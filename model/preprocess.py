@@ -1,25 +1,71 @@
+import numpy as np
 import pandas as pd
 import glob
 import os
+import sys
+import csv
+import json
+import heapq
+import hashlib
+import io
+import shutil
+import tempfile
+import time
+from collections import Counter
 from datetime import datetime
+from dataset_store import write_dataset, import_csv
+from telemetry_store import TelemetryStore, STORE_ROOT
 
 # ===============================
 # Configuration
 # ===============================
 INPUT_FOLDER = "model/dataset/"  # Folder containing CSV files
 OUTPUT_FILE = "model/dataset/combined_labeled.csv"  # Output file
+MANIFEST_FILE = "model/dataset/.preprocess_manifest.json"  # Incremental mode state
+OUTPUT_DATASET = "combined_labeled"  # Parquet copy of OUTPUT_FILE (see dataset_store.py)
+
+# Files this pipeline (or training) produces; never read back as raw input
+OUTPUT_FILENAMES = {"combined_labeled.csv", "custom_labeled.csv", "preprocessed_data.csv"}
 
 # Labeling criteria (customize these thresholds)
+# Each rule maps a column to a half-open interval [lower, upper); None means
+# unbounded. Several columns in one rule must all match. Rules are checked
+# in order and the first match wins; rows matching nothing become "Normal".
+# A rule may also be a row-wise function (lambda row: ...), which still works
+# but is evaluated row by row.
 LABELING_RULES = {
-    "Panas": lambda row: row['temp'] >= 28,
-    "Hangat": lambda row: row['temp'] >= 25,
-    "Dingin": lambda row: row['temp'] < 25,
+    "Panas": {"temp": (28, None)},
+    "Hangat": {"temp": (25, None)},
+    "Dingin": {"temp": (None, 25)},
 }
 
+# Streaming mode (python model/preprocess.py --stream)
+STREAM_CHUNKSIZE = 50_000      # Rows read from a CSV at a time
+STREAM_MERGE_FANIN = 64        # Max sorted runs merged in one pass
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Telemetry store input (python model/preprocess.py --from-store [days])
+STORE_DAYS = None              # Days of history to read (None = everything retained)
+
 # ===============================
 # Functions
 # ===============================
 
+def find_csv_files(folder_path, exclude=OUTPUT_FILENAMES):
+    """
+    List raw CSV files in folder, skipping the pipeline's own outputs
+    
+    Args:
+        folder_path: Path to folder containing CSV files
+        exclude: File names to skip
+    
+    Returns:
+        Sorted list of file paths
+    """
+    csv_files = glob.glob(os.path.join(folder_path, "*.csv"))
+    return sorted(f for f in csv_files if os.path.basename(f) not in exclude)
+
+
 def load_and_combine_csv(folder_path, columns=['timestamp', 'temp', 'hum']):
     """
     Load all CSV files from folder and combine them
@@ -34,7 +80,7 @@ def load_and_combine_csv(folder_path, columns=['timestamp', 'temp', 'hum']):
     print(f"🔍 Searching for CSV files in: {folder_path}")
     
     # Find all CSV files
-    csv_files = glob.glob(os.path.join(folder_path, "*.csv"))
+    csv_files = find_csv_files(folder_path)
     
     if not csv_files:
         print(f"⚠️ No CSV files found in {folder_path}")
@@ -71,6 +117,33 @@ def load_and_combine_csv(folder_path, columns=['timestamp', 'temp', 'hum']):
     return combined_df
 
 
+def load_from_store(root=STORE_ROOT, days=STORE_DAYS, devices=None, columns=['timestamp', 'temp', 'hum']):
+    """
+    Load readings recorded by ingest.py / the dashboard from the telemetry store
+    
+    Args:
+        root: Telemetry store folder
+        days: Only the last `days` days (None = all)
+        devices: Only these device ids (None = all)
+        columns: List of columns to keep
+    
+    Returns:
+        DataFrame, or None if the store holds no readings
+    """
+    print(f"🔍 Reading telemetry store: {root}")
+    store = TelemetryStore(root, readonly=True)
+    start = None if days is None else int((time.time() - days * 86_400) * 1000)
+    df = store.read_frame(start=start, devices=devices)
+    
+    if df.empty:
+        print(f"⚠️ No readings stored in {root}")
+        return None
+    
+    print(f"✅ Loaded {len(df)} readings from {df['device'].nunique()} device(s), "
+          f"{df['timestamp'].min()} → {df['timestamp'].max()}")
+    return df[[col for col in columns if col in df.columns]]
+
+
 def remove_columns(df, columns_to_remove=['prediction', 'predict', 'status']):
     """
     Remove specified columns from dataframe
@@ -99,13 +172,80 @@ def remove_columns(df, columns_to_remove=['prediction', 'predict', 'status']):
     return df
 
 
+def describe_rule(condition):
+    """Human-readable form of a labeling rule"""
+    if callable(condition):
+        return "custom function (row by row)"
+    parts = []
+    for column, (lower, upper) in condition.items():
+        if lower is not None and upper is not None:
+            parts.append(f"{lower} <= {column} < {upper}")
+        elif lower is not None:
+            parts.append(f"{column} >= {lower}")
+        elif upper is not None:
+            parts.append(f"{column} < {upper}")
+        else:
+            parts.append(f"any {column}")
+    return " and ".join(parts)
+
+
+def rule_mask(df, condition):
+    """
+    Evaluate one labeling rule for every row
+    
+    Args:
+        df: Input DataFrame
+        condition: Threshold spec {column: (lower, upper)} or row function
+    
+    Returns:
+        Boolean numpy array, True where the rule matches
+    """
+    if callable(condition):
+        # Slow path for legacy lambda rules
+        if len(df) == 0:
+            return np.zeros(0, dtype=bool)
+        return df.apply(condition, axis=1).to_numpy(dtype=bool)
+    
+    mask = np.ones(len(df), dtype=bool)
+    for column, (lower, upper) in condition.items():
+        values = df[column].to_numpy(dtype=float)
+        if lower is not None:
+            mask &= values >= lower
+        if upper is not None:
+            mask &= values < upper
+    return mask
+
+
+def assign_labels(df, rules=LABELING_RULES, default="Normal"):
+    """
+    Compute labels for every row with first-match-wins semantics
+    
+    Args:
+        df: Input DataFrame
+        rules: Dictionary of label_name: threshold spec or row function
+        default: Label for rows no rule matches
+    
+    Returns:
+        Numpy array of labels
+    """
+    # 'Normal' is the default label, never an explicit rule
+    active = [(label, cond) for label, cond in rules.items() if label != default]
+    if not active:
+        return np.full(len(df), default, dtype=object)
+    
+    masks = [rule_mask(df, cond) for _, cond in active]
+    labels = [label for label, _ in active]
+    return np.select(masks, labels, default=default)
+
+
 def label_data(df, rules=LABELING_RULES):
     """
     Label data based on criteria
     
     Args:
         df: Input DataFrame with 'temp' and 'hum' columns
-        rules: Dictionary of label_name: condition_function
+        rules: Dictionary of label_name: threshold spec (see LABELING_RULES)
+               or label_name: condition_function
     
     Returns:
         DataFrame with 'label' column added
@@ -114,15 +254,11 @@ def label_data(df, rules=LABELING_RULES):
         return None
     
     print("\n🏷️ Labeling data based on criteria:")
+    for label, condition in rules.items():
+        if label != "Normal":
+            print(f"   {label}: {describe_rule(condition)}")
     
-    def assign_label(row):
-        # Check each rule in order (except 'Normal' which is default)
-        for label, condition in rules.items():
-            if label != "Normal" and condition(row):
-                return label
-        return "Normal"
-    
-    df['label'] = df.apply(assign_label, axis=1)
+    df['label'] = assign_labels(df, rules)
     
     # Print label distribution
     label_counts = df['label'].value_counts()
@@ -178,13 +314,14 @@ def clean_data(df):
     return df
 
 
-def save_data(df, output_path):
+def save_data(df, output_path, dataset=None):
     """
     Save DataFrame to CSV
     
     Args:
         df: DataFrame to save
         output_path: Path to output file
+        dataset: Also replace this Parquet dataset in the store (optional)
     """
     if df is None:
         print("❌ No data to save")
@@ -198,6 +335,10 @@ def save_data(df, output_path):
     print(f"\n💾 Saved to: {output_path}")
     print(f"   Total rows: {len(df)}")
     print(f"   Columns: {', '.join(df.columns)}")
+    
+    if dataset is not None:
+        write_dataset(df, dataset, overwrite=True)
+        print(f"   Parquet dataset: {dataset}")
 
 
 def display_sample(df, n=5):
@@ -215,23 +356,459 @@ def display_sample(df, n=5):
     print(df.head(n).to_string(index=False))
 
 
+# ===============================
+# Streaming Pipeline
+# ===============================
+#
+# Memory stays bounded by the chunk size instead of the total history:
+#   1. each CSV is read in chunks; every chunk is cleaned, labeled, sorted
+#      and spilled to disk as a sorted "run"
+#   2. runs are combined with a k-way merge (heapq.merge), in several
+#      passes if there are more than STREAM_MERGE_FANIN of them
+#   3. the final merge drops duplicates and writes the output row by row
+#
+# Duplicate rows share a timestamp, so after the merge they sit in the same
+# timestamp group; only the rows of the current timestamp are remembered.
+
+def prepare_chunk(chunk, columns, rules=LABELING_RULES):
+    """
+    Clean, label and sort one chunk of raw readings
+    
+    Args:
+        chunk: DataFrame read from a CSV
+        columns: Columns to keep (must include 'timestamp')
+        rules: Labeling rules passed to assign_labels
+    
+    Returns:
+        DataFrame sorted by timestamp, with timestamps formatted as text;
+        always exactly columns + ['label'], so every run has the same header
+    """
+    # A file missing one of the columns yields no rows, as in the in-memory
+    # pipeline (where they are NaN after concat and dropped)
+    chunk = chunk.reindex(columns=columns)
+    chunk = chunk.dropna().drop_duplicates()
+    
+    timestamps = pd.to_datetime(chunk['timestamp'], errors='coerce')
+    chunk = chunk[timestamps.notna()].copy()
+    chunk['timestamp'] = timestamps[timestamps.notna()].dt.strftime(TIMESTAMP_FORMAT)
+    
+    chunk['label'] = assign_labels(chunk, rules)
+    # TIMESTAMP_FORMAT sorts lexicographically in time order
+    return chunk.sort_values('timestamp', kind='stable')
+
+
+def write_sorted_runs(csv_files, run_dir, columns, chunksize=STREAM_CHUNKSIZE, rules=LABELING_RULES):
+    """
+    Spill every CSV chunk to disk as a sorted run
+    
+    Returns:
+        (list of run file paths, number of rows read)
+    """
+    runs = []
+    rows_read = 0
+    for file in csv_files:
+        name = os.path.basename(file)
+        try:
+            header = pd.read_csv(file, nrows=0).columns
+            if 'timestamp' not in header:
+                print(f"⚠️ Skipping {name}: no timestamp column")
+                continue
+            
+            file_rows = 0
+            for chunk in pd.read_csv(file, chunksize=chunksize):
+                file_rows += len(chunk)
+                chunk = prepare_chunk(chunk, columns, rules)
+                if len(chunk) == 0:
+                    continue
+                run_path = os.path.join(run_dir, f"run_{len(runs):06d}.csv")
+                chunk.to_csv(run_path, index=False)
+                runs.append(run_path)
+            rows_read += file_rows
+            print(f"✅ Streamed: {name} ({file_rows} rows)")
+        except Exception as e:
+            print(f"❌ Error loading {name}: {e}")
+    return runs, rows_read
+
+
+def iter_run_rows(run_path, chunksize):
+    """Yield rows of a sorted run as tuples, reading it chunk by chunk"""
+    for chunk in pd.read_csv(run_path, chunksize=chunksize, dtype={'timestamp': str}):
+        yield from chunk.itertuples(index=False, name=None)
+
+
+def merge_runs(run_paths, output_path, chunksize=STREAM_CHUNKSIZE, dedupe=False):
+    """
+    K-way merge sorted runs into one sorted CSV
+    
+    Args:
+        run_paths: Sorted run files sharing the same header
+        output_path: File to write
+        chunksize: Total rows buffered across all open runs
+        dedupe: Drop rows identical to one already written
+    
+    Returns:
+        (rows written, Counter of labels written)
+    
+    Raises:
+        ValueError: The runs' headers differ (rows would be merged into
+            the wrong columns)
+    """
+    headers = []
+    for path in run_paths:
+        with open(path, newline='') as f:
+            headers.append(next(csv.reader(f)))
+    header = headers[0]
+    for path, other in zip(run_paths, headers):
+        if other != header:
+            raise ValueError(f"Run {os.path.basename(path)} has columns {other}, expected {header}")
+    ts_index = header.index('timestamp')
+    label_index = header.index('label') if 'label' in header else None
+    
+    per_run = max(1_000, chunksize // len(run_paths))
+    iterators = [iter_run_rows(path, per_run) for path in run_paths]
+    merged = heapq.merge(*iterators, key=lambda row: row[ts_index])
+    
+    written = 0
+    label_counts = Counter()
+    current_ts = None
+    seen_at_ts = set()
+    with open(output_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for row in merged:
+            if dedupe:
+                if row[ts_index] != current_ts:
+                    current_ts = row[ts_index]
+                    seen_at_ts.clear()
+                if row in seen_at_ts:
+                    continue
+                seen_at_ts.add(row)
+            writer.writerow(row)
+            written += 1
+            if label_index is not None:
+                label_counts[row[label_index]] += 1
+    return written, label_counts
+
+
+def stream_preprocess(folder_path, output_path, columns=['timestamp', 'temp', 'hum'],
+                      chunksize=STREAM_CHUNKSIZE, rules=LABELING_RULES, dataset=None):
+    """
+    Preprocess all CSV files in folder with bounded memory
+    
+    Args:
+        folder_path: Path to folder containing CSV files
+        output_path: Path to output file
+        columns: Columns to keep
+        chunksize: Rows per chunk
+        rules: Labeling rules
+        dataset: Also replace this Parquet dataset, written chunk by chunk
+    
+    Returns:
+        Number of rows written, or None if nothing was processed
+    """
+    print(f"🔍 Searching for CSV files in: {folder_path}")
+    csv_files = find_csv_files(folder_path)
+    if not csv_files:
+        print(f"⚠️ No CSV files found in {folder_path}")
+        return None
+    print(f"📁 Found {len(csv_files)} CSV file(s)")
+    
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix="preprocess_", dir=os.path.dirname(output_path) or ".")
+    try:
+        print(f"\n📦 Writing sorted runs (chunksize={chunksize})...")
+        runs, rows_read = write_sorted_runs(csv_files, work_dir, columns, chunksize, rules)
+        if not runs:
+            print("❌ No valid rows found")
+            return None
+        print(f"   {rows_read} rows read into {len(runs)} sorted run(s)")
+        
+        # Intermediate passes keep at most STREAM_MERGE_FANIN files open
+        merge_pass = 0
+        while len(runs) > STREAM_MERGE_FANIN:
+            merge_pass += 1
+            merged_runs = []
+            for i in range(0, len(runs), STREAM_MERGE_FANIN):
+                group = runs[i:i + STREAM_MERGE_FANIN]
+                merged_path = os.path.join(work_dir, f"pass{merge_pass}_{len(merged_runs):06d}.csv")
+                merge_runs(group, merged_path, chunksize)
+                for path in group:
+                    os.remove(path)
+                merged_runs.append(merged_path)
+            print(f"   Merge pass {merge_pass}: {len(runs)} → {len(merged_runs)} run(s)")
+            runs = merged_runs
+        
+        print("\n🔀 Merging runs by timestamp...")
+        tmp_output = os.path.join(work_dir, "output.csv")
+        written, label_counts = merge_runs(runs, tmp_output, chunksize, dedupe=True)
+        # Replace at the end so a previous output is never read half-written
+        shutil.move(tmp_output, output_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    
+    print(f"\n💾 Saved to: {output_path}")
+    print(f"   Total rows: {written}")
+    if dataset is not None:
+        import_csv(output_path, dataset, overwrite=True, chunksize=chunksize)
+        print(f"   Parquet dataset: {dataset}")
+    print("\n📊 Label distribution:")
+    for label, count in label_counts.most_common():
+        print(f"   {label}: {count} ({count / max(written, 1) * 100:.1f}%)")
+    return written
+
+
+# ===============================
+# Incremental Pipeline
+# ===============================
+#
+# The manifest records, per raw file, how many bytes were ingested and the
+# SHA-256 of exactly those bytes. On the next run:
+#   - same size and hash          -> skipped, not even parsed
+#   - bigger, old bytes unchanged -> only the appended tail is parsed
+#   - anything else               -> the file was rewritten, so the output
+#                                    is rebuilt from all raw files
+# New rows are labeled and appended to the existing output.
+
+def load_manifest(manifest_path):
+    """Load the manifest, or an empty one if it does not exist"""
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            return json.load(f)
+    return {"output": None, "files": {}}
+
+
+def save_manifest(manifest, manifest_path):
+    """Write the manifest atomically"""
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def complete_bytes(path):
+    """Size of the file up to and including its last newline"""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        pos = size
+        while pos > 0:
+            step = min(4096, pos)
+            f.seek(pos - step)
+            block = f.read(step)
+            idx = block.rfind(b'\n')
+            if idx >= 0:
+                return pos - step + idx + 1
+            pos -= step
+    return 0
+
+
+def hash_prefix(path, length):
+    """SHA-256 of the first length bytes of a file"""
+    digest = hashlib.sha256()
+    remaining = length
+    with open(path, 'rb') as f:
+        while remaining > 0:
+            block = f.read(min(1 << 20, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+def read_csv_range(path, start, end):
+    """
+    Parse the rows stored in bytes [start, end) of a CSV file
+    
+    start must be 0 or a line boundary; the header is always taken from
+    the first line of the file.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    with open(path, 'rb') as f:
+        if start == 0:
+            data = f.read(end)
+            return pd.read_csv(io.BytesIO(data))
+        f.seek(start)
+        data = f.read(end - start)
+    return pd.read_csv(io.BytesIO(data), header=None, names=header)
+
+
+def plan_incremental(csv_files, manifest):
+    """
+    Decide what to read from each raw file
+    
+    Returns:
+        (list of (path, start, end, sha256) to ingest, rebuild flag)
+    """
+    work = []
+    rebuild = False
+    for path in csv_files:
+        end = complete_bytes(path)
+        entry = manifest["files"].get(path)
+        
+        if entry is None:
+            work.append((path, 0, end, hash_prefix(path, end)))
+            continue
+        
+        old_size = entry["size"]
+        if end < old_size or hash_prefix(path, old_size) != entry["sha256"]:
+            print(f"⚠️ {os.path.basename(path)} was rewritten, full rebuild needed")
+            rebuild = True
+            continue
+        
+        if end > old_size:
+            work.append((path, old_size, end, hash_prefix(path, end)))
+    
+    # Files that disappeared also invalidate rows already in the output
+    missing = set(manifest["files"]) - set(csv_files)
+    if missing:
+        print(f"⚠️ {len(missing)} ingested file(s) no longer exist, full rebuild needed")
+        rebuild = True
+    return work, rebuild
+
+
+def row_keys(df, key_columns):
+    """
+    Hash of each row's key columns, comparable across chunks and files
+    
+    hash_pandas_object hashes 26 (int64) and 26.0 (float64) differently, and
+    pandas infers int for a chunk without decimals, so the key columns are
+    cast to fixed dtypes first: datetime64[ns] for timestamp, float64 else.
+    """
+    keys = pd.DataFrame({
+        col: (pd.to_datetime(df[col], errors='coerce').astype('datetime64[ns]') if col == 'timestamp'
+              else pd.to_numeric(df[col], errors='coerce').astype('float64'))
+        for col in key_columns
+    })
+    return pd.util.hash_pandas_object(keys, index=False)
+
+
+def drop_existing_rows(df, output_path, key_columns=['timestamp', 'temp', 'hum'],
+                       chunksize=STREAM_CHUNKSIZE):
+    """
+    Remove rows already present in the output
+    
+    Overlapping exports (e.g. two dashboard downloads of the same session)
+    would otherwise be appended twice. The output is scanned in chunks and
+    only rows inside the new rows' time range are compared.
+    """
+    if len(df) == 0 or not os.path.exists(output_path):
+        return df
+    
+    lo, hi = df['timestamp'].min(), df['timestamp'].max()
+    new_keys = row_keys(df, key_columns)
+    existing = set()
+    for chunk in pd.read_csv(output_path, usecols=key_columns, chunksize=chunksize):
+        chunk['timestamp'] = pd.to_datetime(chunk['timestamp'], errors='coerce')
+        chunk = chunk[(chunk['timestamp'] >= lo) & (chunk['timestamp'] <= hi)]
+        if len(chunk):
+            existing.update(row_keys(chunk, key_columns))
+    
+    keep = ~new_keys.isin(existing).to_numpy()
+    if (~keep).any():
+        print(f"   Skipped {int((~keep).sum())} row(s) already in the output")
+    return df[keep]
+
+
+def incremental_preprocess(folder_path, output_path=OUTPUT_FILE, manifest_path=MANIFEST_FILE,
+                           columns=['timestamp', 'temp', 'hum'], rules=LABELING_RULES, dataset=None):
+    """
+    Append only new or grown raw files to the existing output
+    
+    Args:
+        folder_path: Path to folder containing raw CSV files
+        output_path: Labeled output CSV (appended to)
+        manifest_path: JSON manifest of ingested files
+        columns: Columns to keep
+        rules: Labeling rules
+        dataset: Parquet dataset kept in step with the output (optional)
+    
+    Returns:
+        Number of rows appended
+    """
+    manifest = load_manifest(manifest_path)
+    if manifest.get("output") != output_path or not os.path.exists(output_path):
+        # Manifest belongs to another output, or the output was deleted
+        manifest = {"output": output_path, "files": {}}
+    
+    csv_files = find_csv_files(folder_path, exclude=OUTPUT_FILENAMES | {os.path.basename(output_path)})
+    work, rebuild = plan_incremental(csv_files, manifest)
+    if rebuild:
+        manifest = {"output": output_path, "files": {}}
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        work, _ = plan_incremental(csv_files, manifest)
+    
+    if not work:
+        print("✅ Nothing new to ingest")
+        return 0
+    
+    dfs = []
+    loaded = []   # Only files read successfully go into the manifest; failed ones are retried next run
+    for path, start, end, sha256 in work:
+        try:
+            part = read_csv_range(path, start, end)
+        except Exception as e:
+            print(f"❌ Error loading {os.path.basename(path)}: {e}")
+            continue
+        kind = "new file" if start == 0 else f"appended tail from byte {start}"
+        print(f"✅ Loaded: {os.path.basename(path)} ({len(part)} rows, {kind})")
+        dfs.append(part)
+        loaded.append((path, end, sha256))
+    if not dfs:
+        return 0
+    
+    df = pd.concat(dfs, ignore_index=True)
+    df = df[[col for col in columns if col in df.columns]]
+    df = clean_data(df)
+    df = drop_existing_rows(df, output_path)
+    df = label_data(df, rules)
+    
+    # Append, writing the header only when the output is new
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    write_header = not os.path.exists(output_path)
+    df.to_csv(output_path, mode='a', header=write_header, index=False)
+    if dataset is not None:
+        # A rebuild starts the CSV over, so the dataset starts over too
+        write_dataset(df, dataset, overwrite=write_header)
+    
+    for path, end, sha256 in loaded:
+        manifest["files"][path] = {
+            "size": end,
+            "sha256": sha256,
+            "ingested_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+    save_manifest(manifest, manifest_path)
+    
+    print(f"\n💾 Appended {len(df)} row(s) to: {output_path}")
+    return len(df)
+
+
 # ===============================
 # Main Function
 # ===============================
 
-def main():
+def main(from_store=False, store_days=STORE_DAYS):
     """
     Main preprocessing pipeline
+    
+    Args:
+        from_store: Read the telemetry store instead of the CSV files
+        store_days: Days of stored history to read (None = all)
     """
     print("=" * 60)
     print("🚀 Data Preprocessing Script")
     print("=" * 60)
     print(f"📅 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
     
-    # Step 1: Load and combine CSV files
-    print("STEP 1: Loading and combining CSV files")
-    print("-" * 60)
-    df = load_and_combine_csv(INPUT_FOLDER, columns=['timestamp', 'temp', 'hum'])
+    # Step 1: Load and combine CSV files (or the telemetry store)
+    if from_store:
+        print("STEP 1: Loading telemetry store")
+        print("-" * 60)
+        df = load_from_store(days=store_days)
+    else:
+        print("STEP 1: Loading and combining CSV files")
+        print("-" * 60)
+        df = load_and_combine_csv(INPUT_FOLDER, columns=['timestamp', 'temp', 'hum'])
     
     if df is None:
         print("\n❌ Preprocessing failed: No data loaded")
@@ -258,7 +835,7 @@ def main():
     print("\n" + "=" * 60)
     print("STEP 5: Saving result")
     print("-" * 60)
-    save_data(df, OUTPUT_FILE)
+    save_data(df, OUTPUT_FILE, dataset=OUTPUT_DATASET)
     
     # Display sample
     display_sample(df, n=10)
@@ -278,11 +855,11 @@ def custom_labeling():
     """
     # Define your own criteria
     CUSTOM_RULES = {
-        "Sangat Panas": lambda row: row['temp'] >= 35,
-        "Panas": lambda row: row['temp'] >= 30 and row['temp'] < 35,
-        "Hangat": lambda row: row['temp'] >= 25 and row['temp'] < 30,
-        "Dingin": lambda row: row['temp'] >= 20 and row['temp'] < 25,
-        "Sangat Dingin": lambda row: row['temp'] < 20,
+        "Sangat Panas": {"temp": (35, None)},
+        "Panas": {"temp": (30, 35)},
+        "Hangat": {"temp": (25, 30)},
+        "Dingin": {"temp": (20, 25)},
+        "Sangat Dingin": {"temp": (None, 20)},
     }
     
     print("🎨 Using custom labeling rules...")
@@ -290,7 +867,7 @@ def custom_labeling():
     df = remove_columns(df)
     df = clean_data(df)
     df = label_data(df, rules=CUSTOM_RULES)
-    save_data(df, "model/dataset/custom_labeled.csv")
+    save_data(df, "model/dataset/custom_labeled.csv", dataset="custom_labeled")
 
 
 # ===============================
@@ -299,7 +876,20 @@ def custom_labeling():
 
 if __name__ == "__main__":
     # Option 1: Use default labeling
-    main()
+    if "--stream" in sys.argv:
+        # Bounded-memory variant for large histories
+        stream_preprocess(INPUT_FOLDER, OUTPUT_FILE, dataset=OUTPUT_DATASET)
+    elif "--incremental" in sys.argv:
+        # Only parse raw files that are new or changed since the last run
+        incremental_preprocess(INPUT_FOLDER, OUTPUT_FILE, MANIFEST_FILE, dataset=OUTPUT_DATASET)
+    elif "--from-store" in sys.argv:
+        # Readings recorded by ingest.py / the dashboard instead of CSV dumps;
+        # an optional number after the flag limits it to the last N days
+        position = sys.argv.index("--from-store") + 1
+        days = float(sys.argv[position]) if position < len(sys.argv) else STORE_DAYS
+        main(from_store=True, store_days=days)
+    else:
+        main()
     
     # Option 2: Use custom labeling (uncomment to use)
     # custom_labeling()
\ No newline at end of file
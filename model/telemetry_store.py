@@ -0,0 +1,619 @@
+import os
+import sys
+import json
+import time
+from datetime import datetime
+try:
+    import fcntl
+except ImportError:   # Windows: the single-writer rule is not enforced
+    fcntl = None
+import numpy as np
+import pandas as pd
+
+# ===============================
+# Configuration
+# ===============================
+STORE_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dataset", "telemetry")
+DEVICES_FILE = "devices.json"   # Device id strings, position = id stored in records
+LOCK_FILE = "writer.lock"       # Held (flock) by the one writer
+PARTITION_SUFFIX = ".bin"
+RETENTION_DAYS = 90             # Whole day files older than this are deleted
+DAY_MS = 86_400_000
+
+# Rollup tiers: name -> (bucket width in ms, retention in days). Each tier
+# keeps min/max/mean/count of temp and hum per device and bucket.
+TIERS = {
+    "1m": (60_000, RETENTION_DAYS),
+    "1h": (3_600_000, 3 * 365),
+}
+RAW_INTERVAL_MS = 3_000         # Sensor publish period, to estimate raw point counts
+
+# One reading, fixed size (24 bytes), little-endian
+RECORD_DTYPE = np.dtype([
+    ("ts_ms", "<i8"),     # Reading time, milliseconds since epoch (UTC)
+    ("device", "<u4"),    # Index into devices.json
+    ("temp", "<f4"),
+    ("hum", "<f4"),
+    ("pot", "<i4"),       # POT_MISSING if the reading had none
+])
+POT_MISSING = -1
+EMPTY_RECORDS = np.zeros(0, dtype=RECORD_DTYPE)
+
+# One rollup bucket of one device (40 bytes)
+ROLLUP_DTYPE = np.dtype([
+    ("ts_ms", "<i8"),     # Bucket start
+    ("device", "<u4"),
+    ("count", "<u4"),
+    ("temp_min", "<f4"),
+    ("temp_max", "<f4"),
+    ("temp_mean", "<f4"),
+    ("hum_min", "<f4"),
+    ("hum_max", "<f4"),
+    ("hum_mean", "<f4"),
+])
+EMPTY_ROLLUPS = np.zeros(0, dtype=ROLLUP_DTYPE)
+
+LOCAL_TZ = datetime.now().astimezone().tzinfo   # Naive datetimes (dashboard, CSVs) are local time
+
+# ===============================
+# Telemetry Store
+# ===============================
+# Layout:
+#
+#   model/dataset/telemetry/
+#       devices.json            ["default", "a1b2c3d4", ...]
+#       2025-12-04.bin          records of that UTC day, sorted by ts_ms
+#       2025-12-05.bin
+#       rollup_1m/2025-12-04.bin
+#       rollup_1h/2025-12-04.bin
+#
+# Files are written whole records at a time by a single writer (ingest.py,
+# or the dashboard in mqtt mode), which holds an exclusive lock on
+# writer.lock; a second writer fails at startup. Each day file is kept
+# sorted by ts_ms, so its ts_ms column is its own timestamp index: a range
+# query memory-maps the file and binary-searches it (np.searchsorted),
+# touching O(log n) pages instead of scanning the day. New readings are
+# appended; late ones (a batch backdated behind another device's reading)
+# are merged into the tail of their day, which is rewritten from that
+# point, so a reader polling at that moment may see the tail mid-rewrite.
+# Readers ignore a trailing partial record, so they can run at any time.
+#
+# Rollups are maintained as readings arrive: the writer accumulates the
+# open bucket of every tier in memory and appends it once time moves into
+# the next bucket; a late reading rebuilds the closed bucket it falls in.
+# Readers aggregate the still-open tail from the raw records, and a writer
+# that starts up rebuilds it the same way.
+
+def partition_name(day):
+    """File name of a day number (days since epoch)"""
+    return str(np.datetime64(int(day), "D")) + PARTITION_SUFFIX
+
+def to_ms(value):
+    """Epoch milliseconds from ms, a datetime/str (local time if naive) or None"""
+    if value is None or isinstance(value, (int, np.integer)):
+        return value
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is None:
+        ts = ts.tz_localize(LOCAL_TZ)
+    return int(ts.value // 1_000_000)
+
+def local_time(ts_ms):
+    """Naive local-time datetime64[ms] array of epoch milliseconds (inverse of to_ms)"""
+    times = pd.to_datetime(np.asarray(ts_ms, dtype=np.int64), unit="ms", utc=True)
+    return times.tz_convert(LOCAL_TZ).tz_localize(None).to_numpy(dtype="datetime64[ms]")
+
+def list_partitions(folder):
+    """(day number, path) of every day file in folder, oldest first"""
+    if not os.path.isdir(folder):
+        return []
+    found = []
+    for name in os.listdir(folder):
+        if name.endswith(PARTITION_SUFFIX):
+            try:
+                day = int(np.datetime64(name[:-len(PARTITION_SUFFIX)], "D").astype(np.int64))
+            except ValueError:
+                continue
+            found.append((day, os.path.join(folder, name)))
+    return sorted(found)
+
+def map_partition(path, dtype):
+    """Read-only view of a day file's complete records"""
+    count = os.path.getsize(path) // dtype.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+def last_record(folder, dtype):
+    """Newest record in a folder of day files, or None"""
+    for _, path in reversed(list_partitions(folder)):
+        records = map_partition(path, dtype)
+        if len(records):
+            return np.array(records[-1])
+    return None
+
+def aggregate(records, width_ms):
+    """
+    Roll raw records up into buckets of width_ms
+
+    Returns:
+        ROLLUP_DTYPE array sorted by bucket, then device
+    """
+    if len(records) == 0:
+        return EMPTY_ROLLUPS
+    buckets = records["ts_ms"] - records["ts_ms"] % width_ms
+    order = np.lexsort((records["device"], buckets))
+    buckets, device = buckets[order], records["device"][order]
+    starts = np.flatnonzero(np.r_[True, (buckets[1:] != buckets[:-1]) | (device[1:] != device[:-1])])
+    count = np.diff(np.r_[starts, len(buckets)])
+
+    out = np.zeros(len(starts), dtype=ROLLUP_DTYPE)
+    out["ts_ms"] = buckets[starts]
+    out["device"] = device[starts]
+    out["count"] = count
+    for name in ("temp", "hum"):
+        values = records[name][order].astype(np.float64)
+        out[f"{name}_min"] = np.minimum.reduceat(values, starts)
+        out[f"{name}_max"] = np.maximum.reduceat(values, starts)
+        out[f"{name}_mean"] = np.add.reduceat(values, starts) / count
+    return out
+
+def pick_tier(start_ms, end_ms, max_points):
+    """
+    Finest resolution that plots start..end in at most max_points per device
+
+    Returns:
+        "raw" or a TIERS name (the coarsest tier if even that is too fine)
+    """
+    span = max(0, end_ms - start_ms)
+    if span / RAW_INTERVAL_MS <= max_points:
+        return "raw"
+    for tier, (width, _) in TIERS.items():
+        if span / width <= max_points:
+            return tier
+    return tier
+
+
+class DayFileAppender:
+    """
+    Appends records to the day files of one folder, keeping ts_ms sorted
+
+    Args:
+        folder: Folder of day files
+        dtype: Record dtype (needs a ts_ms field)
+        unique: Rows are keyed by (ts_ms, device) (rollups): a written row
+            replaces the stored one with the same key
+    """
+
+    def __init__(self, folder, dtype, unique=False):
+        self.folder = folder
+        self.dtype = dtype
+        self.unique = unique
+        self.file = None
+        self.path = None
+        self.day = None
+        self.last_ts = 0
+        os.makedirs(folder, exist_ok=True)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self.day = None
+
+    def _open_day(self, day):
+        self.close()
+        path = os.path.join(self.folder, partition_name(day))
+        self.last_ts = 0
+        if os.path.exists(path):
+            # Drop a partial record left by a crash, then resume after the last one
+            size = os.path.getsize(path)
+            whole = size - size % self.dtype.itemsize
+            if whole != size:
+                os.truncate(path, whole)
+            if whole:
+                self.last_ts = int(np.fromfile(path, dtype=self.dtype, offset=whole - self.dtype.itemsize)["ts_ms"][0])
+        self.file = open(os.open(path, os.O_RDWR | os.O_CREAT, 0o644), "r+b", buffering=0)
+        self.path = path
+        self.day = day
+
+    def write(self, records):
+        """
+        Write records, one write per day file
+
+        Records newer than the last one of their day are appended; older
+        (late) ones are merged into the day's tail, see _insert().
+
+        Returns:
+            The records as written (sorted by ts_ms)
+        """
+        records = records[np.argsort(records["ts_ms"], kind="stable")]
+        days = records["ts_ms"] // DAY_MS
+        for day in np.unique(days):
+            block = records[days == day]
+            if day != self.day:
+                self._open_day(int(day))
+            first = int(block["ts_ms"][0])
+            if first > self.last_ts or (first == self.last_ts and not self.unique):
+                self.file.seek(0, os.SEEK_END)
+                self.file.write(block.tobytes())
+            else:
+                self._insert(block)
+            self.last_ts = max(self.last_ts, int(block["ts_ms"][-1]))
+        return records
+
+    def _insert(self, block):
+        """
+        Merge a sorted block into the open day file
+
+        Rewrites the file from the first stored record newer than the block
+        (or, for unique files, the first one of its oldest key) with the
+        merged rows. Late readings are normally seconds old, so the rewrite
+        touches a few records at the end of the day.
+        """
+        stored = map_partition(self.path, self.dtype)
+        side = "left" if self.unique else "right"
+        lo = int(np.searchsorted(stored["ts_ms"], block["ts_ms"][0], side=side))
+        tail = np.array(stored[lo:])
+        del stored
+        if self.unique:
+            keys = set(zip(block["ts_ms"].tolist(), block["device"].tolist()))
+            replaced = np.array([key in keys for key in zip(tail["ts_ms"].tolist(), tail["device"].tolist())],
+                                dtype=bool)
+            merged = np.concatenate([tail[~replaced], block])
+            merged = merged[np.lexsort((merged["device"], merged["ts_ms"]))]
+        else:
+            merged = np.concatenate([tail, block])
+            merged = merged[np.argsort(merged["ts_ms"], kind="stable")]   # Stored rows first on ties
+        # merged is never shorter than tail, so no stale record is left behind
+        self.file.seek(lo * self.dtype.itemsize)
+        self.file.write(merged.tobytes())
+
+    def prune(self, retention_days):
+        """Delete day files older than retention_days; returns files removed"""
+        oldest = int(time.time() * 1000) // DAY_MS - retention_days
+        removed = 0
+        for day, path in list_partitions(self.folder):
+            if day < oldest and day != self.day:
+                os.remove(path)
+                removed += 1
+        return removed
+
+
+class TelemetryStore:
+    """
+    Append-only, day-partitioned store of sensor readings and their rollups
+
+    Args:
+        root: Store folder
+        readonly: Reader (dashboard charts, preprocess); never writes
+
+    Raises:
+        RuntimeError: Writer requested while another process holds the store
+    """
+
+    def __init__(self, root=STORE_ROOT, readonly=False):
+        self.root = root
+        self.readonly = readonly
+        self._devices = []
+        self._device_index = {}
+        self._devices_mtime = None
+        self._raw = None
+        self._tiers = {}
+        self._open = {}   # tier -> (bucket start, {device: accumulator row})
+        self._lock = None
+        if not readonly:
+            self._acquire_lock()
+            self._raw = DayFileAppender(root, RECORD_DTYPE)
+            self._tiers = {tier: DayFileAppender(self.tier_folder(tier), ROLLUP_DTYPE, unique=True)
+                           for tier in TIERS}
+        self._load_devices()
+        if not readonly:
+            self._resume_rollups()
+
+    def close(self):
+        for appender in [self._raw, *self._tiers.values()]:
+            if appender is not None:
+                appender.close()
+        if self._lock is not None:
+            self._lock.close()   # Releases the flock
+            self._lock = None
+
+    def _acquire_lock(self):
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = open(os.path.join(self.root, LOCK_FILE), "a+")
+        if fcntl is None:
+            return
+        try:
+            fcntl.flock(self._lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock.close()
+            self._lock = None
+            raise RuntimeError(f"Telemetry store {self.root} already has a writer "
+                               "(ingest.py and an mqtt-mode dashboard cannot both run)")
+        self._lock.seek(0)
+        self._lock.truncate()
+        self._lock.write(f"{os.getpid()}\n")
+        self._lock.flush()
+
+    def tier_folder(self, tier):
+        return os.path.join(self.root, f"rollup_{tier}")
+
+    # ---------- devices ----------
+
+    def _load_devices(self):
+        path = os.path.join(self.root, DEVICES_FILE)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return
+        if mtime == self._devices_mtime:
+            return
+        with open(path) as f:
+            self._devices = json.load(f)
+        self._device_index = {name: i for i, name in enumerate(self._devices)}
+        self._devices_mtime = mtime
+
+    def _device_id(self, name):
+        """Index of a device, registering it on first sight (writer only)"""
+        index = self._device_index.get(name)
+        if index is None:
+            index = len(self._devices)
+            self._devices.append(name)
+            self._device_index[name] = index
+            path = os.path.join(self.root, DEVICES_FILE)
+            with open(path + ".tmp", "w") as f:
+                json.dump(self._devices, f)
+            os.replace(path + ".tmp", path)
+        return index
+
+    def _wanted(self, devices):
+        """Device indexes for a list of ids (None = all)"""
+        if devices is None:
+            return None
+        self._load_devices()
+        return np.array([self._device_index[d] for d in map(str, devices) if d in self._device_index],
+                        dtype=np.uint32)
+
+    def device_names(self):
+        self._load_devices()
+        return list(self._devices)
+
+    # ---------- writer side ----------
+
+    def append_many(self, rows):
+        """
+        Append readings and update the rollups
+
+        Args:
+            rows: Iterable of (ts_ms, device_id, temp, hum, pot), in any order
+                (readings older than the stored ones are merged in place);
+                pot may be NaN or None (not sent)
+
+        Returns:
+            Number of records written
+        """
+        if self.readonly:
+            raise PermissionError("TelemetryStore opened read-only")
+        rows = list(rows)
+        if not rows:
+            return 0
+        records = np.zeros(len(rows), dtype=RECORD_DTYPE)
+        for i, (ts_ms, device_id, temp, hum, pot) in enumerate(rows):
+            if pot is None or pot != pot:   # None or NaN
+                pot = POT_MISSING
+            records[i] = (ts_ms, self._device_id(str(device_id)), temp, hum, pot)
+        records = self._raw.write(records)
+        for tier in TIERS:
+            self._roll(tier, records)
+        return len(records)
+
+    def append(self, ts_ms, device_id, temp, hum, pot=0):
+        return self.append_many([(ts_ms, device_id, temp, hum, pot)])
+
+    def _roll(self, tier, records):
+        """
+        Add written records to the open bucket, closing it when time moves on
+
+        Records older than the open bucket (late readings) land in buckets
+        that are already written; those are rebuilt from the raw records.
+        """
+        width = TIERS[tier][0]
+        bucket, acc = self._open.get(tier, (None, {}))
+        if bucket is not None:
+            late = records["ts_ms"] < bucket
+            if late.any():
+                self._rebuild(tier, records[late])
+                records = records[~late]
+        for ts_ms, device, temp, hum in zip(records["ts_ms"].tolist(), records["device"].tolist(),
+                                            records["temp"].tolist(), records["hum"].tolist()):
+            start = ts_ms - ts_ms % width
+            if bucket is not None and start != bucket:
+                self._flush(tier, bucket, acc)
+                acc = {}
+            bucket = start
+            row = acc.get(device)
+            if row is None:
+                acc[device] = [1, temp, temp, temp, hum, hum, hum]
+            else:
+                row[0] += 1
+                row[1] = min(row[1], temp); row[2] = max(row[2], temp); row[3] += temp
+                row[4] = min(row[4], hum); row[5] = max(row[5], hum); row[6] += hum
+        self._open[tier] = (bucket, acc)
+
+    def _rebuild(self, tier, late):
+        """Rewrite the closed buckets of a tier that late records fell into"""
+        width = TIERS[tier][0]
+        devices = np.unique(late["device"])
+        for start in np.unique(late["ts_ms"] - late["ts_ms"] % width).tolist():
+            raw = self._query_folder(self.root, RECORD_DTYPE, start, start + width, devices)
+            self._tiers[tier].write(aggregate(raw, width))
+
+    def _flush(self, tier, bucket, acc):
+        out = np.zeros(len(acc), dtype=ROLLUP_DTYPE)
+        for i, device in enumerate(sorted(acc)):
+            count, t_min, t_max, t_sum, h_min, h_max, h_sum = acc[device]
+            out[i] = (bucket, device, count, t_min, t_max, t_sum / count, h_min, h_max, h_sum / count)
+        self._tiers[tier].write(out)
+
+    def _resume_rollups(self):
+        """
+        Catch each tier up with the raw records (after a restart or on a new tier)
+
+        Reads one raw day file at a time, so rebuilding a tier from scratch
+        never holds more than a day of records. Buckets never straddle days
+        (every width divides a day), so the buckets of all but the newest
+        day are closed and written as they are; the newest day goes through
+        _roll(), which keeps its last bucket open.
+        """
+        for tier, (width, _) in TIERS.items():
+            last = last_record(self.tier_folder(tier), ROLLUP_DTYPE)
+            since = None if last is None else int(last["ts_ms"]) + width
+            newest = None
+            for day, path in list_partitions(self.root):
+                if since is not None and day < since // DAY_MS:
+                    continue
+                records = map_partition(path, RECORD_DTYPE)
+                lo = 0 if since is None else np.searchsorted(records["ts_ms"], since, side="left")
+                if lo == len(records):
+                    continue
+                if newest is not None:
+                    self._tiers[tier].write(aggregate(newest, width))
+                newest = np.array(records[lo:])
+                del records
+            if newest is not None:
+                self._roll(tier, newest)
+
+    def prune(self, retention_days=RETENTION_DAYS):
+        """Delete raw day files older than retention_days (tiers use TIERS); returns files removed"""
+        removed = self._raw.prune(retention_days)
+        for tier, (_, tier_retention) in TIERS.items():
+            removed += self._tiers[tier].prune(tier_retention)
+        return removed
+
+    # ---------- reader side ----------
+
+    def partitions(self):
+        """(day number, path) of every raw day file, oldest first"""
+        return list_partitions(self.root)
+
+    def _query_folder(self, folder, dtype, start_ms, end_ms, wanted):
+        first = None if start_ms is None else start_ms // DAY_MS
+        last = None if end_ms is None else (end_ms - 1) // DAY_MS
+        parts = []
+        for day, path in list_partitions(folder):
+            if (first is not None and day < first) or (last is not None and day > last):
+                continue
+            records = map_partition(path, dtype)
+            ts = records["ts_ms"]
+            lo = 0 if start_ms is None else np.searchsorted(ts, start_ms, side="left")
+            hi = len(ts) if end_ms is None else np.searchsorted(ts, end_ms, side="left")
+            block = np.array(records[lo:hi])
+            if wanted is not None:
+                block = block[np.isin(block["device"], wanted)]
+            parts.append(block)
+            del records
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=dtype)
+
+    def query(self, start=None, end=None, devices=None):
+        """
+        Records with start <= ts < end, oldest first
+
+        Args:
+            start, end: Epoch ms, datetime or string (None = unbounded)
+            devices: Only these device ids (None = all)
+
+        Returns:
+            Structured array of RECORD_DTYPE (a copy, safe to keep)
+        """
+        wanted = self._wanted(devices)
+        if wanted is not None and len(wanted) == 0:
+            return EMPTY_RECORDS
+        return self._query_folder(self.root, RECORD_DTYPE, to_ms(start), to_ms(end), wanted)
+
+    def rollup(self, tier, start=None, end=None, devices=None):
+        """
+        Buckets of a tier overlapping start..end, oldest first
+
+        Closed buckets come from the tier's files; the open one(s) at the
+        end are aggregated from the raw records on the fly.
+
+        Returns:
+            Structured array of ROLLUP_DTYPE
+        """
+        width = TIERS[tier][0]
+        wanted = self._wanted(devices)
+        if wanted is not None and len(wanted) == 0:
+            return EMPTY_ROLLUPS
+        start_ms, end_ms = to_ms(start), to_ms(end)
+        if start_ms is not None:
+            start_ms -= start_ms % width
+        closed = self._query_folder(self.tier_folder(tier), ROLLUP_DTYPE, start_ms, end_ms, wanted)
+
+        last = last_record(self.tier_folder(tier), ROLLUP_DTYPE)
+        tail_start = start_ms if last is None else max(start_ms or 0, int(last["ts_ms"]) + width)
+        if end_ms is not None and tail_start is not None and tail_start >= end_ms:
+            return closed
+        tail = aggregate(self._query_folder(self.root, RECORD_DTYPE, tail_start, end_ms, wanted), width)
+        return np.concatenate([closed, tail])
+
+    def to_frame(self, records):
+        """
+        DataFrame of records or rollups: timestamp (local time, like the CSV
+        logs), device, then the remaining fields
+        """
+        self._load_devices()
+        names = np.array(self._devices + [""], dtype=object)
+        device = np.minimum(records["device"], len(self._devices))
+        df = pd.DataFrame({"timestamp": local_time(records["ts_ms"]), "device": names[device]})
+        for name in records.dtype.names[2:]:
+            values = records[name]
+            if name == "pot":
+                df[name] = pd.array(values, dtype="Int32")
+                df.loc[values == POT_MISSING, name] = pd.NA
+            else:
+                df[name] = values.astype(float).round(2) if values.dtype.kind == "f" else values
+        return df
+
+    def read_frame(self, start=None, end=None, devices=None, tier="raw"):
+        """Readings (tier="raw") or rollups of a tier as a DataFrame"""
+        if tier == "raw":
+            return self.to_frame(self.query(start, end, devices))
+        return self.to_frame(self.rollup(tier, start, end, devices))
+
+# ===============================
+# Main Function
+# ===============================
+def main():
+    usage = ("Usage: python model/telemetry_store.py [info | export <file.csv> [start] [end] [--tier=1m|1h]]\n"
+             "       start/end: e.g. '2025-12-04' or '2025-12-04 13:00' (local time)")
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    tier = next((a.split("=", 1)[1] for a in sys.argv[1:] if a.startswith("--tier=")), "raw")
+    command = args[0] if args else "info"
+    store = TelemetryStore(readonly=True)
+
+    if command == "info":
+        parts = store.partitions()
+        if not parts:
+            print(f"No telemetry stored in {store.root}")
+            return
+        total = 0
+        for day, path in parts:
+            count = os.path.getsize(path) // RECORD_DTYPE.itemsize
+            total += count
+            print(f"  {os.path.basename(path)}  {count:>10,} records")
+        print(f"📊 {total:,} records, {len(parts)} day(s), devices: {', '.join(store.device_names())}")
+        for name in TIERS:
+            buckets = sum(os.path.getsize(p) // ROLLUP_DTYPE.itemsize for _, p in list_partitions(store.tier_folder(name)))
+            print(f"   rollup {name}: {buckets:,} closed buckets")
+    elif command == "export" and len(args) > 1 and (tier == "raw" or tier in TIERS):
+        start = args[2] if len(args) > 2 else None
+        end = args[3] if len(args) > 3 else None
+        df = store.read_frame(start, end, tier=tier)
+        df.to_csv(args[1], index=False)
+        print(f"✅ Exported {len(df)} rows to {args[1]}")
+    else:
+        print(usage)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,64 +1,229 @@
 import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 import joblib
-import pandas as pd
-from sklearn.model_selection import train_test_split
+import pyarrow.dataset as ds
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables HalvingRandomSearchCV)
+from sklearn.model_selection import train_test_split, RandomizedSearchCV, HalvingRandomSearchCV
 from sklearn.tree import DecisionTreeClassifier
 from sklearn.neighbors import KNeighborsClassifier
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, classification_report
+from dataset_store import load_or_import
+from model_registry import register_model, data_hash
+from flat_forest import export_flat
+from benchmark import benchmark_model, select_model, write_report, print_report, LATENCY_METRIC
 
 DATASET_PATH = "model/dataset/preprocessed_data.csv"
+DATASET_NAME = "preprocessed_data"  # Parquet copy of DATASET_PATH in the dataset store
 MODEL_DIR = "model/models"
 
+# Hyperparameter search: "halving" (HalvingRandomSearchCV), "random"
+# (RandomizedSearchCV) or "none" (fit the defaults below, as before)
+SEARCH = "halving"
+SEARCH_ITER = 20          # Parameter settings sampled per model
+SEARCH_CV = 5             # Cross-validation folds
+SEARCH_N_JOBS = -1        # Cores per search; split between models when PARALLEL
+PARALLEL = True           # Search all candidates at once, one process each
+RANDOM_STATE = 42
+
 os.makedirs(MODEL_DIR, exist_ok=True)
 
+def make_candidates():
+    """Model name -> (default estimator, search space)"""
+    return {
+        "decision_tree": (
+            DecisionTreeClassifier(random_state=RANDOM_STATE),
+            {
+                "criterion": ["gini", "entropy"],
+                "max_depth": [None, 3, 4, 5, 6, 8, 10, 15, 20],
+                "min_samples_split": [2, 5, 10, 20],
+                "min_samples_leaf": [1, 2, 5, 10],
+            },
+        ),
+        "knn": (
+            KNeighborsClassifier(n_neighbors=5),
+            {
+                "n_neighbors": [1, 3, 5, 7, 9, 11, 15, 21, 31],
+                "weights": ["uniform", "distance"],
+                "p": [1, 2],
+            },
+        ),
+        "random_forest": (
+            # n_jobs=1: the search already runs settings in parallel
+            RandomForestClassifier(n_estimators=100, n_jobs=1, random_state=RANDOM_STATE),
+            {
+                "n_estimators": [50, 100, 200, 300],
+                "max_depth": [None, 5, 8, 12, 20],
+                "min_samples_leaf": [1, 2, 5],
+                "max_features": ["sqrt", None],
+            },
+        ),
+    }
+
 def load_dataset():
-    if not os.path.exists(DATASET_PATH):
-        raise FileNotFoundError(f"Dataset not found: {DATASET_PATH}")
-    df = pd.read_csv(DATASET_PATH)
+    # Only the feature, label and timestamp columns are read; unlabeled
+    # rows are filtered inside the Parquet scan. timestamp is only there so
+    # read_dataset returns the rows in time order (not the CSV's row
+    # order), which keeps the seeded train/test split reproducible
+    df = load_or_import(
+        DATASET_NAME, DATASET_PATH,
+        columns=["timestamp", "temp", "hum", "label"],
+        expression=ds.field("label").is_valid(),
+    )
+    df = df.drop(columns=["timestamp"])
     df = df.dropna(subset=["temp", "hum", "label"])
     return df
 
-def train_models(X_train, y_train):
-    models = {
-        "decision_tree": DecisionTreeClassifier(),
-        "knn": KNeighborsClassifier(n_neighbors=5),
-        "random_forest": RandomForestClassifier(n_estimators=100)
-    }
-
-    for name, model in models.items():
-        model.fit(X_train, y_train)
-        joblib.dump(model, f"{MODEL_DIR}/model_{name}.pkl")
-        print(f"[+] Saved {name} → model_{name}.pkl")
-
-    return models
+def fit_candidate(name, estimator, space, X_train, y_train, search=SEARCH, n_jobs=SEARCH_N_JOBS):
+    """
+    Fit one candidate, with a hyperparameter search unless search="none"
+
+    Module-level so it can run in a worker process.
+
+    Returns:
+        (name, fitted model, info dict with timing and search results)
+    """
+    start = time.perf_counter()
+    if search == "none":
+        estimator.fit(X_train, y_train)
+        best, info = estimator, {}
+    else:
+        if search == "halving":
+            # "exhaust": the last round gets the whole training set, the
+            # first round a fraction large enough for every setting to fit
+            searcher = HalvingRandomSearchCV(
+                estimator, space, n_candidates=SEARCH_ITER, cv=SEARCH_CV,
+                min_resources="exhaust", n_jobs=n_jobs, random_state=RANDOM_STATE,
+            )
+        elif search == "random":
+            searcher = RandomizedSearchCV(
+                estimator, space, n_iter=SEARCH_ITER, cv=SEARCH_CV,
+                n_jobs=n_jobs, random_state=RANDOM_STATE,
+            )
+        else:
+            raise ValueError(f"Unknown search: {search}")
+        searcher.fit(X_train, y_train)
+        best = searcher.best_estimator_
+        info = {
+            "cv_accuracy": round(float(searcher.best_score_), 6),
+            "best_params": searcher.best_params_,
+            "settings_tried": len(searcher.cv_results_["params"]),
+        }
+    info["fit_seconds"] = round(time.perf_counter() - start, 3)
+    return name, best, info
+
+def train_models(X_train, y_train, search=SEARCH, parallel=PARALLEL):
+    """
+    Fit (and tune) every candidate and save each as model_<name>.pkl
+
+    Returns:
+        (models dict, training info dict), both keyed by model name
+    """
+    candidates = make_candidates()
+    models, infos = {}, {}
+
+    if parallel:
+        # Share the cores between the concurrent searches instead of
+        # letting each one claim all of them
+        n_jobs = SEARCH_N_JOBS
+        if n_jobs == -1:
+            n_jobs = max(1, (os.cpu_count() or 1) // len(candidates))
+        with ProcessPoolExecutor(max_workers=len(candidates)) as pool:
+            futures = [
+                pool.submit(fit_candidate, name, estimator, space, X_train, y_train, search, n_jobs)
+                for name, (estimator, space) in candidates.items()
+            ]
+            results = [future.result() for future in futures]
+    else:
+        results = [
+            fit_candidate(name, estimator, space, X_train, y_train, search)
+            for name, (estimator, space) in candidates.items()
+        ]
+
+    for name, model, info in results:
+        models[name] = model
+        infos[name] = info
+        path = f"{MODEL_DIR}/model_{name}.pkl"
+        joblib.dump(model, path)
+        print(f"[+] Saved {name} → model_{name}.pkl ({info['fit_seconds']} s"
+              + (f", cv accuracy {info['cv_accuracy']:.4f}, {info['best_params']})" if "cv_accuracy" in info else ")"))
+        # Tree models also get memory-mappable node arrays for fast loading
+        flat_path = export_flat(model, path)
+        if flat_path:
+            print(f"[+] Exported {name} → {os.path.basename(flat_path)}/")
+
+    return models, infos
 
 def evaluate_models(models, X_test, y_test):
-    accuracies = {}
+    """
+    Score every model on the test set and benchmark its saved file
+
+    Returns:
+        Model name -> accuracy plus the benchmark_model() measurements
+    """
+    results = {}
 
     for name, model in models.items():
         preds = model.predict(X_test)
         acc = accuracy_score(y_test, preds)
-        accuracies[name] = acc
 
         print(f"\n=== {name.upper()} ===")
         print("Accuracy:", acc)
         print(classification_report(y_test, preds))
 
-    return accuracies
-
+        # Measured as deployed: flat export when there is one, else the .pkl
+        results[name] = {"accuracy": round(float(acc), 6)}
+        results[name].update(benchmark_model(f"{MODEL_DIR}/model_{name}.pkl", X_test))
+
+    return results
+
+def register_choice(models, results, infos, X, y, test_size):
+    """
+    Pick the deployment model by the accuracy-vs-latency objective in
+    benchmark.py, write the report, and register + promote the choice
+    """
+    chosen, scores = select_model(results)
+    print_report(results, chosen, scores)
+    print(f"\n📄 Benchmark report: {write_report(results, chosen, scores)}")
+    if chosen is None:
+        print("❌ No model reaches the accuracy floor, registry left unchanged")
+        return None
+
+    most_accurate = max(results, key=lambda name: results[name]["accuracy"])
+    if chosen != most_accurate:
+        print(f"⚡ {chosen} chosen over {most_accurate}: "
+              f"{results[most_accurate]['accuracy'] - results[chosen]['accuracy']:.4f} less accurate, "
+              f"{results[most_accurate][LATENCY_METRIC] / max(results[chosen][LATENCY_METRIC], 1e-6):.1f}x faster")
+
+    metrics = dict(results[chosen], test_size=test_size, score=scores[chosen])
+    metrics.update({k: v for k, v in infos[chosen].items() if k != "best_params"})
+    version = register_model(models[chosen], metrics, data_hash(X, y), algorithm=chosen)
+    print(f"[+] Registered {chosen} as {version} (now CURRENT)")
+    return version
 
 def main():
+    parser = argparse.ArgumentParser(description="Train, tune and register the comfort models")
+    parser.add_argument("--search", choices=["halving", "random", "none"], default=SEARCH,
+                        help=f"Hyperparameter search (default: {SEARCH})")
+    parser.add_argument("--sequential", action="store_true", help="Fit candidates one after another")
+    args = parser.parse_args()
+
     df = load_dataset()
-    X = df[["temp", "hum"]].values
-    y = df["label"].values
+    X = df[["temp", "hum"]].to_numpy()
+    y = df["label"].to_numpy()
 
     X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.3, random_state=42, stratify=y
+        X, y, test_size=0.3, random_state=RANDOM_STATE, stratify=y
     )
 
-    models = train_models(X_train, y_train)
-    accuracies = evaluate_models(models, X_test, y_test)
+    start = time.perf_counter()
+    models, infos = train_models(X_train, y_train, search=args.search, parallel=not args.sequential)
+    print(f"\n[+] Trained {len(models)} models in {time.perf_counter() - start:.1f} s "
+          f"(search: {args.search}, {'sequential' if args.sequential else 'parallel'})")
+    results = evaluate_models(models, X_test, y_test)
+    register_choice(models, results, infos, X, y, len(y_test))
 
     print("\nTraining completed.")
 
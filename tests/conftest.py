@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The project modules are flat scripts that import each other by name
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ("model", "dashboard"):
+    sys.path.insert(0, os.path.join(ROOT, folder))
@@ -0,0 +1,59 @@
+import asyncio
+import socket
+from types import SimpleNamespace
+import mqtt_inference
+import mqtt_inference_async
+from mqtt_inference_async import AsyncMqttServer, Reading
+from payload import MAX_BATCH, encode
+
+
+class FakeClient:
+    """Stands in for paho: every loop_read() delivers the next queued message"""
+
+    def __init__(self, server, messages):
+        self.server = server
+        self.messages = list(messages)
+
+    def loop_read(self):
+        payload = self.messages.pop(0)
+        self.server.on_message(self, None, SimpleNamespace(topic="sic7/sensor/a1b2c3", payload=payload))
+
+
+def full_batch():
+    return encode([25.0] * MAX_BATCH, [50.0] * MAX_BATCH)
+
+
+async def start_server(messages):
+    server = AsyncMqttServer(model=None, client_id="test")
+    server.client = FakeClient(server, messages)
+    server._sock, server._peer = socket.socketpair()
+    return server
+
+
+def test_reading_pauses_until_a_whole_batch_fits(monkeypatch):
+    monkeypatch.setattr(mqtt_inference, "VERBOSE", False)
+    monkeypatch.setattr(mqtt_inference_async, "BATCH_MAX_LATENCY_MS", 0)
+
+    async def scenario():
+        server = await start_server([full_batch(), full_batch()])
+        device = mqtt_inference.get_device("a1b2c3")
+        # One slot less than a binary batch needs
+        for _ in range(server.inbox.maxsize - MAX_BATCH + 1):
+            server.inbox.put_nowait(Reading(20.0, 50.0, device, 0.0))
+
+        server.on_readable()
+        assert server.paused
+        assert len(server.client.messages) == 2   # Packet left in the socket
+
+        await server.next_batch()                 # Frees BATCH_MAX_SIZE slots
+        assert not server.paused
+        server.on_readable()
+        assert server.received == MAX_BATCH      # Whole batch queued, nothing dropped
+        assert server.inbox.qsize() == server.inbox.maxsize - mqtt_inference_async.BATCH_MAX_SIZE + 1
+
+        server.on_readable()
+        assert server.paused and server.received == MAX_BATCH
+        server._sock.close()
+        server._peer.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,44 @@
+import pytest
+from devices import (CONTROL_SUBSCRIPTIONS, LEGACY_DEVICE, SENSOR_SUBSCRIPTIONS, control_topic, parse_topic,
+                     sensor_topic, subscribe_all)
+
+
+def test_legacy_topics_map_to_the_default_device():
+    assert parse_topic("sic7/sensor") == ("sensor", LEGACY_DEVICE)
+    assert parse_topic("sic7/control") == ("control", LEGACY_DEVICE)
+    assert sensor_topic() == "sic7/sensor" and control_topic() == "sic7/control"
+    assert sensor_topic(LEGACY_DEVICE) == "sic7/sensor"
+
+
+def test_per_device_topics_round_trip():
+    assert sensor_topic("a1b2c3") == "sic7/sensor/a1b2c3"
+    assert control_topic("a1b2c3") == "sic7/control/a1b2c3"
+    assert parse_topic(sensor_topic("a1b2c3")) == ("sensor", "a1b2c3")
+    assert parse_topic(control_topic("a1b2c3")) == ("control", "a1b2c3")
+
+
+@pytest.mark.parametrize("topic", [
+    "",
+    "sic7",
+    "sic7/sensor/",           # Empty device id
+    "sic7/control/",
+    "sic7/sensor/a/b",        # Nested below a device
+    "sic7/status/a1b2c3",
+    "other/sensor/a1b2c3",
+    "sic7/sensors",
+])
+def test_malformed_topics_are_rejected(topic):
+    assert parse_topic(topic) == (None, None)
+
+
+def test_subscriptions_cover_legacy_and_device_topics():
+    assert SENSOR_SUBSCRIPTIONS == ["sic7/sensor", "sic7/sensor/+"]
+    assert CONTROL_SUBSCRIPTIONS == ["sic7/control", "sic7/control/+"]
+
+    class Client:
+        def subscribe(self, topics):
+            self.topics = topics
+
+    client = Client()
+    subscribe_all(client, SENSOR_SUBSCRIPTIONS)
+    assert client.topics == [("sic7/sensor", 0), ("sic7/sensor/+", 0)]
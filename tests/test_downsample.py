@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from downsample import downsample, lttb_indices, minmax_indices, visible_x_range
+
+
+def series(n, spike=None):
+    x = np.arange(n, dtype=float)
+    y = np.sin(x / 7.0)
+    if spike is not None:
+        y[spike] = 50.0
+    return x, y
+
+
+@pytest.mark.parametrize("method", [lttb_indices, minmax_indices])
+def test_short_series_is_kept_whole(method):
+    x, y = series(10)
+    assert method(x, y, 10).tolist() == list(range(10))
+    assert method(x, y, 50).tolist() == list(range(10))
+
+
+def test_lttb_needs_at_least_three_points():
+    x, y = series(100)
+    assert lttb_indices(x, y, 2).tolist() == list(range(100))
+
+
+def test_minmax_with_tiny_budget_uses_one_bucket():
+    x, y = series(100, spike=40)
+    idx = minmax_indices(x, y, 1)
+    assert {0, 99, 40, int(np.argmin(y))} == set(idx.tolist())
+
+
+@pytest.mark.parametrize("n", [1_000, 1_003, 997])
+def test_lttb_keeps_ends_and_spikes(n):
+    x, y = series(n, spike=n - 3)
+    idx = lttb_indices(x, y, 100)
+    assert len(idx) == 100
+    assert idx[0] == 0 and idx[-1] == n - 1
+    assert np.all(np.diff(idx) > 0)
+    assert n - 3 in idx
+
+
+def test_minmax_keeps_a_spike_past_the_last_full_bucket():
+    # 103 points in 5 buckets of 20: points 100..102 are the tail
+    x, y = series(103)
+    y[100:] = [0.0, 50.0, -50.0]
+    idx = minmax_indices(x, y, 10)
+    assert {101, 102} <= set(idx.tolist())
+    assert idx[0] == 0 and idx[-1] == 102
+    assert np.all(np.diff(idx) > 0)
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+def test_datetime_x_matches_numeric_x(method):
+    x, y = series(500, spike=250)
+    times = np.datetime64("2025-12-04T00:00:00", "ms") + (x * 3_000).astype("timedelta64[ms]")
+    kept_x, kept_y = downsample(times, y, 60, method)
+    _, numeric_y = downsample(x * 3_000, y, 60, method)
+    assert kept_x.dtype == times.dtype
+    assert np.array_equal(kept_y, numeric_y)
+    assert 50.0 in kept_y
+
+
+def test_visible_range_from_relayout_data():
+    start, end = np.datetime64("2025-12-04T10:00:00", "ms"), np.datetime64("2025-12-04T11:30:00.500", "ms")
+    assert visible_x_range({"xaxis.range[0]": "2025-12-04 10:00:00",
+                            "xaxis.range[1]": "2025-12-04 11:30:00.5"}) == (start, end)
+    assert visible_x_range({"xaxis.range": ["2025-12-04 10:00", "2025-12-04T11:30:00.500"]}) == (start, end)
+
+
+@pytest.mark.parametrize("relayout", [
+    None,
+    {},
+    {"xaxis.autorange": True},
+    {"xaxis.autorange": True, "xaxis.range[0]": "2025-12-04 10:00", "xaxis.range[1]": "2025-12-04 11:00"},
+    {"xaxis.range[0]": "2025-12-04 10:00"},   # Half a range
+    {"yaxis.range[0]": 0, "yaxis.range[1]": 1},
+    {"xaxis.range[0]": "yesterday", "xaxis.range[1]": "today"},
+    {"xaxis.range": ["2025-13-45", "2025-12-04"]},
+])
+def test_visible_range_is_none_when_showing_everything_or_unparsable(relayout):
+    assert visible_x_range(relayout) is None
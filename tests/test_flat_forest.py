@@ -0,0 +1,38 @@
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.tree import DecisionTreeClassifier
+from flat_forest import FlatForest, export_flat, load_model_file
+
+
+def training_data():
+    rng = np.random.default_rng(0)
+    X = np.column_stack([rng.uniform(15, 40, 2_000), rng.uniform(20, 95, 2_000)])
+    y = np.where(X[:, 0] >= 30, "Panas", np.where(X[:, 0] >= 25, "Hangat", "Dingin"))
+    return X, y
+
+
+@pytest.mark.parametrize("model", [
+    DecisionTreeClassifier(max_depth=6, random_state=0),
+    RandomForestClassifier(n_estimators=20, max_depth=8, random_state=0),
+])
+def test_matches_sklearn(model):
+    X, y = training_data()
+    model.fit(X, y)
+    flat = FlatForest.from_model(model)
+    X_check = np.random.default_rng(1).uniform([10, 10], [45, 100], size=(5_000, 2))
+    assert np.array_equal(flat.predict(X_check), model.predict(X_check))
+    np.testing.assert_allclose(flat.predict_proba(X_check), model.predict_proba(X_check), atol=1e-12)
+
+
+def test_saved_export_is_loaded_and_agrees(tmp_path):
+    X, y = training_data()
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    path = tmp_path / "model.pkl"
+    joblib.dump(model, path)
+    assert export_flat(model, str(path))
+
+    loaded = load_model_file(str(path))
+    assert isinstance(loaded, FlatForest)
+    assert np.array_equal(loaded.predict(X[:500]), model.predict(X[:500]))
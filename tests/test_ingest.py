@@ -0,0 +1,52 @@
+import json
+import threading
+import ingest
+from telemetry_store import TelemetryStore
+
+BASE = 1_700_000_000_000
+
+
+class FailingDB:
+    """TelemetryDB stand-in whose event writes fail until told otherwise"""
+
+    def __init__(self, failures):
+        self.failures = failures
+        self.events = []
+
+    def append_events(self, events):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("database is locked")
+        self.events.extend(events)
+
+    def set_status(self, **values):
+        pass
+
+    def prune(self, retention):
+        pass
+
+
+def sensor_event(ts_ms, temp):
+    return ts_ms, "sic7/sensor/a", json.dumps({"temp": temp, "hum": 50.0, "pot": 0}).encode()
+
+
+def drain(db, store):
+    stop = threading.Event()
+    stop.set()   # Exit as soon as the queue is empty
+    ingest.writer_loop(db, store, stop)
+
+
+def test_writer_survives_a_failing_db(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(ingest, "pending", ingest.queue.Queue())
+    db, store = FailingDB(failures=1), TelemetryStore(str(tmp_path))
+
+    ingest.pending.put(("event", sensor_event(BASE, 21.0)))
+    drain(db, store)
+    assert "❌" in capsys.readouterr().out
+    ingest.pending.put(("event", sensor_event(BASE + 3_000, 22.0)))
+    drain(db, store)
+
+    assert [ts for ts, _, _ in db.events] == [BASE + 3_000]
+    # The store still got both readings
+    assert store.query()["ts_ms"].tolist() == [BASE, BASE + 3_000]
+    store.close()
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+import preprocess
+
+# The row-wise rules label_data used before the threshold format
+LAMBDA_RULES = {
+    "Panas": lambda row: row['temp'] >= 28,
+    "Hangat": lambda row: row['temp'] >= 25,
+    "Dingin": lambda row: row['temp'] < 25,
+}
+THRESHOLD_CUSTOM_RULES = {
+    "Sangat Panas": {"temp": (35, None)},
+    "Panas": {"temp": (30, 35)},
+    "Hangat": {"temp": (25, 30)},
+    "Dingin": {"temp": (20, 25)},
+    "Sangat Dingin": {"temp": (None, 20)},
+}
+LAMBDA_CUSTOM_RULES = {
+    "Sangat Panas": lambda row: row['temp'] >= 35,
+    "Panas": lambda row: row['temp'] >= 30 and row['temp'] < 35,
+    "Hangat": lambda row: row['temp'] >= 25 and row['temp'] < 30,
+    "Dingin": lambda row: row['temp'] >= 20 and row['temp'] < 25,
+    "Sangat Dingin": lambda row: row['temp'] < 20,
+}
+
+
+def old_labels(df, rules):
+    """The previous per-row implementation of label_data"""
+    def assign_label(row):
+        for label, condition in rules.items():
+            if label != "Normal" and condition(row):
+                return label
+        return "Normal"
+    return df.apply(assign_label, axis=1).tolist()
+
+
+def readings():
+    rng = np.random.default_rng(0)
+    temps = np.concatenate([
+        rng.uniform(10, 45, 1_000),
+        [19.999, 20, 24.999, 25, 27.999, 28, 30, 34.999, 35, np.nan],   # Boundaries and a gap
+    ])
+    return pd.DataFrame({"temp": temps, "hum": rng.uniform(20, 95, len(temps))})
+
+
+@pytest.mark.parametrize("rules, reference", [
+    (preprocess.LABELING_RULES, LAMBDA_RULES),
+    (THRESHOLD_CUSTOM_RULES, LAMBDA_CUSTOM_RULES),
+])
+def test_threshold_rules_match_lambda_rules(rules, reference):
+    df = readings()
+    assert list(preprocess.assign_labels(df, rules)) == old_labels(df, reference)
+
+
+def test_lambda_and_threshold_rules_can_be_mixed():
+    df = readings()
+    mixed = {"Panas": {"temp": (28, None)}, "Hangat": LAMBDA_RULES["Hangat"], "Dingin": {"temp": (None, 25)}}
+    assert list(preprocess.assign_labels(df, mixed)) == old_labels(df, LAMBDA_RULES)
+
+
+def test_multi_column_rule_needs_every_column():
+    df = pd.DataFrame({"temp": [30.0, 30.0, 20.0], "hum": [80.0, 50.0, 80.0]})
+    rules = {"Gerah": {"temp": (28, None), "hum": (70, None)}}
+    assert list(preprocess.assign_labels(df, rules)) == ["Gerah", "Normal", "Normal"]
@@ -0,0 +1,79 @@
+import os
+import joblib
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+from lookup_table import (LookupTablePredictor, compile_lookup_table, load_lookup_predictor, lut_path_for,
+                          verify_lookup_table)
+
+TEMP_RANGE = (15.0, 40.0)
+HUM_RANGE = (20.0, 95.0)
+
+
+@pytest.fixture(scope="module")
+def model():
+    rng = np.random.default_rng(0)
+    X = np.round(np.column_stack([rng.uniform(15, 40, 2_000), rng.uniform(20, 95, 2_000)]), 1)
+    y = np.where(X[:, 0] >= 30, "Panas", np.where(X[:, 1] >= 70, "Lembab", "Normal"))
+    return DecisionTreeClassifier(max_depth=6, random_state=0).fit(X, y)
+
+
+@pytest.fixture(scope="module")
+def lut(model):
+    return compile_lookup_table(model, TEMP_RANGE, HUM_RANGE)
+
+
+def grid_points(n, seed=1):
+    rng = np.random.default_rng(seed)
+    return np.round(np.column_stack([rng.uniform(*TEMP_RANGE, n), rng.uniform(*HUM_RANGE, n)]), 1)
+
+
+def test_grid_points_match_the_model(lut, model):
+    X = grid_points(20_000)
+    assert np.array_equal(lut.predict(X), model.predict(X))
+    assert verify_lookup_table(lut, model, X) == 1.0
+    # Grid corners are inside the table
+    corners = np.array([[15.0, 20.0], [15.0, 95.0], [40.0, 20.0], [40.0, 95.0]])
+    assert np.array_equal(lut.predict(corners), model.predict(corners))
+
+
+def test_inputs_outside_the_grid_use_the_fallback(lut, model):
+    class Counting:
+        def __init__(self):
+            self.rows = 0
+
+        def predict(self, X):
+            self.rows += len(X)
+            return model.predict(X)
+
+    counting = Counting()
+    table = LookupTablePredictor(lut.grid, lut.classes_, lut.temp_min, lut.hum_min, lut.step, fallback=counting)
+    X = np.array([[14.0, 50.0], [20.0, 50.0], [45.0, 50.0], [20.0, 99.0], [35.0, 60.0]])
+    assert np.array_equal(table.predict(X), model.predict(X))
+    assert counting.rows == 3
+
+
+def test_outside_the_grid_without_fallback_raises(lut):
+    table = LookupTablePredictor(lut.grid, lut.classes_, lut.temp_min, lut.hum_min, lut.step)
+    table.predict([[20.0, 50.0]])
+    with pytest.raises(ValueError):
+        table.predict([[45.0, 50.0]])
+
+
+def test_saved_table_is_loaded_unless_older_than_the_model(tmp_path, lut, model):
+    model_path = str(tmp_path / "model.pkl")
+    joblib.dump(model, model_path)
+    assert load_lookup_predictor(model, model_path) is model   # Not compiled yet
+
+    lut.save(lut_path_for(model_path))
+    loaded = load_lookup_predictor(model, model_path)
+    assert isinstance(loaded, LookupTablePredictor)
+    assert np.array_equal(loaded.grid, lut.grid)
+    assert loaded.fallback is model
+    X = np.vstack([grid_points(1_000, seed=2), [[45.0, 50.0]]])
+    assert np.array_equal(loaded.predict(X), model.predict(X))
+
+    # A retrained model makes the table stale
+    stamp = os.path.getmtime(lut_path_for(model_path))
+    os.utime(model_path, (stamp + 10, stamp + 10))
+    assert load_lookup_predictor(model, model_path) is model
@@ -0,0 +1,82 @@
+import time
+import threading
+import numpy as np
+from mqtt_inference import MicroBatcher
+
+
+class Recorder:
+    """predict_fn/on_result pair that records batch sizes and results"""
+
+    def __init__(self, expected):
+        self.batches = []
+        self.results = []
+        self.clear = []
+        self.expected = expected
+        self.done = threading.Event()
+
+    def predict(self, X):
+        self.batches.append(len(X))
+        return [f"{temp:g}" for temp in X[:, 0]]
+
+    def on_result(self, reading, prediction, clear):
+        self.results.append((reading.device, prediction))
+        self.clear.append(clear)
+        if len(self.results) == self.expected:
+            self.done.set()
+
+
+def test_flushes_when_batch_is_full():
+    recorder = Recorder(expected=8)
+    batcher = MicroBatcher(recorder.predict, recorder.on_result, max_size=4, max_latency_ms=10_000, margin=(0, 0))
+    batcher.start()
+    for i in range(8):
+        batcher.submit(float(i), 50.0, "dev")
+    # Well before the latency deadline
+    assert recorder.done.wait(2)
+    batcher.stop()
+    assert recorder.batches == [4, 4]
+    assert recorder.results == [("dev", str(i)) for i in range(8)]
+
+
+def test_flushes_partial_batch_after_max_latency():
+    recorder = Recorder(expected=3)
+    batcher = MicroBatcher(recorder.predict, recorder.on_result, max_size=64, max_latency_ms=30, margin=(0, 0))
+    batcher.start()
+    started = time.monotonic()
+    for i in range(3):
+        batcher.submit(float(i), 50.0, i)
+    assert recorder.done.wait(2)
+    elapsed = time.monotonic() - started
+    batcher.stop()
+    assert recorder.batches == [3]
+    assert 0.025 <= elapsed < 1
+    assert [device for device, _ in recorder.results] == [0, 1, 2]
+
+
+def test_stop_flushes_queued_readings():
+    recorder = Recorder(expected=2)
+    batcher = MicroBatcher(recorder.predict, recorder.on_result, max_size=64, max_latency_ms=200, margin=(0, 0))
+    batcher.start()
+    batcher.submit(1.0, 50.0, "a")
+    batcher.submit(2.0, 50.0, "b")
+    batcher.stop()
+    assert recorder.results == [("a", "1"), ("b", "2")]
+
+
+def test_hysteresis_check_shares_the_batch_predict_call():
+    recorder = Recorder(expected=3)
+
+    def threshold(X):
+        recorder.batches.append(len(X))
+        return np.where(X[:, 0] >= 28, "Panas", "Hangat")
+
+    batcher = MicroBatcher(threshold, recorder.on_result, max_size=3, max_latency_ms=10_000, margin=(0.3, 1.0))
+    batcher.start()
+    for temp in (27.0, 28.1, 29.0):
+        batcher.submit(temp, 50.0, "dev")
+    assert recorder.done.wait(2)
+    batcher.stop()
+    # One call scoring the 3 readings and their 4 shifted copies each
+    assert recorder.batches == [15]
+    assert recorder.results == [("dev", "Hangat"), ("dev", "Panas"), ("dev", "Panas")]
+    assert recorder.clear == [True, False, True]
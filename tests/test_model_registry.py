@@ -0,0 +1,81 @@
+import json
+import os
+import numpy as np
+from sklearn.tree import DecisionTreeClassifier
+from model_registry import (ModelWatcher, MANIFEST_FILE, current_version, load_version,
+                            register_model, set_current, version_dir)
+
+
+def fit(threshold):
+    X = np.column_stack([np.linspace(15, 40, 200), np.full(200, 60.0)])
+    y = np.where(X[:, 0] >= threshold, "Panas", "Dingin")
+    return DecisionTreeClassifier(random_state=0).fit(X, y)
+
+
+def register(root, threshold, promote=True):
+    return register_model(fit(threshold), {"accuracy": 1.0}, "hash", root=str(root), promote=promote)
+
+
+def watcher_for(root):
+    model, _ = load_version(root=str(root))
+    swaps = []
+    watcher = ModelWatcher(model, current_version(str(root)), root=str(root),
+                           on_swap=lambda model, manifest: swaps.append(manifest["version"]))
+    return watcher, swaps
+
+
+def test_promoted_version_is_swapped_in(tmp_path):
+    register(tmp_path, 30)
+    watcher, swaps = watcher_for(tmp_path)
+    assert not watcher.check()
+    assert watcher.predict(np.array([[27.0, 60.0]]))[0] == "Dingin"
+
+    v2 = register(tmp_path, 25)
+    assert watcher.check()
+    assert (watcher.version, swaps) == (v2, [v2])
+    assert watcher.predict(np.array([[27.0, 60.0]]))[0] == "Panas"
+
+    # Roll back
+    set_current("v0001", str(tmp_path))
+    assert watcher.check()
+    assert watcher.version == "v0001"
+
+
+def test_broken_version_is_rejected_once_until_republished(tmp_path):
+    register(tmp_path, 30)
+    watcher, swaps = watcher_for(tmp_path)
+
+    v2 = register(tmp_path, 25, promote=False)
+    manifest_path = os.path.join(version_dir(v2, str(tmp_path)), MANIFEST_FILE)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    with open(manifest_path, "w") as f:
+        json.dump(dict(manifest, features=["temp", "hum", "pot"]), f)
+    set_current(v2, str(tmp_path))
+
+    assert not watcher.check()
+    assert watcher.version == "v0001"
+    assert watcher.rejected[0] == v2
+    assert watcher.predict(np.array([[27.0, 60.0]]))[0] == "Dingin"
+    # Not reloaded on every poll
+    stamp = watcher.rejected
+    assert not watcher.check()
+    assert watcher.rejected == stamp
+
+    # A corrected manifest under the same name is picked up
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+    os.utime(manifest_path, ns=(stamp[1] + 1_000_000_000, stamp[1] + 1_000_000_000))
+    assert watcher.check()
+    assert (watcher.version, swaps) == (v2, [v2])
+
+
+def test_model_file_not_matching_manifest_is_rejected(tmp_path):
+    register(tmp_path, 30)
+    watcher, swaps = watcher_for(tmp_path)
+    v2 = register(tmp_path, 25, promote=False)
+    with open(os.path.join(version_dir(v2, str(tmp_path)), "model.pkl"), "ab") as f:
+        f.write(b"corrupt")
+    set_current(v2, str(tmp_path))
+    assert not watcher.check()
+    assert watcher.version == "v0001" and swaps == []
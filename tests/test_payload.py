@@ -0,0 +1,59 @@
+import json
+import numpy as np
+import pytest
+from payload import HEADER, MAX_BATCH, RECORD_DTYPE, decode, encode, parse_sensor
+
+
+def test_round_trip_batch():
+    payload = encode([24.5, 25.01, -3.2], [61.0, 62.5, 70.33], device="a1b2c3", seq=7)
+    assert len(payload) == HEADER.size + 3 * RECORD_DTYPE.itemsize
+    records = decode(payload)
+    assert records["device"].tolist() == [0xa1b2c3] * 3
+    assert records["seq"].tolist() == [7, 8, 9]
+
+    temp, hum, pot, age = parse_sensor(payload)
+    np.testing.assert_allclose(temp, [24.5, 25.01, -3.2])
+    np.testing.assert_allclose(hum, [61.0, 62.5, 70.33])
+    assert np.isnan(pot).all()   # Binary records carry no pot
+    assert age.tolist() == [6000, 3000, 0]
+
+
+def test_decode_is_zero_copy():
+    payload = encode([20.0], [50.0])
+    records = decode(payload)
+    assert not records.flags.writeable
+    assert records.base is not None
+
+
+def test_age_across_millis_wraparound():
+    ts = [2**32 - 1000, 2000]   # millis() wrapped between the readings
+    _, _, _, age = parse_sensor(encode([20.0, 21.0], [50.0, 51.0], ts_ms=ts))
+    assert age.tolist() == [3000, 0]
+
+
+def test_json_still_supported():
+    temp, hum, pot, age = parse_sensor(b'{"temp": 24.5, "hum": 61, "pot": 3}')
+    assert (temp.tolist(), hum.tolist(), pot.tolist(), age.tolist()) == ([24.5], [61.0], [3], [0])
+
+
+@pytest.mark.parametrize("payload", [
+    b"S7\x01\x00",                              # no records
+    b"S7",                                      # truncated header
+    b"S7\x02\x01" + bytes(RECORD_DTYPE.itemsize),   # unknown version
+    encode([20.0, 21.0], [50.0, 51.0])[:-1],    # truncated record
+])
+def test_malformed_binary_raises_value_error(payload):
+    with pytest.raises(ValueError):
+        parse_sensor(payload)
+
+
+def test_bad_json_raises_decode_error():
+    with pytest.raises(json.JSONDecodeError):
+        parse_sensor(b"{bad")
+
+
+def test_encode_limits_batch_size():
+    with pytest.raises(ValueError):
+        encode([], [])
+    with pytest.raises(ValueError):
+        encode([20.0] * (MAX_BATCH + 1), [50.0] * (MAX_BATCH + 1))
@@ -0,0 +1,47 @@
+import os
+import joblib
+import numpy as np
+import pytest
+from sklearn.tree import DecisionTreeClassifier
+import predict
+
+
+def fit(threshold):
+    X = np.column_stack([np.linspace(15, 40, 200), np.full(200, 60.0)])
+    y = np.where(X[:, 0] >= threshold, "Panas", "Dingin")
+    return DecisionTreeClassifier(random_state=0).fit(X, y)
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    predict.clear_cache()
+    path = str(tmp_path / "model.pkl")
+    joblib.dump(fit(30), path)
+    yield path
+    predict.clear_cache()
+
+
+def test_repeated_calls_reuse_the_model(model_path):
+    assert predict.get_model(model_path) is predict.get_model(model_path)
+
+
+def test_touch_without_change_keeps_the_model(model_path):
+    first = predict.get_model(model_path)
+    st = os.stat(model_path)
+    os.utime(model_path, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+    assert predict.get_model(model_path) is first
+
+
+def test_rewritten_file_is_reloaded(model_path):
+    first = predict.get_model(model_path)
+    assert predict.predict_many([27.0], [60.0], path=model_path)[0] == "Dingin"
+    joblib.dump(fit(25), model_path)
+    st = os.stat(model_path)
+    os.utime(model_path, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+    assert predict.get_model(model_path) is not first
+    assert predict.predict_many([27.0], [60.0], path=model_path)[0] == "Panas"
+
+
+def test_missing_model_raises(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        predict.get_model(str(tmp_path / "missing.pkl"))
@@ -0,0 +1,88 @@
+import pandas as pd
+import preprocess
+
+
+def write_lines(path, lines, mode="w"):
+    with open(path, mode) as f:
+        f.write("".join(line + "\n" for line in lines))
+
+
+def ingest(manifest, work):
+    """Record planned work in the manifest, as incremental_preprocess does"""
+    for path, _, end, sha256 in work:
+        manifest["files"][path] = {"size": end, "sha256": sha256}
+
+
+def test_plan_reads_new_files_then_only_appended_tails(tmp_path):
+    path = str(tmp_path / "a.csv")
+    write_lines(path, ["timestamp,temp,hum", "2025-01-01 00:00:01,24.0,55.0"])
+    manifest = {"output": None, "files": {}}
+
+    work, rebuild = preprocess.plan_incremental([path], manifest)
+    assert not rebuild
+    assert [(p, start) for p, start, _, _ in work] == [(path, 0)]
+    ingest(manifest, work)
+
+    assert preprocess.plan_incremental([path], manifest) == ([], False)
+
+    size = work[0][2]
+    # A half-written last line waits for the next run
+    write_lines(path, ["2025-01-01 00:00:02,25.0,56.0"], mode="a")
+    with open(path, "a") as f:
+        f.write("2025-01-01 00:00:03,2")
+    work, rebuild = preprocess.plan_incremental([path], manifest)
+    assert not rebuild
+    [(_, start, end, _)] = work
+    assert start == size
+    tail = preprocess.read_csv_range(path, start, end)
+    assert tail["temp"].tolist() == [25.0]
+
+
+def test_plan_rebuilds_when_a_file_is_rewritten_or_missing(tmp_path):
+    a, b = str(tmp_path / "a.csv"), str(tmp_path / "b.csv")
+    write_lines(a, ["timestamp,temp,hum", "2025-01-01 00:00:01,24.0,55.0"])
+    write_lines(b, ["timestamp,temp,hum", "2025-01-01 00:00:02,26.0,60.0"])
+    manifest = {"output": None, "files": {}}
+    ingest(manifest, preprocess.plan_incremental([a, b], manifest)[0])
+
+    write_lines(a, ["timestamp,temp,hum", "2025-01-01 00:00:01,99.0,55.0"])
+    assert preprocess.plan_incremental([a, b], manifest)[1]
+    assert preprocess.plan_incremental([b], manifest)[1]
+
+
+def test_drop_existing_rows_ignores_int_vs_float_columns(tmp_path):
+    output = tmp_path / "out.csv"
+    pd.DataFrame({
+        "timestamp": ["2025-01-01 00:00:01", "2025-01-01 00:00:02"],
+        "temp": [26.0, 27.5],
+        "hum": [60.0, 61.0],
+        "label": ["Hangat", "Hangat"],
+    }).to_csv(output, index=False)
+
+    # A raw export without decimals is parsed as int64
+    df = pd.DataFrame({
+        "timestamp": pd.to_datetime(["2025-01-01 00:00:01", "2025-01-01 00:00:02", "2025-01-01 00:00:03"]),
+        "temp": [26, 27, 28],
+        "hum": [60, 61, 62],
+    })
+    assert df["hum"].dtype == "int64"
+    kept = preprocess.drop_existing_rows(df, str(output), chunksize=1)
+    assert kept["temp"].tolist() == [27, 28]
+
+
+def test_incremental_run_appends_only_new_rows(tmp_path):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    output = str(tmp_path / "out.csv")
+    manifest = str(tmp_path / "manifest.json")
+    write_lines(raw / "a.csv", ["timestamp,temp,hum", "2025-01-01 00:00:01,24.0,55.0"])
+    assert preprocess.incremental_preprocess(str(raw), output, manifest) == 1
+
+    # An overlapping second export of the same session
+    write_lines(raw / "b.csv", ["timestamp,temp,hum", "2025-01-01 00:00:01,24,55", "2025-01-01 00:00:02,29,57"])
+    assert preprocess.incremental_preprocess(str(raw), output, manifest) == 1
+    assert preprocess.incremental_preprocess(str(raw), output, manifest) == 0
+
+    df = pd.read_csv(output)
+    assert df["temp"].tolist() == [24.0, 29.0]
+    assert df["label"].tolist() == ["Dingin", "Panas"]
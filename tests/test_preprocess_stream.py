@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+import preprocess
+
+
+def write_csv(path, rows):
+    pd.DataFrame(rows, columns=["timestamp", "temp", "hum"]).to_csv(path, index=False)
+
+
+def test_stream_merges_sorted_and_drops_duplicates(tmp_path, monkeypatch):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    # Out of order within and across files, with duplicates across files
+    write_csv(raw / "a.csv", [
+        ("2025-01-01 00:00:05", 26.0, 60.0),
+        ("2025-01-01 00:00:01", 24.0, 55.0),
+        ("2025-01-01 00:00:03", 31.0, 70.0),
+        ("2025-01-01 00:00:03", 31.0, 70.0),
+    ])
+    write_csv(raw / "b.csv", [
+        ("2025-01-01 00:00:03", 31.0, 70.0),
+        ("2025-01-01 00:00:03", 20.0, 40.0),   # same time, different reading
+        ("2025-01-01 00:00:02", 25.0, 50.0),
+        ("2025-01-01 00:00:01", 24.0, 55.0),
+    ])
+    # Tiny chunks and fan-in force several runs and intermediate merge passes
+    monkeypatch.setattr(preprocess, "STREAM_MERGE_FANIN", 2)
+    output = tmp_path / "out.csv"
+    written = preprocess.stream_preprocess(str(raw), str(output), chunksize=1)
+
+    df = pd.read_csv(output)
+    assert written == len(df) == 5
+    assert df["timestamp"].is_monotonic_increasing
+    assert not df.duplicated(["timestamp", "temp", "hum"]).any()
+    expected = preprocess.assign_labels(df[["timestamp", "temp", "hum"]])
+    assert df["label"].tolist() == list(expected)
+
+
+def test_merge_runs_without_dedupe_keeps_every_row(tmp_path):
+    runs = []
+    for i, rows in enumerate([[("2025-01-01 00:00:01", 1), ("2025-01-01 00:00:03", 3)],
+                              [("2025-01-01 00:00:01", 1), ("2025-01-01 00:00:02", 2)]]):
+        path = tmp_path / f"run_{i}.csv"
+        pd.DataFrame(rows, columns=["timestamp", "label"]).to_csv(path, index=False)
+        runs.append(str(path))
+
+    written, labels = preprocess.merge_runs(runs, str(tmp_path / "merged.csv"))
+    df = pd.read_csv(tmp_path / "merged.csv")
+    assert written == 4
+    assert df["timestamp"].is_monotonic_increasing
+    assert sum(labels.values()) == 4
+
+
+def test_merge_runs_refuses_runs_with_different_headers(tmp_path):
+    a, b = tmp_path / "run_a.csv", tmp_path / "run_b.csv"
+    pd.DataFrame([("2025-01-01 00:00:01", 24.0, 55.0, "Normal")],
+                 columns=["timestamp", "temp", "hum", "label"]).to_csv(a, index=False)
+    pd.DataFrame([("2025-01-01 00:00:02", 55.0, 24.0, "Normal")],
+                 columns=["timestamp", "hum", "temp", "label"]).to_csv(b, index=False)
+    with pytest.raises(ValueError):
+        preprocess.merge_runs([str(a), str(b)], str(tmp_path / "merged.csv"))
+
+
+def test_stream_aligns_files_with_other_column_order(tmp_path):
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    write_csv(raw / "a.csv", [("2025-01-01 00:00:01", 24.0, 55.0)])
+    pd.DataFrame([(70.0, "2025-01-01 00:00:02", 31.0, 1)],
+                 columns=["hum", "timestamp", "temp", "pot"]).to_csv(raw / "b.csv", index=False)
+    pd.DataFrame([("2025-01-01 00:00:03", 25.0)], columns=["timestamp", "temp"]).to_csv(raw / "c.csv", index=False)
+    output = tmp_path / "out.csv"
+    assert preprocess.stream_preprocess(str(raw), str(output), chunksize=1) == 2
+
+    df = pd.read_csv(output)
+    assert df.columns.tolist() == ["timestamp", "temp", "hum", "label"]
+    assert df[["temp", "hum"]].values.tolist() == [[24.0, 55.0], [31.0, 70.0]]
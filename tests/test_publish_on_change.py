@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+import mqtt_inference
+from mqtt_inference import DeviceState, predict_with_margin, publish_status, should_publish
+
+
+class FakeClient:
+    def __init__(self):
+        self.sent = []
+
+    def publish(self, topic, payload):
+        self.sent.append(payload)
+
+
+def threshold_model(X):
+    """Panas from 28 °C, like LABELING_RULES"""
+    return np.where(X[:, 0] >= 28, "Panas", "Hangat")
+
+
+@pytest.fixture(autouse=True)
+def settings(monkeypatch):
+    monkeypatch.setattr(mqtt_inference, "PUBLISH_ON_CHANGE", True)
+    monkeypatch.setattr(mqtt_inference, "STATUS_DEBOUNCE", 2)
+    monkeypatch.setattr(mqtt_inference, "STATUS_KEEPALIVE_S", 60)
+    monkeypatch.setattr(mqtt_inference, "VERBOSE", False)
+
+
+def publish_readings(client, device, temps):
+    X = np.array([[temp, 50.0] for temp in temps])
+    labels, clear = predict_with_margin(threshold_model, X)
+    for label, reading_clear in zip(labels.tolist(), clear.tolist()):
+        publish_status(client, device, label, reading_clear)
+
+
+def test_first_prediction_is_always_published():
+    device = DeviceState("a")
+    assert should_publish(device, "Hangat", 0.0)
+
+
+def test_new_label_needs_debounce_in_a_row():
+    device = DeviceState("a")
+    device.published, device.published_at = "Hangat", 0.0
+    assert not should_publish(device, "Panas", 1.0)
+    assert not should_publish(device, "Hangat", 2.0)   # Streak broken
+    assert not should_publish(device, "Panas", 3.0)
+    assert should_publish(device, "Panas", 4.0)
+
+
+def test_unchanged_label_is_resent_after_keepalive():
+    device = DeviceState("a")
+    device.published, device.published_at = "Hangat", 0.0
+    assert not should_publish(device, "Hangat", 59.0)
+    assert should_publish(device, "Hangat", 60.0)
+
+
+def test_keepalive_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(mqtt_inference, "STATUS_KEEPALIVE_S", 0)
+    device = DeviceState("a")
+    device.published, device.published_at = "Hangat", 0.0
+    assert not should_publish(device, "Hangat", 10_000.0)
+
+
+def test_reading_on_the_boundary_never_flips_the_status():
+    client, device = FakeClient(), DeviceState("a")
+    # Alternating just above and below 28 °C, inside the 0.3 °C margin
+    publish_readings(client, device, [27.0] + [28.1, 27.9] * 10 + [28.1] * 10)
+    assert client.sent == ["status:Hangat"]
+    assert device.suppressed == 30
+
+
+def test_reading_clear_of_the_boundary_switches_after_debounce():
+    client, device = FakeClient(), DeviceState("a")
+    publish_readings(client, device, [27.0, 28.1, 28.5, 28.6, 28.7])
+    assert client.sent == ["status:Hangat", "status:Panas"]
+    assert device.published == "Panas"
+
+
+def test_without_hysteresis_only_the_debounce_applies():
+    client, device = FakeClient(), DeviceState("a")
+    for label in ["Hangat", "Panas", "Panas"]:
+        publish_status(client, device, label)
+    assert client.sent == ["status:Hangat", "status:Panas"]
+
+
+def test_disabled_publishes_every_prediction(monkeypatch):
+    monkeypatch.setattr(mqtt_inference, "PUBLISH_ON_CHANGE", False)
+    client, device = FakeClient(), DeviceState("a")
+    publish_readings(client, device, [27.0, 27.0, 28.1])
+    assert client.sent == ["status:Hangat", "status:Hangat", "status:Panas"]
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+from ring_buffer import RingBuffer
+
+DTYPE = np.dtype([("timestamp", "datetime64[ms]"), ("value", "f8")])
+
+
+def row(i):
+    return np.datetime64(1_700_000_000_000 + i * 1_000, "ms"), float(i)
+
+
+def test_rejects_empty_capacity():
+    with pytest.raises(ValueError):
+        RingBuffer(0, DTYPE)
+
+
+def test_wraparound_keeps_newest_rows_in_order():
+    buf = RingBuffer(5, "i8", spill_block=2)
+    for i in range(12):
+        buf.append(i)
+    # Each overflow drops the 2 oldest rows
+    assert buf.view().tolist() == [8, 9, 10, 11]
+    assert (len(buf), buf.total_appended, buf.spilled) == (4, 12, 8)
+    assert buf.latest() == 11
+    assert buf.view(last=2).tolist() == [10, 11]
+    assert buf.view(last=100).tolist() == [8, 9, 10, 11]
+
+
+def test_view_after_wrap_is_a_contiguous_read_only_slice():
+    buf = RingBuffer(4, DTYPE, spill_block=1)
+    for i in range(7):   # Start has wrapped past the end of the first copy
+        buf.append(row(i))
+    view = buf.view()
+    assert view.base is not None and view.flags.c_contiguous
+    assert np.shares_memory(view, buf._buf)
+    assert buf.column("value").tolist() == [3.0, 4.0, 5.0, 6.0]
+    with pytest.raises(ValueError):
+        view["value"][0] = 0
+
+
+def test_spilled_rows_are_reloaded_in_order(tmp_path):
+    path = tmp_path / "spill" / "rows.csv"
+    buf = RingBuffer(4, DTYPE, spill_path=str(path), spill_block=2)
+    for i in range(7):
+        buf.append(row(i))
+    # Evicted but not flushed yet: still part of the frame
+    df = buf.to_frame(include_spilled=True)
+    assert df["value"].tolist() == [float(i) for i in range(7)]
+
+    assert buf.flush_spill() == 4
+    assert buf.flush_spill() == 0
+    for i in range(7, 9):
+        buf.append(row(i))
+    df = buf.to_frame(include_spilled=True)
+    assert df["value"].tolist() == [float(i) for i in range(9)]
+    assert df["timestamp"].tolist() == [row(i)[0] for i in range(9)]
+    assert buf.to_frame()["value"].tolist() == [6.0, 7.0, 8.0]
+
+
+def test_existing_spill_file_is_replaced(tmp_path):
+    path = tmp_path / "rows.csv"
+    path.write_text("stale\n")
+    buf = RingBuffer(2, DTYPE, spill_path=str(path), spill_block=1)
+    assert not path.exists()
+    for i in range(3):
+        buf.append(row(i))
+    buf.flush_spill()
+    assert buf.to_frame(include_spilled=True)["value"].tolist() == [0.0, 1.0, 2.0]
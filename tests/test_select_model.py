@@ -0,0 +1,41 @@
+import pytest
+from benchmark import select_model
+
+
+def results(**models):
+    return {name: {"accuracy": acc, "batch_p99_ms": ms} for name, (acc, ms) in models.items()}
+
+
+def test_latency_doubling_costs_latency_weight():
+    chosen, scores = select_model(results(fast=(0.980, 1.0), slow=(0.985, 4.0)), latency_weight=0.001)
+    assert scores["fast"] == pytest.approx(0.980)
+    assert scores["slow"] == pytest.approx(0.985 - 0.002)
+    assert chosen == "slow"
+
+
+def test_small_accuracy_gain_does_not_pay_for_a_much_slower_model():
+    chosen, _ = select_model(results(fast=(0.980, 1.0), slow=(0.982, 20.0)), latency_weight=0.001)
+    assert chosen == "fast"
+
+
+def test_zero_weight_picks_the_most_accurate():
+    chosen, _ = select_model(results(fast=(0.96, 1.0), slow=(0.99, 100.0)), latency_weight=0.0)
+    assert chosen == "slow"
+
+
+def test_tie_goes_to_the_faster_model():
+    chosen, _ = select_model(results(a=(0.97, 2.0), b=(0.97, 2.0 - 1e-12), c=(0.97, 5.0)), latency_weight=0.0)
+    assert chosen == "b"
+
+
+def test_models_below_the_floor_are_never_chosen():
+    chosen, scores = select_model(results(fast=(0.90, 0.1), ok=(0.96, 10.0)), min_accuracy=0.95)
+    assert chosen == "ok"
+    assert set(scores) == {"ok"}
+    assert select_model(results(fast=(0.90, 0.1)), min_accuracy=0.95) == (None, {})
+
+
+def test_zero_latency_does_not_divide_by_zero():
+    chosen, scores = select_model(results(a=(0.97, 0.0), b=(0.98, 0.5)), latency_weight=0.001)
+    assert chosen in scores
+    assert all(abs(score) < 1 for score in scores.values())
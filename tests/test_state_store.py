@@ -0,0 +1,81 @@
+import threading
+import pytest
+from state_store import StateStore
+
+
+def test_read_retries_when_a_write_overlaps():
+    store = StateStore()
+    data = [1, 2, 3]
+    calls = []
+
+    def fn():
+        calls.append(list(data))
+        if len(calls) == 1:
+            # Writer changes the data while this read is running
+            with store.writing():
+                data.append(4)
+        return list(data)
+
+    assert store.read(fn) == [1, 2, 3, 4]
+    assert len(calls) == 2
+
+
+def test_read_retries_errors_caused_by_a_write():
+    store = StateStore()
+    data = [1, 2, 3]
+    calls = []
+
+    def fn():
+        calls.append(None)
+        if len(calls) == 1:
+            with store.writing():
+                data.clear()
+            return data[2]   # Stale index into the shrunk list
+        return len(data)
+
+    assert store.read(fn) == 0
+    assert len(calls) == 2
+
+
+def test_read_raises_errors_without_a_write():
+    store = StateStore()
+    with pytest.raises(IndexError):
+        store.read(lambda: [][0])
+
+
+def test_read_gives_up_while_a_write_is_in_progress():
+    store = StateStore()
+    write = store.writing()
+    write.__enter__()
+    with pytest.raises(RuntimeError):
+        store.read(lambda: 1, max_retries=10)
+    write.__exit__(None, None, None)
+    assert store.read(lambda: 1) == 1
+
+
+def test_snapshot_is_replaced_not_mutated():
+    store = StateStore(a=1, b=2)
+    before = store.snapshot()
+    store.update(b=3)
+    assert dict(before) == {"a": 1, "b": 2}
+    assert dict(store.snapshot()) == {"a": 1, "b": 3}
+    with pytest.raises(TypeError):
+        before["a"] = 5
+
+
+def test_second_writer_thread_is_refused():
+    store = StateStore(a=1)
+    store.update(a=2)
+    errors = []
+
+    def other_writer():
+        try:
+            store.update(a=3)
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=other_writer)
+    thread.start()
+    thread.join()
+    assert len(errors) == 1
+    assert store["a"] == 2
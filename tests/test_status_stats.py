@@ -0,0 +1,73 @@
+import pytest
+from status_stats import SlidingCounts, StatusStats
+from state_store import StateStore
+
+
+def test_events_leave_the_window_within_one_bucket():
+    window = SlidingCounts(60, n_buckets=6)   # 10 s buckets
+    window.add("Panas", 100.0)
+    window.add("Panas", 105.0)
+    window.add("Dingin", 112.0)
+    assert window.counts(112.0) == {"Panas": 2, "Dingin": 1}
+    # Bucket [100, 110) expires once the window end reaches 160
+    assert window.counts(159.9) == {"Panas": 2, "Dingin": 1}
+    assert window.counts(160.0) == {"Dingin": 1}
+    assert window.counts(170.0) == {}
+
+
+def test_counts_does_not_expire_anything():
+    window = SlidingCounts(60, n_buckets=6)
+    window.add("Panas", 100.0)
+    assert window.counts(1_000.0) == {}
+    assert window.counts(100.0) == {"Panas": 1}
+
+
+def test_add_retires_old_buckets_from_the_totals():
+    window = SlidingCounts(60, n_buckets=6)
+    for t in range(0, 600, 5):
+        window.add("Hangat", float(t))
+    assert window.counts(595.0) == {"Hangat": 12}
+    assert len(window._buckets) <= window.n_buckets
+
+
+def test_late_event_counts_in_the_newest_bucket():
+    window = SlidingCounts(60, n_buckets=6)
+    window.add("Panas", 150.0)
+    window.add("Dingin", 100.0)   # Arrived late
+    assert window.counts(205.0) == {"Panas": 1, "Dingin": 1}
+    assert window.counts(210.0) == {}
+
+
+def test_summary_windows_and_rates():
+    stats = StatusStats({"1m": 60}, n_buckets=6, labels=["Panas", "Hangat"])
+    for t in range(0, 120, 10):
+        stats.add("Dingin" if t >= 60 else "Panas", float(t))
+    summary = stats.summary(t=115.0)
+    assert summary["labels"] == ["Panas", "Hangat", "Dingin"]
+    assert summary["total"] == 12
+    assert summary["counts"] == {"Panas": 6, "Hangat": 0, "Dingin": 6}
+    assert summary["last_label"] == "Dingin"
+    window = summary["windows"]["1m"]
+    assert window["counts"] == {"Dingin": 6}
+    assert window["rate_per_min"] == pytest.approx(6.0)
+
+
+def test_read_retries_a_window_mutated_during_iteration():
+    state = StateStore()
+    window = SlidingCounts(60, n_buckets=6)
+    window.add("Panas", 100.0)
+    calls = []
+
+    def read_buckets():
+        calls.append(None)
+        result = []
+        for index, counts in window._buckets:
+            if len(calls) == 1:
+                # The MQTT thread adds a status in a new bucket meanwhile
+                with state.writing():
+                    window.add("Dingin", 125.0)
+            result.append((index, dict(counts)))
+        return result
+
+    assert state.read(read_buckets) == [(10, {"Panas": 1}), (12, {"Dingin": 1})]
+    assert len(calls) == 2
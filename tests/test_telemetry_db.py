@@ -0,0 +1,23 @@
+from telemetry_db import TelemetryDB
+
+
+def test_workers_share_status_through_reader_connections(tmp_path):
+    path = str(tmp_path / "telemetry.db")
+    ingest = TelemetryDB(path)
+    ingest.append_events([(1_000, "sic7/sensor", b"{}"), (2_000, "sic7/sensor", b"{}")])
+    a, b = TelemetryDB(path, readonly=True), TelemetryDB(path, readonly=True)
+
+    assert a.toggle_status("collection_active") is True
+    assert b.toggle_status("collection_active") is False
+    assert ingest.get_status()["collection_active"] is False
+
+    # Only the first of two workers claiming the same mark wins
+    assert a.compare_and_set_status("collected_stored_id", None, 2)
+    assert not b.compare_and_set_status("collected_stored_id", None, 2)
+    assert b.compare_and_set_status("collected_stored_id", 2, 5)
+    assert a.get_status()["collected_stored_id"] == 5
+
+    # Reader writes never touch the event log
+    assert [row[0] for row in b.events_after(0)] == [1, 2]
+    for db in (a, b, ingest):
+        db.close()
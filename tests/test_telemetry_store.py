@@ -0,0 +1,116 @@
+import numpy as np
+import pytest
+from telemetry_store import RECORD_DTYPE, TIERS, TelemetryStore, aggregate
+
+MINUTE = 60_000
+BASE = 1_700_000_000_000 - 1_700_000_000_000 % MINUTE
+
+
+def records(rows):
+    return np.array([(ts, device, temp, hum, 0) for ts, device, temp, hum in rows], dtype=RECORD_DTYPE)
+
+
+def test_aggregate_buckets_per_device():
+    out = aggregate(records([
+        (BASE + 1_000, 0, 20.0, 50.0),
+        (BASE + 2_000, 1, 30.0, 60.0),
+        (BASE + 3_000, 0, 22.0, 54.0),
+        (BASE + MINUTE, 0, 25.0, 55.0),
+    ]), MINUTE)
+    assert out[["ts_ms", "device", "count"]].tolist() == [(BASE, 0, 2), (BASE, 1, 1), (BASE + MINUTE, 0, 1)]
+    first = out[0]
+    assert (first["temp_min"], first["temp_max"], first["temp_mean"]) == (20.0, 22.0, 21.0)
+    assert first["hum_mean"] == 52.0
+
+
+def test_rollups_match_raw_after_clock_step_back(tmp_path):
+    store = TelemetryStore(str(tmp_path))
+    store.append_many([(BASE + 50_000, "a", 21.0, 50.0, 0)])
+    store.append_many([(BASE + 70_000, "a", 22.0, 50.0, 0)])
+    store.append_many([(BASE + 10_000, "a", 30.0, 50.0, 0)])   # clock stepped back
+    store.append_many([(BASE + 130_000, "a", 23.0, 50.0, 0)])
+    store.close()
+
+    reader = TelemetryStore(str(tmp_path), readonly=True)
+    raw = reader.query()
+    assert raw["ts_ms"].tolist() == [BASE + 10_000, BASE + 50_000, BASE + 70_000, BASE + 130_000]
+    for tier, (width, _) in TIERS.items():
+        rollups = reader.rollup(tier)
+        assert np.array_equal(rollups, aggregate(raw, width))
+        # One bucket per device and start
+        assert len(np.unique(rollups[["ts_ms", "device"]])) == len(rollups)
+
+
+def test_late_batch_keeps_its_times_between_other_devices(tmp_path):
+    store = TelemetryStore(str(tmp_path))
+    t = BASE + 200_000
+    store.append_many([(t, "b", 20.0, 40.0, 0)])
+    # Device a's 10-reading batch spanning 27 s arrives 100 s later
+    batch = [(t + 100_000 - 3_000 * (9 - i), "a", 30.0 + i, 60.0, 0) for i in range(10)]
+    store.append_many(batch)
+    store.append_many([(t + 101_000, "b", 21.0, 41.0, 0)])
+    # A second batch from a, older than both, arriving out of order
+    late = [(t + 5_000 - 4_000 * i, "a", 25.0, 55.0, 0) for i in range(3)]
+    store.append_many(late)
+    store.close()
+
+    reader = TelemetryStore(str(tmp_path), readonly=True)
+    raw = reader.query()
+    assert np.all(np.diff(raw["ts_ms"]) >= 0)
+    a = raw[raw["device"] == reader.device_names().index("a")]
+    assert sorted(a["ts_ms"].tolist()) == sorted(ts for ts, *_ in batch + late)
+    assert np.diff(a["ts_ms"][-10:]).tolist() == [3_000] * 9
+    b = raw[raw["device"] == reader.device_names().index("b")]
+    assert b["ts_ms"].tolist() == [t, t + 101_000]
+    for tier, (width, _) in TIERS.items():
+        rollups = reader.rollup(tier)
+        assert np.array_equal(rollups, aggregate(raw, width))
+        assert len(np.unique(rollups[["ts_ms", "device"]])) == len(rollups)
+
+
+def test_second_writer_is_refused(tmp_path):
+    store = TelemetryStore(str(tmp_path))
+    with pytest.raises(RuntimeError):
+        TelemetryStore(str(tmp_path))
+    TelemetryStore(str(tmp_path), readonly=True)
+    store.close()
+    TelemetryStore(str(tmp_path)).close()
+
+
+def test_restart_rebuilds_missing_tiers_day_by_day(tmp_path):
+    day = 86_400_000
+    rows = [(BASE + offset, device, 20.0 + i % 7, 50.0 + i % 5, 0)
+            for i, (offset, device) in enumerate(
+                (d * day + m * MINUTE + s * 1_000, device)
+                for d in range(3) for m in (0, 1, 59, 61) for s in (0, 30) for device in ("a", "b"))]
+    store = TelemetryStore(str(tmp_path))
+    store.append_many(rows)
+    store.close()
+    reference = {tier: TelemetryStore(str(tmp_path), readonly=True).rollup(tier) for tier in TIERS}
+
+    # Lose one tier entirely and part of the other, then restart the writer
+    for tier in TIERS:
+        folder = tmp_path / f"rollup_{tier}"
+        files = sorted(folder.iterdir())
+        for path in files if tier == "1m" else files[1:]:
+            path.unlink()
+    store = TelemetryStore(str(tmp_path))
+    store.append_many([(BASE + 3 * day, "a", 30.0, 60.0, 0)])   # Closes the open buckets
+    store.close()
+
+    reader = TelemetryStore(str(tmp_path), readonly=True)
+    raw = reader.query()
+    for tier, (width, _) in TIERS.items():
+        rollups = reader.rollup(tier)
+        assert np.array_equal(rollups, aggregate(raw, width))
+        assert np.array_equal(rollups[:len(reference[tier])], reference[tier])
+
+
+def test_missing_pot_reads_back_as_missing(tmp_path):
+    store = TelemetryStore(str(tmp_path))
+    store.append_many([(BASE, "a", 21.0, 50.0, 512), (BASE + 1_000, "a", 22.0, 51.0, float("nan")),
+                       (BASE + 2_000, "a", 23.0, 52.0, 0)])
+    df = store.read_frame()
+    store.close()
+    assert df["pot"].tolist()[0] == 512 and df["pot"].tolist()[2] == 0
+    assert df["pot"].isna().tolist() == [False, True, False]